@@ -0,0 +1,160 @@
+"""
+A vectorized Monte Carlo simulator of the bank's draw policy.
+
+Every row of the input is a pre-shuffled shoe of card points (ace = 11, as `Card.point`).
+The first card of a row is the bank's upcard and the bank draws the next cards of the
+same row in order, exactly as `Game.phase_5__reveals_banks_second_card` and
+`Game.phase_6__bank_hits_until_bust_or_stand` do: hit with 16 points or less, stand
+with 17 points or more. All the rows are advanced at once with masked array operations.
+
+Run `python3 bank_simulator.py` to compare its speed against the scalar `Game` path.
+"""
+import time
+from typing import Dict
+
+import numpy as np
+
+ACE_POINT = 11
+BUST_LIMIT = 21
+BANK_MAX_HIT_POINT = 16
+
+# the shoes are simulated in blocks of this many rows which fit in the cache
+SHOES_PER_BLOCK = 16384
+
+# the number of card positions which are transposed at once
+CARDS_PER_STEP = 12
+
+# a final total can not exceed 16 + 10 (the largest card on a hitting hand)
+MAX_FINAL_TOTAL = BANK_MAX_HIT_POINT + 10
+
+# the points of a single deck; 2 to 10, the ace and J=1, Q=2, K=3 for the four suits
+DECK_POINTS = np.array(([ACE_POINT] + list(range(2, 11)) + [1, 2, 3]) * 4, dtype=np.int8)
+
+
+def generate_shoes(
+    p_number_of_shoes: int, p_number_of_decks: int = 1, p_seed: int = None
+) -> np.ndarray:
+    """
+    Generates independently shuffled shoes as a (number of shoes, cards per shoe) array
+    """
+    rng = np.random.default_rng(p_seed)
+    shoes = np.tile(np.tile(DECK_POINTS, p_number_of_decks), (p_number_of_shoes, 1))
+    return rng.permuted(shoes, axis=1)
+
+
+def _simulate_block(p_shoes: np.ndarray) -> np.ndarray:
+    """
+    Plays the bank's hands of a block of shoes which is small enough to stay in the cache
+    """
+    number_of_shoes, cards_per_shoe = p_shoes.shape
+
+    # the hard total counts the aces as 1; a soft ace adds 10 extra points if it fits
+    hard_totals = np.zeros(number_of_shoes, dtype=np.int16)
+    has_ace = np.zeros(number_of_shoes, dtype=bool)
+    final_totals = np.zeros(number_of_shoes, dtype=np.int16)
+    hitting = np.ones(number_of_shoes, dtype=bool)
+
+    for first_card in range(0, cards_per_shoe, CARDS_PER_STEP):
+        # a contiguous column per card position makes each step a cheap vector operation
+        columns = np.ascontiguousarray(
+            p_shoes[:, first_card : first_card + CARDS_PER_STEP].T
+        )
+        for cards in columns:
+            is_ace = cards == ACE_POINT
+            is_ace &= hitting
+            hard_totals += np.where(is_ace, np.int8(1), cards) * hitting
+            has_ace |= is_ace
+            is_soft = hard_totals <= BUST_LIMIT - 10
+            is_soft &= has_ace
+            totals = hard_totals + is_soft.astype(np.int16) * np.int16(10)
+
+            standing = totals > BANK_MAX_HIT_POINT
+            standing &= hitting
+            np.copyto(final_totals, totals, where=standing)
+            hitting &= ~standing
+            if not hitting.any():
+                return final_totals
+
+    raise Exception("The shoes do not have enough cards for the bank to finish.")
+
+
+def simulate_bank_hands(p_shoes: np.ndarray) -> np.ndarray:
+    """
+    Plays the bank's hand for every shoe and returns the final totals (above 21 means bust)
+
+    As the bank draws the cards of a shoe in order, all the hands of a block are advanced
+    column by column; a hand which has reached 17 points is masked out and keeps its total.
+    """
+    shoes = np.asarray(p_shoes, dtype=np.int8)
+    blocks = [
+        _simulate_block(shoes[first_shoe : first_shoe + SHOES_PER_BLOCK])
+        for first_shoe in range(0, len(shoes), SHOES_PER_BLOCK)
+    ]
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+
+def simulate_bank_histograms(p_shoes: np.ndarray) -> Dict[int, np.ndarray]:
+    """
+    Returns the histogram of the bank's final totals for each upcard point
+
+    The histogram of an upcard is indexed by the final total (0 to 26); the totals above
+    21 are the bust hands.
+    """
+    shoes = np.asarray(p_shoes)
+    upcards = shoes[:, 0].astype(np.intp)
+    totals = simulate_bank_hands(shoes)
+
+    # one pass over all the hands; a row of the table per upcard point
+    bins = MAX_FINAL_TOTAL + 1
+    table = np.bincount(
+        upcards * bins + totals, minlength=(ACE_POINT + 1) * bins
+    ).reshape(ACE_POINT + 1, bins)
+
+    # the upcards which have been dealt, without sorting all of them
+    return {int(upcard): table[upcard] for upcard in np.flatnonzero(table.any(axis=1))}
+
+
+def bust_rates(p_histograms: Dict[int, np.ndarray]) -> Dict[int, float]:
+    """
+    The ratio of the bust hands per upcard point
+    """
+    return {
+        upcard: histogram[BUST_LIMIT + 1 :].sum() / histogram.sum()
+        for upcard, histogram in p_histograms.items()
+    }
+
+
+if __name__ == "__main__":
+    from array import array
+
+    from twenty_one import Game, Player, States
+    from twenty_one_cards import CARDS
+
+    shoes = generate_shoes(p_number_of_shoes=1_000_000, p_seed=21)
+
+    start = time.perf_counter()
+    histograms = simulate_bank_histograms(shoes)
+    vectorized = (time.perf_counter() - start) / len(shoes)
+
+    # the scalar path; the bank of a Game plays phases 5 and 6 on each shoe, loaded in the
+    # same order, with a player who stands so that the bank draws
+    code_by_point = {card.point: card.code for card in CARDS}
+    scalar_shoes = [
+        array("b", [code_by_point[point] for point in shoe]) for shoe in shoes[:20000].tolist()
+    ]
+    player = Player(p_name="Player", p_capital=0)
+    game = Game(p_players=[player], p_verbose=False)
+    start = time.perf_counter()
+    for codes in scalar_shoes:
+        game.reset()
+        game.shoe.load(codes)
+        game.bank.append_card(game.get_a_random_card())
+        player.sets[0].state = States.STAND
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+    scalar = (time.perf_counter() - start) / len(scalar_shoes)
+
+    for upcard, rate in sorted(bust_rates(histograms).items()):
+        print(f"upcard {upcard:2}: bust rate {rate:.4f}")
+    print(f"vectorized: {vectorized * 1e9:.0f} ns/hand, Game: {scalar * 1e9:.0f} ns/hand")
+    print(f"speed-up: {scalar / vectorized:.0f}x")
@@ -0,0 +1,132 @@
+"""
+The exact probabilities of the bank's final totals, per upcard and shoe composition.
+
+The bank's play is fully determined by the rules (hit with 16 points or less, stand
+with 17 points or more), so its final total only depends on its upcard and on the
+cards which remain in the shoe. The tables are computed once per composition by an
+exact recursion over the cards drawn (without replacement), kept in an LRU cache
+keyed on the composition and can be saved to and loaded from a JSON file; a query
+for a known composition is then a dictionary lookup.
+"""
+import json
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+
+from twenty_one import BLACKJACK_POINTS, SOFT_ACE_EXTRA_POINTS
+from twenty_one_cards import POINT_VALUES
+
+ACE_POINT = 11
+
+# the bank hits with this many points or less
+BANK_MAX_HIT_POINTS = 16
+
+# the bank's final totals; index 0 to 4 for 17 to 21 and the last one for bust
+BANK_FINAL_TOTALS = range(BANK_MAX_HIT_POINTS + 1, BLACKJACK_POINTS + 1)
+BANK_BUST = len(BANK_FINAL_TOTALS)
+
+# the probabilities of the final totals of each upcard, indexed by the upcard point - 1
+Table = Tuple[Tuple[float, ...], ...]
+
+
+def compute_table(p_composition: Tuple[int, ...]) -> Table:
+    """
+    the exact bank outcomes of every upcard point for the remaining cards of a shoe
+
+    The composition holds the number of remaining cards of each point value (see
+    `twenty_one_cards.get_composition`); the upcard is not part of it.
+    """
+    memo: Dict[Tuple[int, bool, Tuple[int, ...]], Tuple[float, ...]] = {}
+
+    def bank_outcomes(p_hard_points: int, p_has_ace: bool, p_remaining: Tuple[int, ...]):
+        total = p_hard_points
+        if p_has_ace and p_hard_points + SOFT_ACE_EXTRA_POINTS <= BLACKJACK_POINTS:
+            total += SOFT_ACE_EXTRA_POINTS
+
+        outcomes = [0.0] * (len(BANK_FINAL_TOTALS) + 1)
+        if total > BLACKJACK_POINTS:
+            outcomes[BANK_BUST] = 1.0
+            return outcomes
+        if total > BANK_MAX_HIT_POINTS:
+            outcomes[total - BANK_FINAL_TOTALS[0]] = 1.0
+            return outcomes
+
+        key = (p_hard_points, p_has_ace, p_remaining)
+        if key in memo:
+            return memo[key]
+
+        number_of_cards = sum(p_remaining)
+        if number_of_cards == 0:
+            raise Exception("The bank runs out of cards with this composition.")
+
+        remaining = list(p_remaining)
+        for i, count in enumerate(p_remaining):
+            if not count:
+                continue
+            point = POINT_VALUES[i]
+            remaining[i] -= 1
+            next_outcomes = bank_outcomes(
+                p_hard_points + (1 if point == ACE_POINT else point),
+                p_has_ace or point == ACE_POINT,
+                tuple(remaining),
+            )
+            remaining[i] += 1
+
+            probability = count / number_of_cards
+            for j, next_probability in enumerate(next_outcomes):
+                outcomes[j] += probability * next_probability
+
+        memo[key] = outcomes = tuple(outcomes)
+        return outcomes
+
+    composition = tuple(p_composition)
+    return tuple(
+        tuple(
+            bank_outcomes(1 if upcard == ACE_POINT else upcard, upcard == ACE_POINT, composition)
+        )
+        for upcard in POINT_VALUES
+    )
+
+
+class BankTable:
+    """
+    An LRU cache of the bank outcome tables keyed on the shoe composition
+    """
+
+    max_size: int
+    tables: "OrderedDict[Tuple[int, ...], Table]"
+
+    def __init__(self, p_max_size: int = 1024) -> None:
+        self.max_size = p_max_size
+        self.tables = OrderedDict()
+
+    def get_table(self, p_composition: Sequence[int]) -> Table:
+        composition = tuple(p_composition)
+        table = self.tables.get(composition)
+        if table is None:
+            table = compute_table(composition)
+            self.tables[composition] = table
+            if len(self.tables) > self.max_size:
+                self.tables.popitem(last=False)
+        else:
+            self.tables.move_to_end(composition)
+        return table
+
+    def get_outcomes(self, p_composition: Sequence[int], p_upcard: int) -> Tuple[float, ...]:
+        """
+        the probabilities of the bank's final totals 17 to 21 and of bust, for an upcard point
+        """
+        return self.get_table(p_composition)[p_upcard - 1]
+
+    def save(self, p_path: str):
+        with open(p_path, "w") as file:
+            json.dump(
+                [[list(composition), table] for composition, table in self.tables.items()],
+                file,
+            )
+
+    def load(self, p_path: str):
+        with open(p_path) as file:
+            for composition, table in json.load(file):
+                self.tables[tuple(composition)] = tuple(tuple(row) for row in table)
+        while len(self.tables) > self.max_size:
+            self.tables.popitem(last=False)
@@ -0,0 +1,307 @@
+"""
+A vectorized Monte Carlo simulator of the bankrolls of players.
+
+A round is summarized by the distribution of its net result per unit of the initial bet
+(see OutcomeDistribution), e.g. -2 for a split whose both sets lose, which is measured by
+playing headless rounds (`outcomes_from_engine`) or derived from the exact values of the
+solver (`outcomes_from_solver`). The simulator then evolves a NumPy array of bankrolls
+round by round, all of them at once: a bet policy sizes the bets from the capitals, a
+bankroll which has nothing left can not bet anymore (as in `main.py`) and the result of
+the round is the bet times a result drawn from the distribution. As in the engine, a
+split stakes the bet once more even if the capital is short of it.
+
+Only the capital, its peak, the largest drawdown and the round of ruin of every bankroll
+are kept, so millions of bankrolls fit in memory whatever the number of rounds is.
+
+Run `python3 bankroll.py` to simulate a million bankrolls of the solver's strategy.
+"""
+import time
+from typing import Callable, Dict, NamedTuple, Sequence
+
+import numpy as np
+
+from solver import Solver
+from strategies import HitBelow
+from tournament import run_tournament
+from twenty_one import Strategy
+from twenty_one_cards import DECK_CODES, get_composition
+
+# the bankrolls are simulated in blocks of this many, which bounds the temporary arrays
+# of a round to a few MB; of the blocks from 4096 to a million bankrolls it measured the
+# fastest, and a million at once was about 45% slower
+BANKROLLS_PER_BLOCK = 65536
+
+# the results are drawn from a table of this many, so their probabilities are rounded
+# to a millionth
+TABLE_SIZE = 1 << 20
+
+# the round of ruin of the bankrolls which are never ruined
+NOT_RUINED = -1
+
+# the bets of the bankrolls out of their capitals
+BetPolicy = Callable[[np.ndarray], np.ndarray]
+
+
+class OutcomeDistribution(NamedTuple):
+    """
+    the net results of a round per unit of the initial bet and their probabilities
+    """
+
+    results: np.ndarray
+    probabilities: np.ndarray
+
+    def get_mean(self) -> float:
+        return float(self.results @ self.probabilities)
+
+
+class BankrollReport(NamedTuple):
+    """
+    the outcome of the bankrolls
+
+    ruin_rounds holds the round (numbered from 1) after which a bankroll had nothing left,
+    or NOT_RUINED
+    """
+
+    number_of_rounds: int
+    final_capitals: np.ndarray
+    max_drawdowns: np.ndarray
+    ruin_rounds: np.ndarray
+
+    def get_risk_of_ruin(self) -> float:
+        return float(np.mean(self.ruin_rounds != NOT_RUINED))
+
+    def get_drawdown_quantiles(
+        self, p_quantiles: Sequence[float] = (0.5, 0.9, 0.99)
+    ) -> Dict[float, float]:
+        return dict(zip(p_quantiles, np.quantile(self.max_drawdowns, p_quantiles)))
+
+    def get_ruin_histogram(self, p_number_of_bins: int = 10) -> np.ndarray:
+        """
+        the counts of the ruined bankrolls in equal bins of the rounds
+        """
+        ruin_rounds = self.ruin_rounds[self.ruin_rounds != NOT_RUINED]
+        counts, _ = np.histogram(
+            ruin_rounds, bins=p_number_of_bins, range=(1, self.number_of_rounds + 1)
+        )
+        return counts
+
+
+def flat_bet(p_bet_amount: int) -> BetPolicy:
+    """
+    the same bet every round
+    """
+
+    def policy(p_capitals: np.ndarray) -> np.ndarray:
+        return np.full_like(p_capitals, p_bet_amount)
+
+    return policy
+
+
+def fraction_bet(p_fraction: float, p_minimum_bet: int = 1) -> BetPolicy:
+    """
+    a fraction of the capital, rounded down, and at least the minimum
+    """
+
+    def policy(p_capitals: np.ndarray) -> np.ndarray:
+        bets = (p_capitals * p_fraction).astype(p_capitals.dtype)
+        return np.maximum(bets, p_minimum_bet)
+
+    return policy
+
+
+def outcomes_from_changes(
+    p_capital_changes: Sequence[int], p_bet_amount: int = 1
+) -> OutcomeDistribution:
+    """
+    the distribution of the capital changes of rounds played with the same bet
+    """
+    results, counts = np.unique(
+        np.asarray(p_capital_changes, dtype=np.int64) // p_bet_amount, return_counts=True
+    )
+    return OutcomeDistribution(results, counts / counts.sum())
+
+
+def outcomes_from_engine(
+    p_number_of_rounds: int,
+    p_strategy: Strategy = None,
+    p_master_seed: int = 0,
+    p_number_of_workers: int = None,
+) -> OutcomeDistribution:
+    """
+    the distribution of the results of a player who plays headless rounds alone
+    """
+    strategy = HitBelow(17) if p_strategy is None else p_strategy
+    result = run_tournament(
+        p_number_of_rounds=p_number_of_rounds,
+        p_master_seed=p_master_seed,
+        p_number_of_workers=p_number_of_workers,
+        p_initial_capital=0,
+        p_strategies=[strategy],
+    )
+    return outcomes_from_changes(np.diff(result.capital_trajectories[0], prepend=0))
+
+
+def outcomes_from_solver(p_solver: Solver) -> OutcomeDistribution:
+    """
+    the distribution of the results of the solver's strategy
+
+    A set wins with the probability which gives its expected value. The two sets of a
+    split are taken as independent and the splits of a split are folded into the value
+    of its sets, so the mean is exact but the spread of the splits is approximated.
+    """
+    probabilities = dict.fromkeys(range(-2, 3), 0.0)
+    for first_point, first_probability in p_solver.probabilities:
+        for upcard, upcard_probability in p_solver.probabilities:
+            for second_point, second_probability in p_solver.probabilities:
+                probability = first_probability * upcard_probability * second_probability
+                # without splitting, and with the splits if they are better
+                value = p_solver.two_cards_value(first_point, second_point, upcard, 0)
+                split_value = p_solver.two_cards_value(
+                    first_point, second_point, upcard, p_solver.splits_depth
+                )
+
+                if split_value > value:
+                    win = (1 + split_value / 2) / 2
+                    probabilities[2] += probability * win * win
+                    probabilities[0] += probability * 2 * win * (1 - win)
+                    probabilities[-2] += probability * (1 - win) * (1 - win)
+                else:
+                    win = (1 + value) / 2
+                    probabilities[1] += probability * win
+                    probabilities[-1] += probability * (1 - win)
+
+    results = np.array([result for result in probabilities if probabilities[result]])
+    return OutcomeDistribution(
+        results, np.array([probabilities[result] for result in results])
+    )
+
+
+def _get_result_table(p_outcomes: OutcomeDistribution) -> np.ndarray:
+    """
+    the results repeated in proportion to their probabilities, so a result is drawn by
+    indexing the table with a uniform random integer instead of a binary search
+    """
+    counts = np.round(
+        np.cumsum(p_outcomes.probabilities) / np.sum(p_outcomes.probabilities) * TABLE_SIZE
+    ).astype(np.int64)
+    lengths = np.diff(counts, prepend=0)
+    results = np.asarray(p_outcomes.results, dtype=np.int64)
+    # the table stays in the cache if its results fit in a byte
+    dtype = np.int8 if np.abs(results).max() <= np.iinfo(np.int8).max else np.int64
+    return np.repeat(results.astype(dtype), lengths)
+
+
+def _simulate_block(
+    p_capitals: np.ndarray,
+    p_max_drawdowns: np.ndarray,
+    p_ruin_rounds: np.ndarray,
+    p_result_table: np.ndarray,
+    p_number_of_rounds: int,
+    p_bet_policy: BetPolicy,
+    p_rng: np.random.Generator,
+):
+    """
+    Plays the rounds of a block of bankrolls (see BANKROLLS_PER_BLOCK)
+
+    The bankrolls which are ruined bet nothing, and they are dropped from the arrays
+    of the block when they are half of it.
+    """
+    indices = np.arange(len(p_capitals))
+    capitals = p_capitals.copy()
+    peaks = capitals.copy()
+    max_drawdowns = np.zeros_like(capitals)
+    ruin_rounds = np.where(capitals > 0, NOT_RUINED, 0)
+    number_of_ruined = np.count_nonzero(ruin_rounds == 0)
+
+    for round_number in range(1, p_number_of_rounds + 1):
+        if number_of_ruined * 2 > len(indices):
+            active = ruin_rounds == NOT_RUINED
+            p_capitals[indices] = capitals
+            p_max_drawdowns[indices] = max_drawdowns
+            p_ruin_rounds[indices] = ruin_rounds
+            indices = indices[active]
+            capitals = capitals[active]
+            peaks = peaks[active]
+            max_drawdowns = max_drawdowns[active]
+            ruin_rounds = ruin_rounds[active]
+            number_of_ruined = 0
+            if not len(indices):
+                break
+
+        # no bet is greater than the capital, and nothing left is nothing to bet
+        bets = np.minimum(p_bet_policy(capitals), capitals)
+        np.maximum(bets, 0, out=bets)
+        draws = p_rng.integers(0, TABLE_SIZE, len(capitals), dtype=np.uint32)
+        bets *= p_result_table[draws]
+        capitals += bets
+
+        np.maximum(peaks, capitals, out=peaks)
+        np.maximum(max_drawdowns, peaks - capitals, out=max_drawdowns)
+        ruined = capitals <= 0
+        ruined &= ruin_rounds == NOT_RUINED
+        np.copyto(ruin_rounds, round_number, where=ruined)
+        number_of_ruined += np.count_nonzero(ruined)
+
+    p_capitals[indices] = capitals
+    p_max_drawdowns[indices] = max_drawdowns
+    p_ruin_rounds[indices] = ruin_rounds
+
+
+def simulate_bankrolls(
+    p_outcomes: OutcomeDistribution,
+    p_number_of_bankrolls: int,
+    p_number_of_rounds: int,
+    p_initial_capital: int = 1000,
+    p_bet_policy: BetPolicy = None,
+    p_seed: int = None,
+) -> BankrollReport:
+    """
+    Plays the rounds of all the bankrolls, block by block
+
+    The bankrolls bet 1 every round unless a bet policy is given.
+    """
+    bet_policy = flat_bet(1) if p_bet_policy is None else p_bet_policy
+    rng = np.random.default_rng(p_seed)
+
+    capitals = np.full(p_number_of_bankrolls, p_initial_capital, dtype=np.int64)
+    max_drawdowns = np.zeros_like(capitals)
+    ruin_rounds = np.full(p_number_of_bankrolls, NOT_RUINED, dtype=np.int64)
+    result_table = _get_result_table(p_outcomes)
+    for start in range(0, p_number_of_bankrolls, BANKROLLS_PER_BLOCK):
+        block = slice(start, start + BANKROLLS_PER_BLOCK)
+        _simulate_block(
+            capitals[block],
+            max_drawdowns[block],
+            ruin_rounds[block],
+            result_table,
+            p_number_of_rounds,
+            bet_policy,
+            rng,
+        )
+
+    return BankrollReport(p_number_of_rounds, capitals, max_drawdowns, ruin_rounds)
+
+
+if __name__ == "__main__":
+    outcomes = outcomes_from_solver(Solver(get_composition(DECK_CODES)))
+    print(f"outcomes {dict(zip(outcomes.results.tolist(), outcomes.probabilities.round(4)))}")
+    print(f"mean {outcomes.get_mean():+.4f} per unit bet")
+
+    number_of_bankrolls = 1000000
+    number_of_rounds = 1000
+    start = time.perf_counter()
+    report = simulate_bankrolls(
+        outcomes,
+        p_number_of_bankrolls=number_of_bankrolls,
+        p_number_of_rounds=number_of_rounds,
+        p_initial_capital=100,
+        p_bet_policy=fraction_bet(0.05),
+        p_seed=21,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{number_of_bankrolls:,} bankrolls x {number_of_rounds:,} rounds in {elapsed:.1f}s"
+    )
+    print(f"risk of ruin {report.get_risk_of_ruin():.4f}")
+    print(f"drawdown quantiles {report.get_drawdown_quantiles()}")
+    print(f"ruin histogram {report.get_ruin_histogram().tolist()}")
@@ -0,0 +1,262 @@
+"""
+The benchmark suite of the game.
+
+Every benchmark prepares its data and returns the callable to be timed; the runner reports
+the best time per call out of a few repeats as JSON and compares it against a stored
+baseline file, flagging the benchmarks which have become slower than the tolerance allows.
+
+    python3 benchmarks.py                          # run and compare to the baseline
+    python3 benchmarks.py --output results.json    # also write the results
+    python3 benchmarks.py --save-baseline          # store the results as the new baseline
+    python3 benchmarks.py --only round             # the benchmarks whose name has "round"
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable, Dict
+
+from cards import Symbols
+from shoe import Shoe
+from strategies import HitBelow
+from twenty_one import Game, Player, Set, States
+from twenty_one_cards import CARDS, TwentyOneCards
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json"
+)
+
+# the most seconds `import twenty_one` may take in a fresh interpreter
+IMPORT_TIME_BUDGET = 0.075
+
+# the benchmarks with an absolute budget in seconds, whatever the baseline is
+BUDGETS = {"import/twenty_one": IMPORT_TIME_BUDGET}
+
+# the benchmarks by name; each one returns the callable to be timed
+BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {}
+
+
+def benchmark(p_name: str):
+    """
+    registers a benchmark
+    """
+
+    def register(p_function):
+        BENCHMARKS[p_name] = p_function
+        return p_function
+
+    return register
+
+
+def _card(p_symbol: Symbols):
+    for card in CARDS:
+        if card.symbol is p_symbol:
+            return card
+
+
+for number_of_decks in (1, 8, 100):
+
+    @benchmark(f"deck_construction/{number_of_decks}_decks")
+    def _deck_construction(p_number_of_decks=number_of_decks):
+        return lambda: TwentyOneCards(p_number_of_decks=p_number_of_decks)
+
+
+for number_of_aces in range(5):
+
+    @benchmark(f"set_total_points/{number_of_aces}_aces")
+    def _set_total_points(p_number_of_aces=number_of_aces):
+        set = Set()
+        for _ in range(p_number_of_aces):
+            set.append_card(_card(Symbols.ACE))
+        set.append_card(_card(Symbols.FIVE))
+        return set.get_total_points
+
+
+@benchmark("player_split_chain/8_splits")
+def _player_split_chain():
+    eight = _card(Symbols.EIGHT)
+
+    def split_chain():
+        player = Player(p_name="Player", p_capital=1000)
+        player.verbose = False
+        player.append_card(eight)
+        player.append_card(eight)
+        player.place_initial_bet(1)
+        for _ in range(8):
+            player.do_split()
+            player.append_card(eight)
+
+    return split_chain
+
+
+@benchmark("scripted_shoe/8_decks")
+def _scripted_shoe():
+    player = Player(p_name="Player", p_capital=1000)
+    game = Game(p_players=[player], p_verbose=False, p_shoe=Shoe(p_number_of_decks=8))
+    symbols = [Symbols.SEVEN, Symbols.SIX, Symbols.SEVEN, Symbols.FIVE, Symbols.NINE]
+    symbols += [Symbols.TEN, Symbols.EIGHT, Symbols.NINE, Symbols.EIGHT]
+    return lambda: game.set_what_cards_to_reveal(p_symbols=symbols)
+
+
+@benchmark("game_evaluate/300_players")
+def _game_evaluate():
+    players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(300)]
+    game = Game(p_players=players, p_verbose=False)
+    for player in players:
+        player.append_card(_card(Symbols.TEN))
+        player.append_card(_card(Symbols.EIGHT))
+        player.sets[0].state = States.STAND
+    game.bank.append_card(_card(Symbols.TEN))
+    game.bank.append_card(_card(Symbols.NINE))
+    game.bank.sets[0].state = States.STAND
+
+    def evaluate():
+        for player in players:
+            player.sets[0].bet_amount = 1
+        game.evaluate()
+
+    return evaluate
+
+
+@benchmark("game_snapshot/3_players")
+def _game_snapshot():
+    players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+    game = Game(p_players=players, p_verbose=False)
+    game.phase_1__start()
+    for player in players:
+        game.phase_2__place_bet(player, 1)
+    game.phase_3__give_players_the_second_card()
+
+    def snapshot_and_restore():
+        game.restore(game.snapshot())
+
+    return snapshot_and_restore
+
+
+@benchmark("full_round/rendering_off")
+def _full_round_rendering_off():
+    players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+    game = Game(p_players=players, p_verbose=False)
+    strategies = [HitBelow(17) for _ in players]
+    return lambda: game.play_round(p_strategies=strategies)
+
+
+@benchmark("full_round/rendering_on")
+def _full_round_rendering_on():
+    players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+    game = Game(p_players=players, p_verbose=True)
+    strategies = [HitBelow(17) for _ in players]
+
+    def play_round():
+        # the table is drawn into a buffer; the log records go nowhere unless configured
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.play_round(p_strategies=strategies)
+
+    return play_round
+
+
+@benchmark("import/twenty_one")
+def _import_twenty_one():
+    """
+    a fresh interpreter importing the engine, less the start-up of the interpreter itself
+    """
+    start_up = _time_interpreter("pass")
+    return lambda: max(_time_interpreter("import twenty_one") - start_up, 0.0)
+
+
+def _time_interpreter(p_code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", p_code],
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return time.perf_counter() - start
+
+
+def run_benchmark(p_name: str, p_repeat: int = 5) -> float:
+    """
+    the best time per call in seconds
+
+    The callables which return a number report their own time (e.g. for subprocesses).
+    """
+    function = BENCHMARKS[p_name]()
+    timer = timeit.Timer(function)
+    if isinstance(function(), float):
+        return min(function() for _ in range(p_repeat))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=p_repeat, number=number)) / number
+
+
+def compare(
+    p_results: Dict[str, float], p_baseline: Dict[str, float], p_tolerance: float
+) -> Dict[str, float]:
+    """
+    the benchmarks which are slower than the baseline by more than the tolerance, with their ratio
+    """
+    return {
+        name: seconds / p_baseline[name]
+        for name, seconds in p_results.items()
+        if name in p_baseline and seconds > p_baseline[name] * (1 + p_tolerance)
+    }
+
+
+def check_budgets(p_results: Dict[str, float]) -> Dict[str, float]:
+    """
+    the benchmarks which are over their budget, with their ratio to it
+    """
+    return {
+        name: seconds / BUDGETS[name]
+        for name, seconds in p_results.items()
+        if name in BUDGETS and seconds > BUDGETS[name]
+    }
+
+
+def main(p_arguments=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="the JSON file to write the results to")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--only", default="", help="run the benchmarks whose name has this")
+    arguments = parser.parse_args(p_arguments)
+
+    results = {}
+    for name in BENCHMARKS:
+        if arguments.only in name:
+            results[name] = run_benchmark(name)
+            print(f"{name:<36} {results[name] * 1e6:12.2f} us")
+
+    # a benchmark over its budget is a regression, with or without a baseline
+    over_budget = check_budgets(results)
+    for name, ratio in over_budget.items():
+        print(f"OVER BUDGET: {name} takes {results[name] * 1e3:.1f} ms, {ratio:.2f}x its budget")
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as file:
+            json.dump(results, file, indent=4)
+        return 1 if over_budget else 0
+
+    if not os.path.exists(arguments.baseline):
+        print("There is no baseline to compare to.")
+        return 1 if over_budget else 0
+
+    with open(arguments.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, arguments.tolerance)
+    for name, ratio in regressions.items():
+        print(f"REGRESSION: {name} is {ratio:.2f}x the baseline")
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
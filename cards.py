@@ -47,24 +47,32 @@ class Colors(Enum):
 class Card:
     """
     a single card
+
+    The code of a card is a small integer (0 to 51) which identifies its suit and symbol;
+    as the suit and symbol are all a card is about, a card can be shared by any number
+    of decks (see `twenty_one_cards`).
     """
 
+    __slots__ = ("suit", "symbol", "color", "code", "point", "alternative_point")
+
     suit: Suits
     symbol: Symbols
     color: Colors
-    deck_number: int
+    code: int
     point: int
     alternative_point: int
 
-    def __init__(
-        self, p_suit: Suits, p_symbol: Symbols, p_deck_number: int = 1
-    ) -> None:
+    def __init__(self, p_suit: Suits, p_symbol: Symbols) -> None:
         self.suit = p_suit
         self.symbol = p_symbol
         self.color = (
-            Colors.RED if p_symbol in [Suits.DIMOND, Suits.HEART] else Colors.BLACK
+            Colors.RED if p_suit in [Suits.DIMOND, Suits.HEART] else Colors.BLACK
+        )
+        self.code = list(Suits).index(p_suit) * len(Symbols) + list(Symbols).index(
+            p_symbol
         )
-        self.deck_number = p_deck_number
+        self.point = 0
+        self.alternative_point = None
 
     def __str__(self) -> str:
         return f"{self.symbol.value}{self.suit.value}"
@@ -0,0 +1,160 @@
+"""
+A compact binary log of the events of the game.
+
+Every deal, bet, action and settlement of a `twenty_one.Game` with an event log is appended
+to a file as a fixed-width record (see EVENT): the event type, the round id, the seat, the
+set index, the card code and an amount. The records are buffered and written in bulk, and
+a log is read back through a memory map, so an audit over millions of rounds neither
+parses text nor reads the whole file into memory.
+
+    with EventLogWriter("game.log") as event_log:
+        game.event_log = event_log
+        ...
+    with EventLogReader("game.log") as events:
+        replay.replay(events, p_offset=1000)
+"""
+import mmap
+import struct
+from enum import IntEnum
+from typing import Iterator, NamedTuple
+
+# type, round id, seat, set index, card code and amount; little-endian and unpadded
+EVENT = struct.Struct("<BIHBbq")
+
+# the seat of the bank's events
+BANK_SEAT = 0xFFFF
+
+# the card code of the events without a card
+NO_CARD = -1
+
+
+class EventTypes(IntEnum):
+    """
+    the types of the events
+
+    ROUND: a round starts; the amount is the number of players
+    CAPITAL: the capital of a player at the start of the round
+    DEAL: a card is dealt to a set in phase 1, 3 or 5
+    BET: a player places her initial bet
+    HIT: a card is given to a set which has hit
+    STAND: a set stands
+    SPLIT: a set is split; the amount is the bet of the new set
+    SETTLE: a set is settled; the amount is what is paid to the player
+    """
+
+    ROUND = 0
+    CAPITAL = 1
+    DEAL = 2
+    BET = 3
+    HIT = 4
+    STAND = 5
+    SPLIT = 6
+    SETTLE = 7
+
+
+class Event(NamedTuple):
+    type: int
+    round_id: int
+    seat: int
+    set_number: int
+    code: int
+    amount: int
+
+
+class EventLogWriter:
+    """
+    Appends the events to a log file, a buffer at a time
+    """
+
+    path: str
+    buffer_size: int
+    number_of_events: int
+
+    def __init__(self, p_path: str, p_buffer_size: int = 1 << 16) -> None:
+        self.path = p_path
+        self.buffer_size = p_buffer_size
+        # the events recorded by this writer, which is the offset of the next one if the
+        # file was empty
+        self.number_of_events = 0
+        self._buffer = bytearray()
+        self._file = open(p_path, "ab")
+
+    def record(
+        self,
+        p_type: EventTypes,
+        p_round_id: int,
+        p_seat: int,
+        p_set_number: int = 0,
+        p_code: int = NO_CARD,
+        p_amount: int = 0,
+    ):
+        self._buffer += EVENT.pack(p_type, p_round_id, p_seat, p_set_number, p_code, p_amount)
+        self.number_of_events += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> "EventLogWriter":
+        return self
+
+    def __exit__(self, *p_exception):
+        self.close()
+
+
+class EventLogReader:
+    """
+    A read-only sequence of the events of a log file, through a memory map
+    """
+
+    path: str
+
+    def __init__(self, p_path: str) -> None:
+        self.path = p_path
+        self._file = open(p_path, "rb")
+        # an empty file can not be mapped
+        self._map = b""
+        if self._file.seek(0, 2):
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._length = len(self._map) // EVENT.size
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, p_index: int) -> Event:
+        if p_index < 0:
+            p_index += self._length
+        if not 0 <= p_index < self._length:
+            raise IndexError("event index out of range")
+        return Event._make(EVENT.unpack_from(self._map, p_index * EVENT.size))
+
+    def __iter__(self) -> Iterator[Event]:
+        # unpack_from does not keep the map exported, so it can be closed at any time
+        unpack_from = EVENT.unpack_from
+        for offset in range(0, self._length * EVENT.size, EVENT.size):
+            yield Event._make(unpack_from(self._map, offset))
+
+    def get_type(self, p_index: int) -> int:
+        """
+        the type of an event without unpacking the rest of it
+        """
+        return self._map[p_index * EVENT.size]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "EventLogReader":
+        return self
+
+    def __exit__(self, *p_exception):
+        self.close()
@@ -0,0 +1,176 @@
+"""
+An opt-in instrumentation layer for `twenty_one.Game`.
+
+Attaching it to a game wraps the phase methods of that game instance only, to record
+their wall time (inclusive; e.g. phase 6 includes the evaluation), and counts the cards
+drawn, the splits, the busts and the calls of `Set.get_total_points`. A game which is not
+instrumented runs the plain methods of its class, so there is no overhead at all when
+it is disabled.
+
+    instrumentation = GameInstrumentation(game, p_dump_every=10000).attach()
+    ...
+    instrumentation.snapshot()
+"""
+import functools
+import json
+import logging
+import time
+from typing import Callable, Dict
+
+from twenty_one import Action, Game, Set, States
+
+logger = logging.getLogger(__name__)
+
+TIMED_METHODS = (
+    "phase_1__start",
+    "phase_2__place_bet",
+    "phase_3__give_players_the_second_card",
+    "phase_4__take_action_for_player",
+    "phase_5__reveals_banks_second_card",
+    "phase_6__bank_hits_until_bust_or_stand",
+    "evaluate",
+    "draw_the_game",
+)
+
+# Set.get_total_points is counted process-wide while any instrumentation is attached
+_total_points_calls = 0
+_number_of_attached = 0
+_get_total_points = Set.get_total_points
+
+
+def _counted_get_total_points(self) -> int:
+    global _total_points_calls
+    _total_points_calls += 1
+    return _get_total_points(self)
+
+
+class GameInstrumentation:
+    """
+    Records the time per phase method and the counters of an instrumented game
+    """
+
+    game: Game
+    dump_every: int
+    seconds: Dict[str, float]
+    calls: Dict[str, int]
+    counters: Dict[str, int]
+
+    def __init__(
+        self, p_game: Game, p_dump_every: int = 0, p_dump: Callable[[dict], None] = None
+    ) -> None:
+        self.game = p_game
+        self.dump_every = p_dump_every
+        self.dump = p_dump if p_dump is not None else self._log_snapshot
+        self.seconds = {name: 0.0 for name in TIMED_METHODS}
+        self.calls = {name: 0 for name in TIMED_METHODS}
+        self.counters = {"rounds": 0, "cards_drawn": 0, "splits": 0, "busts": 0}
+        self._total_points_calls_at_attach = 0
+        self._is_attached = False
+
+    def attach(self) -> "GameInstrumentation":
+        global _number_of_attached
+        if self._is_attached:
+            return self
+
+        for name in TIMED_METHODS:
+            setattr(self.game, name, self._timed(name, getattr(self.game, name)))
+        self.game.get_a_random_card = self._counted_draw(self.game.get_a_random_card)
+        self.game.phase_4__take_action_for_player = self._counted_split(
+            self.game.phase_4__take_action_for_player
+        )
+        self.game.evaluate = self._counted_evaluation(self.game.evaluate)
+
+        if _number_of_attached == 0:
+            Set.get_total_points = _counted_get_total_points
+        _number_of_attached += 1
+        self._total_points_calls_at_attach = _total_points_calls
+        self._is_attached = True
+        return self
+
+    def detach(self):
+        global _number_of_attached
+        if not self._is_attached:
+            return
+
+        # the plain methods of the class are back once the instance attributes are gone
+        for name in TIMED_METHODS + ("get_a_random_card",):
+            delattr(self.game, name)
+
+        self.counters["total_points_calls"] = self._get_total_points_calls()
+        _number_of_attached -= 1
+        if _number_of_attached == 0:
+            Set.get_total_points = _get_total_points
+        self._is_attached = False
+
+    def _get_total_points_calls(self) -> int:
+        if not self._is_attached:
+            return self.counters.get("total_points_calls", 0)
+        return self.counters.get("total_points_calls", 0) + (
+            _total_points_calls - self._total_points_calls_at_attach
+        )
+
+    def _timed(self, p_name: str, p_method):
+        @functools.wraps(p_method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return p_method(*args, **kwargs)
+            finally:
+                self.seconds[p_name] += time.perf_counter() - start
+                self.calls[p_name] += 1
+
+        return timed
+
+    def _counted_draw(self, p_method):
+        @functools.wraps(p_method)
+        def counted_draw():
+            self.counters["cards_drawn"] += 1
+            return p_method()
+
+        return counted_draw
+
+    def _counted_split(self, p_method):
+        @functools.wraps(p_method)
+        def counted_split(p_player, p_action):
+            number_of_sets = len(p_player.sets)
+            result = p_method(p_player, p_action)
+            if p_action is Action.SPLIT and len(p_player.sets) > number_of_sets:
+                self.counters["splits"] += 1
+            return result
+
+        return counted_split
+
+    def _counted_evaluation(self, p_method):
+        @functools.wraps(p_method)
+        def counted_evaluation():
+            sets = [set for player in self.game.players for set in player.sets]
+            sets += self.game.bank.sets
+            self.counters["busts"] += sum(set.state is States.BUST for set in sets)
+
+            result = p_method()
+
+            self.counters["rounds"] += 1
+            if self.dump_every and self.counters["rounds"] % self.dump_every == 0:
+                self.dump(self.snapshot())
+            return result
+
+        return counted_evaluation
+
+    def snapshot(self) -> dict:
+        """
+        the timings and counters so far
+        """
+        return {
+            "phases": {
+                name: {"calls": self.calls[name], "seconds": self.seconds[name]}
+                for name in TIMED_METHODS
+            },
+            "counters": {
+                **self.counters,
+                "total_points_calls": self._get_total_points_calls(),
+            },
+        }
+
+    @staticmethod
+    def _log_snapshot(p_snapshot: dict):
+        logger.info(json.dumps(p_snapshot))
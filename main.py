@@ -1,15 +1,20 @@
+import logging
 from typing import List
-from random import randint, seed
+from random import Random, randint
 
-from twenty_one import Game, Player, States, Action
+from twenty_one import Game, Player, Action
 
 
 PLAYER_CAPITAL = 1000
 
 if __name__ == "__main__":
+    # the engine only logs; showing the records is up to the entry point
+    import coloredlogs
+
+    coloredlogs.install(level=logging.DEBUG)
+
     random_seed = randint(1, 99999)
     print("seed:", random_seed)
-    seed(random_seed)
 
     # sign-up players
     players: List[Player] = []
@@ -26,9 +31,10 @@ if __name__ == "__main__":
         if str.lower(command) == "s":
             break
 
+    # initiate the game; its shoe lasts across the rounds
+    game = Game(p_players=players, p_rng=Random(random_seed))
+
     while True:
-        # initiate the game
-        game = Game(p_players=players)
         game.phase_1__start()
 
         # place the bets
@@ -51,21 +57,21 @@ if __name__ == "__main__":
         game.phase_3__give_players_the_second_card()
 
         # ask actions player by player and set by set
-        while not game.check_if_all_players_are_ready():
-            for player in game.players:
-                for set in player.sets:
-                    if set.state is States.OPEN_TO_HIT:
-                        msg_ask_action = f"It's {player.name}'s turn; enter H/h to hit, S/s to stand and P/p to split: "
-                        action = str.lower(input(msg_ask_action))
-                        while action not in ["h", "s", "p"]:
-                            print("Invalid action, try again.")
-                            action = str.lower(input(msg_ask_action))
-                        if action == "h":
-                            game.phase_4__take_action_for_player(player, Action.HIT)
-                        elif action == "s":
-                            game.phase_4__take_action_for_player(player, Action.STAND)
-                        elif action == "p":
-                            game.phase_4__take_action_for_player(player, Action.SPLIT)
+        turn = game.get_turn()
+        while turn is not None:
+            player = game.players[turn[0]]
+            msg_ask_action = f"It's {player.name}'s turn; enter H/h to hit, S/s to stand and P/p to split: "
+            action = str.lower(input(msg_ask_action))
+            while action not in ["h", "s", "p"]:
+                print("Invalid action, try again.")
+                action = str.lower(input(msg_ask_action))
+            if action == "h":
+                game.phase_4__take_action_for_player(player, Action.HIT)
+            elif action == "s":
+                game.phase_4__take_action_for_player(player, Action.STAND)
+            elif action == "p":
+                game.phase_4__take_action_for_player(player, Action.SPLIT)
+            turn = game.get_turn()
 
         # other actions by bank
         game.phase_5__reveals_banks_second_card()
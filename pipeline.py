@@ -0,0 +1,392 @@
+"""
+A streaming pipeline of statistics over simulated rounds.
+
+A source plays the rounds of a game (e.g. a `headless.HeadlessGame`) and yields a compact
+record of each one, stages filter or transform the records and sinks aggregate them
+online. Everything is a generator or a running aggregate, so the memory stays the same
+whatever the number of rounds is. Run `python3 pipeline.py` for the statistics of
+100,000 headless rounds.
+
+    records = compose(
+        play_rounds(game, strategies, p_number_of_rounds=10**6),
+        where(lambda record: record.upcard == 10),
+    )
+    returns, busts = drain(records, MeanVariance(get_set_returns), BustRateByUpcard())
+    print(returns.mean, returns.get_variance(), busts.get_bust_rates())
+"""
+import math
+import random
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Protocol, Tuple
+
+from headless import HeadlessGame
+from settlement import Ledger
+from strategies import HitBelow
+from twenty_one import Game, Player, States, Strategy
+
+# the points of the bank's upcard; J=1 to the ace as 11
+UPCARD_POINTS = range(1, 12)
+
+
+class SetRecord(NamedTuple):
+    seat: int
+    set_number: int
+    total_points: int
+    is_bust: bool
+    bet_amount: int
+    payout: int
+
+
+class RoundRecord(NamedTuple):
+    """
+    the outcome of a round; the sets of all the players in order
+    """
+
+    round_id: int
+    number_of_players: int
+    upcard: int
+    bank_total_points: int
+    is_bank_bust: bool
+    sets: Tuple[SetRecord, ...]
+
+
+class _RoundSettlements:
+    """
+    The settlements of the current round only, which are passed on to the ledger the game
+    had (if any)
+    """
+
+    ledger: Ledger
+
+    def __init__(self, p_ledger: Ledger = None) -> None:
+        self.ledger = p_ledger
+        self.settlements: List[Tuple[int, int]] = []
+
+    def append(
+        self,
+        p_round_id: int,
+        p_seat: int,
+        p_set_number: int,
+        p_bet_amount: int,
+        p_payout: int,
+    ):
+        self.settlements.append((p_bet_amount, p_payout))
+        if self.ledger is not None:
+            self.ledger.append(p_round_id, p_seat, p_set_number, p_bet_amount, p_payout)
+
+
+def play_rounds(
+    p_game: Game,
+    p_strategies: List[Strategy],
+    p_number_of_rounds: int = None,
+    p_bet_amount: int = 1,
+) -> Iterator[RoundRecord]:
+    """
+    plays the rounds of the game (without end if no number is given) and yields their
+    records; the game records its settlements into the source while it runs, and into
+    its own ledger as well, which is put back once the source is done or closed
+    """
+    settlements = _RoundSettlements(p_game.ledger)
+    p_game.ledger = settlements
+    try:
+        number_of_rounds = 0
+        while p_number_of_rounds is None or number_of_rounds < p_number_of_rounds:
+            p_game.play_round(p_strategies=p_strategies, p_bet_amount=p_bet_amount)
+            number_of_rounds += 1
+
+            # the sets are settled in the order of the seats and of their sets
+            bets_and_payouts = iter(settlements.settlements)
+            sets = []
+            for seat, player in enumerate(p_game.players):
+                for set_number, set in enumerate(player.sets):
+                    bet_amount, payout = next(bets_and_payouts)
+                    sets.append(
+                        SetRecord(
+                            seat,
+                            set_number,
+                            set.get_total_points(),
+                            set.state is States.BUST,
+                            bet_amount,
+                            payout,
+                        )
+                    )
+            settlements.settlements.clear()
+
+            bank_set = p_game.bank.sets[0]
+            yield RoundRecord(
+                p_game.round_id,
+                len(p_game.players),
+                bank_set.cards[0].point,
+                bank_set.get_total_points(),
+                bank_set.state is States.BUST,
+                tuple(sets),
+            )
+    finally:
+        p_game.ledger = settlements.ledger
+
+
+# a stage of the pipeline
+Stage = Callable[[Iterable[RoundRecord]], Iterator]
+
+
+def where(p_predicate: Callable[[RoundRecord], bool]) -> Stage:
+    """
+    a stage which keeps the records of the predicate
+    """
+
+    def stage(p_records: Iterable[RoundRecord]) -> Iterator[RoundRecord]:
+        return (record for record in p_records if p_predicate(record))
+
+    return stage
+
+
+def transform(p_function: Callable[[RoundRecord], RoundRecord]) -> Stage:
+    """
+    a stage which maps the records, e.g. to keep only the sets of a seat
+    """
+
+    def stage(p_records: Iterable[RoundRecord]) -> Iterator[RoundRecord]:
+        return (p_function(record) for record in p_records)
+
+    return stage
+
+
+def only_seat(p_seat: int) -> Stage:
+    """
+    a stage which keeps the sets of a seat only
+    """
+    return transform(
+        lambda record: record._replace(
+            number_of_players=1,
+            sets=tuple(set for set in record.sets if set.seat == p_seat),
+        )
+    )
+
+
+def compose(p_source: Iterable[RoundRecord], *p_stages: Stage) -> Iterator:
+    """
+    the records of the source through the stages, in order
+    """
+    records = iter(p_source)
+    for stage in p_stages:
+        records = stage(records)
+    return records
+
+
+class Sink(Protocol):
+    def update(self, p_record: RoundRecord):
+        ...
+
+
+def drain(p_records: Iterable[RoundRecord], *p_sinks: Sink) -> Tuple[Sink, ...]:
+    """
+    feeds every record to every sink and returns the sinks
+    """
+    for record in p_records:
+        for sink in p_sinks:
+            sink.update(record)
+    return p_sinks
+
+
+def get_set_returns(p_record: RoundRecord) -> Iterator[float]:
+    """
+    the net return of each set of a round per unit of its bet
+    """
+    for set in p_record.sets:
+        if set.bet_amount:
+            yield (set.payout - set.bet_amount) / set.bet_amount
+
+
+def get_set_points(p_record: RoundRecord) -> Iterator[int]:
+    for set in p_record.sets:
+        yield set.total_points
+
+
+class MeanVariance:
+    """
+    The running mean and variance of the values of the records (Welford's algorithm)
+    """
+
+    count: int
+    mean: float
+
+    def __init__(self, p_get_values: Callable[[RoundRecord], Iterable[float]]) -> None:
+        self.get_values = p_get_values
+        self.count = 0
+        self.mean = 0.0
+        # the sum of the squared differences from the mean
+        self._m2 = 0.0
+
+    def add(self, p_value: float):
+        self.count += 1
+        delta = p_value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (p_value - self.mean)
+
+    def update(self, p_record: RoundRecord):
+        for value in self.get_values(p_record):
+            self.add(value)
+
+    def merge(self, p_other: "MeanVariance"):
+        """
+        adds the values of another one, e.g. of another process (Chan et al.)
+        """
+        count = self.count + p_other.count
+        if count == 0:
+            return
+        delta = p_other.mean - self.mean
+        self._m2 += p_other._m2 + delta * delta * self.count * p_other.count / count
+        self.mean += delta * p_other.count / count
+        self.count = count
+
+    def get_variance(self) -> float:
+        """
+        the sample variance; 0 with less than two values
+        """
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    def get_standard_error(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return math.sqrt(self.get_variance() / self.count)
+
+
+class BustRateByUpcard:
+    """
+    How often the bank and the sets of the players bust, per upcard of the bank
+    """
+
+    rounds: List[int]
+    bank_busts: List[int]
+    sets: List[int]
+    set_busts: List[int]
+
+    def __init__(self) -> None:
+        self.rounds = [0] * len(UPCARD_POINTS)
+        self.bank_busts = [0] * len(UPCARD_POINTS)
+        self.sets = [0] * len(UPCARD_POINTS)
+        self.set_busts = [0] * len(UPCARD_POINTS)
+
+    def update(self, p_record: RoundRecord):
+        index = p_record.upcard - 1
+        self.rounds[index] += 1
+        self.bank_busts[index] += p_record.is_bank_bust
+        self.sets[index] += len(p_record.sets)
+        self.set_busts[index] += sum(set.is_bust for set in p_record.sets)
+
+    def get_bust_rates(self) -> Dict[int, float]:
+        """
+        the bust rate of the bank per upcard which has been seen
+        """
+        return {
+            upcard: busts / rounds
+            for upcard, rounds, busts in zip(UPCARD_POINTS, self.rounds, self.bank_busts)
+            if rounds
+        }
+
+    def get_set_bust_rates(self) -> Dict[int, float]:
+        return {
+            upcard: busts / sets
+            for upcard, sets, busts in zip(UPCARD_POINTS, self.sets, self.set_busts)
+            if sets
+        }
+
+
+class SplitFrequency:
+    """
+    How often the players split, per player and round
+    """
+
+    hands: int
+    split_hands: int
+    splits: int
+
+    def __init__(self) -> None:
+        self.hands = 0
+        self.split_hands = 0
+        self.splits = 0
+
+    def update(self, p_record: RoundRecord):
+        self.hands += p_record.number_of_players
+        # a split adds a set to its player
+        self.splits += len(p_record.sets) - p_record.number_of_players
+        self.split_hands += sum(set.set_number == 1 for set in p_record.sets)
+
+    def get_split_rate(self) -> float:
+        """
+        the fraction of the hands which are split at least once
+        """
+        return self.split_hands / self.hands if self.hands else 0.0
+
+    def get_splits_per_hand(self) -> float:
+        return self.splits / self.hands if self.hands else 0.0
+
+
+class Histogram:
+    """
+    The counts of the values of the records in fixed bins of [low, high), and of the
+    values below and above them
+    """
+
+    low: float
+    high: float
+    counts: List[int]
+    underflow: int
+    overflow: int
+
+    def __init__(
+        self,
+        p_get_values: Callable[[RoundRecord], Iterable[float]],
+        p_low: float,
+        p_high: float,
+        p_number_of_bins: int,
+    ) -> None:
+        if not p_low < p_high or p_number_of_bins < 1:
+            raise Exception("A histogram needs a range and at least one bin.")
+        self.get_values = p_get_values
+        self.low = p_low
+        self.high = p_high
+        self.counts = [0] * p_number_of_bins
+        self.underflow = 0
+        self.overflow = 0
+        self._scale = p_number_of_bins / (p_high - p_low)
+
+    def update(self, p_record: RoundRecord):
+        for value in self.get_values(p_record):
+            if value < self.low:
+                self.underflow += 1
+            elif value >= self.high:
+                self.overflow += 1
+            else:
+                # the rounding may put a value just below high past the last bin
+                index = int((value - self.low) * self._scale)
+                self.counts[min(index, len(self.counts) - 1)] += 1
+
+    def get_bin_edges(self) -> List[float]:
+        width = (self.high - self.low) / len(self.counts)
+        return [self.low + width * i for i in range(len(self.counts) + 1)]
+
+
+if __name__ == "__main__":
+    number_of_rounds = 100000
+    players = [Player(p_name=f"Player {i}", p_capital=number_of_rounds * 10) for i in range(3)]
+    game = HeadlessGame(p_players=players, p_rng=random.Random(21))
+
+    start = time.perf_counter()
+    returns, busts, splits, points = drain(
+        play_rounds(game, [HitBelow(17) for _ in players], number_of_rounds),
+        MeanVariance(get_set_returns),
+        BustRateByUpcard(),
+        SplitFrequency(),
+        Histogram(get_set_points, 2, 32, 30),
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"{number_of_rounds:,} rounds in {elapsed:.1f}s")
+    print(f"return per set {returns.mean:+.4f} ± {returns.get_standard_error():.4f}")
+    print(f"variance {returns.get_variance():.4f}")
+    print(f"bank bust rate by upcard {busts.get_bust_rates()}")
+    print(f"splits per hand {splits.get_splits_per_hand():.4f}")
+    print(f"set totals from 2 {points.counts}, over 31: {points.overflow}")
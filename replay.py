@@ -0,0 +1,82 @@
+"""
+The deterministic replay of an event log (see `event_log`).
+
+`replay(events, offset)` rebuilds the `Game`, its players and their sets as they were
+after the first `offset` events of a log. Every round starts with the capitals of its
+players, so only the events since the start of the last round before the offset are
+applied, whatever the length of the log. The log holds the card codes only, so a game of
+other rules (see `rules.RuleSet`) is replayed with the same rules.
+
+    with EventLogReader("game.log") as events:
+        game = replay(events, p_offset=len(events))
+"""
+from typing import Sequence
+
+from event_log import BANK_SEAT, Event, EventTypes
+from rules import RuleSet
+from twenty_one import Game, Player, Set, States, User
+
+
+def find_round_start(p_events: Sequence[Event], p_offset: int) -> int:
+    """
+    the index of the last ROUND event before the offset
+    """
+    get_type = getattr(p_events, "get_type", None)
+    for index in range(min(p_offset, len(p_events)) - 1, -1, -1):
+        type = get_type(index) if get_type else p_events[index].type
+        if type == EventTypes.ROUND:
+            return index
+    raise Exception("There is no round before this offset.")
+
+
+def apply_event(p_game: Game, p_event: Event):
+    """
+    applies one event of the current round to the state of the game
+    """
+    type = p_event.type
+    if type == EventTypes.CAPITAL:
+        p_game.players[p_event.seat].capital = p_event.amount
+        return
+
+    if p_event.seat == BANK_SEAT:
+        user: User = p_game.bank
+    else:
+        user = p_game.players[p_event.seat]
+    set = user.sets[p_event.set_number]
+
+    if type == EventTypes.DEAL or type == EventTypes.HIT:
+        set.append_card(p_game.rules.cards[p_event.code])
+    elif type == EventTypes.BET:
+        user.capital -= p_event.amount
+        set.bet_amount += p_event.amount
+    elif type == EventTypes.STAND:
+        set.state = States.STAND
+    elif type == EventTypes.SPLIT:
+        user.sets.append(Set())
+        user.sets[-1].append_card(set.pop_card())
+        user.sets[-1].bet_amount = p_event.amount
+        user.capital -= p_event.amount
+    elif type == EventTypes.SETTLE:
+        user.capital += p_event.amount
+        set.bet_amount = 0
+    else:
+        raise Exception(f"Unknown event type {type}.")
+
+
+def replay(p_events: Sequence[Event], p_offset: int, p_rules: RuleSet = None) -> Game:
+    """
+    the game after the first p_offset events; its players are named after their seats
+    and it plays by the rules of the recorded game (the default ones if none are given)
+    """
+    start = find_round_start(p_events, p_offset)
+    round_event = p_events[start]
+
+    players = [
+        Player(p_name=f"Seat {seat}", p_capital=0) for seat in range(round_event.amount)
+    ]
+    game = Game(p_players=players, p_verbose=False, p_rules=p_rules)
+    game.round_id = round_event.round_id
+
+    for index in range(start + 1, min(p_offset, len(p_events))):
+        apply_event(game, p_events[index])
+    return game
@@ -0,0 +1,345 @@
+"""
+A bot player which chooses its actions by playing the rest of the round many times.
+
+Every decision starts from a snapshot of the real game (see `Game.snapshot`) and plays
+rollouts on a game of its own: the remaining cards of the shoe are dealt in a random
+order (the bot does not peek at the real order), the sets are split by `Player.do_split`
+and the bank plays by `phase_6__bank_hits_until_bust_or_stand`, as they are the same
+engine. The bot's own decisions along a rollout form a search tree (UCB1 on the
+decisions which have been seen, a default policy after them), and the tree is kept for
+the next decisions of the same round, so a decision after a hit starts with the
+statistics the previous rollouts gathered for it.
+
+The rollouts run until the time budget (5 ms by default) or the rollout budget is spent;
+with an executor they are fanned out to its workers and merged. Every job sends the
+snapshot and the policies to its worker and its statistics back, which takes a few
+milliseconds with a process pool, so a decision is only fanned out with at least
+FAN_OUT_MIN_BUDGET seconds (e.g. a tournament bot) and plays its rollouts in its own
+process otherwise. A thread pool costs less but its workers share the GIL.
+
+    strategy = RolloutStrategy(p_time_budget=0.005)
+    game.play_round(p_strategies=[strategy])
+"""
+import math
+import random
+import time
+from array import array
+from concurrent.futures import Executor
+from typing import Dict, List, Tuple
+
+from headless import HeadlessGame
+from rules import DEFAULT_RULES, RuleSet
+from shoe import Shoe
+from strategies import HitBelow
+from twenty_one import Action, Game, GameSnapshot, Player, Set, Strategy
+
+# the exploration constant of UCB1, in units of the bet
+EXPLORATION = 1.4
+
+# the least time budget of a decision which is fanned out to the executor
+FAN_OUT_MIN_BUDGET = 0.05
+
+# the statistics of the decisions: key -> action -> [rollouts, total reward]
+Stats = Dict[tuple, Dict[Action, List[float]]]
+
+
+class SampledShoe(Shoe):
+    """
+    A shoe which deals its remaining cards in a random order, with one swap per card
+    """
+
+    def get_a_random_card(self):
+        index = self.current_card_index
+        remaining = len(self.codes) - index
+        if remaining > 1:
+            codes = self.codes
+            other = index + int(self.rng.random() * remaining)
+            codes[index], codes[other] = codes[other], codes[index]
+        return super().get_a_random_card()
+
+
+def _get_key(p_seat: int, p_player: Player, p_set_number: int) -> tuple:
+    """
+    the key of a decision in the tree; by the points of the set and not by its cards, so
+    the suits do not spread the statistics, and by the seat, so the seats which share a
+    strategy do not share their decisions
+    """
+    set = p_player.sets[p_set_number]
+    pair_point = set.cards[0].point if set.can_split() else None
+    return (
+        p_seat,
+        p_set_number,
+        len(p_player.sets),
+        set.hard_points,
+        set.is_soft(),
+        pair_point,
+    )
+
+
+def _get_actions(p_player: Player, p_set: Set) -> List[Action]:
+    if p_player.can_split(p_set):
+        return [Action.HIT, Action.STAND, Action.SPLIT]
+    return [Action.HIT, Action.STAND]
+
+
+class RolloutSearch:
+    """
+    Plays the rollouts of the decisions of a player on a game of its own
+    """
+
+    game: HeadlessGame
+    stats: Stats
+    rollout_policy: Strategy
+    others_policy: Strategy
+
+    def __init__(
+        self,
+        p_number_of_players: int,
+        p_rng: random.Random,
+        p_rollout_policy: Strategy,
+        p_others_policy: Strategy,
+        p_rules: RuleSet = DEFAULT_RULES,
+    ) -> None:
+        players = [
+            Player(p_name=f"Rollout {i}", p_capital=0) for i in range(p_number_of_players)
+        ]
+        self.game = HeadlessGame(
+            p_players=players,
+            p_shoe=SampledShoe(p_rng=p_rng, p_cards=p_rules.cards),
+            p_rules=p_rules,
+        )
+        self.rng = p_rng
+        self.stats = {}
+        self.rollout_policy = p_rollout_policy
+        self.others_policy = p_others_policy
+
+    def run(
+        self,
+        p_snapshot: GameSnapshot,
+        p_player_number: int,
+        p_deadline: float,
+        p_max_rollouts: int = None,
+    ) -> int:
+        """
+        plays rollouts until the deadline (of time.perf_counter) or the most rollouts;
+        at least one per action of the decision, which are tried first
+        """
+        # the bot's own copy of the shoe, as the rollouts deal it in a random order
+        codes = array("b", p_snapshot.shoe.codes)
+
+        number_of_rollouts = 0
+        while number_of_rollouts < len(Action) or (
+            (p_max_rollouts is None or number_of_rollouts < p_max_rollouts)
+            and time.perf_counter() < p_deadline
+        ):
+            self._rollout(p_snapshot, p_player_number, codes)
+            number_of_rollouts += 1
+        return number_of_rollouts
+
+    def _select(self, p_key: tuple, p_player: Player, p_set: Set) -> Action:
+        """
+        the untried actions first, then by UCB1
+        """
+        node = self.stats[p_key]
+        for action in _get_actions(p_player, p_set):
+            if action not in node:
+                node[action] = [0, 0.0]
+                return action
+
+        log_visits = math.log(sum(visits for visits, _ in node.values()))
+        return max(
+            node,
+            key=lambda action: node[action][1] / node[action][0]
+            + EXPLORATION * math.sqrt(log_visits / node[action][0]),
+        )
+
+    def _rollout(self, p_snapshot: GameSnapshot, p_player_number: int, p_codes: array):
+        game = self.game
+        game.restore(p_snapshot)
+        game.shoe.codes = p_codes
+
+        player = game.players[p_player_number]
+        capital = player.capital
+        # the rewards are in units of the initial bet
+        unit = max(player.sets[0].bet_amount, 1)
+
+        # the decisions of the bot in the tree, until a new one is added
+        path = []
+        is_in_tree = True
+        turn = game.get_turn()
+        while turn is not None:
+            player_number, set_number = turn
+            turn_player = game.players[player_number]
+            set = turn_player.sets[set_number]
+
+            if player_number != p_player_number:
+                action = self.others_policy.choose_action(game, turn_player, set)
+            elif is_in_tree:
+                key = _get_key(player_number, turn_player, set_number)
+                if key not in self.stats:
+                    self.stats[key] = {}
+                    is_in_tree = False
+                action = self._select(key, turn_player, set)
+                path.append((key, action))
+            else:
+                action = self.rollout_policy.choose_action(game, turn_player, set)
+
+            game.phase_4__take_action_for_player(turn_player, action)
+            turn = game.get_turn()
+
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+
+        reward = (player.capital - capital) / unit
+        for key, action in path:
+            action_stats = self.stats[key][action]
+            action_stats[0] += 1
+            action_stats[1] += reward
+
+
+def run_rollouts(
+    p_snapshot: GameSnapshot,
+    p_player_number: int,
+    p_time_budget: float,
+    p_max_rollouts: int,
+    p_seed: int,
+    p_rollout_policy: Strategy,
+    p_others_policy: Strategy,
+    p_rules: RuleSet = DEFAULT_RULES,
+) -> Tuple[Stats, int]:
+    """
+    the statistics and the number of the rollouts of a worker, which starts with an
+    empty tree
+    """
+    search = RolloutSearch(
+        len(p_snapshot.capitals),
+        random.Random(p_seed),
+        p_rollout_policy,
+        p_others_policy,
+        p_rules,
+    )
+    number_of_rollouts = search.run(
+        p_snapshot, p_player_number, time.perf_counter() + p_time_budget, p_max_rollouts
+    )
+    return search.stats, number_of_rollouts
+
+
+class RolloutStrategy:
+    """
+    chooses the action with the best mean reward of its rollouts
+    """
+
+    time_budget: float
+    max_rollouts: int
+    executor: Executor
+    number_of_jobs: int
+    number_of_rollouts: int
+
+    def __init__(
+        self,
+        p_time_budget: float = 0.005,
+        p_max_rollouts: int = None,
+        p_rng: random.Random = None,
+        p_rollout_policy: Strategy = None,
+        p_others_policy: Strategy = None,
+        p_executor: Executor = None,
+        p_number_of_jobs: int = 2,
+    ) -> None:
+        self.time_budget = p_time_budget
+        self.max_rollouts = p_max_rollouts
+        self.rng = random.Random() if p_rng is None else p_rng
+        self.rollout_policy = HitBelow(17) if p_rollout_policy is None else p_rollout_policy
+        self.others_policy = HitBelow(17) if p_others_policy is None else p_others_policy
+        self.executor = p_executor
+        self.number_of_jobs = p_number_of_jobs
+        # the rollouts of the last decision
+        self.number_of_rollouts = 0
+
+        self._search: RolloutSearch = None
+        self._round: Tuple[int, int] = None
+
+    def reseed(self, p_seed: int):
+        """
+        restarts the random stream of the rollouts, e.g. in each shard of a tournament
+        """
+        self.rng.seed(p_seed)
+        self._search = None
+
+    def _get_search(self, p_game: Game) -> RolloutSearch:
+        # the tree is kept for the decisions of the same round of the same game
+        round = (id(p_game), p_game.round_id)
+        if (
+            self._search is None
+            or self._round != round
+            or len(self._search.game.players) != len(p_game.players)
+        ):
+            self._search = RolloutSearch(
+                len(p_game.players),
+                self.rng,
+                self.rollout_policy,
+                self.others_policy,
+                p_game.rules,
+            )
+            self._round = round
+        return self._search
+
+    def choose_action(self, p_game: Game, p_player: Player, p_set: Set) -> Action:
+        deadline = time.perf_counter() + self.time_budget
+        search = self._get_search(p_game)
+        snapshot = p_game.snapshot()
+        player_number = p_game.players.index(p_player)
+
+        if self.executor is None or self.time_budget < FAN_OUT_MIN_BUDGET:
+            self.number_of_rollouts = search.run(
+                snapshot, player_number, deadline, self.max_rollouts
+            )
+        else:
+            self._fan_out(search, snapshot, player_number, deadline)
+
+        key = _get_key(player_number, p_player, p_player.sets.index(p_set))
+        node = search.stats.get(key, {})
+        return max(
+            _get_actions(p_player, p_set),
+            key=lambda action: node[action][1] / node[action][0]
+            if node.get(action, (0,))[0]
+            else -math.inf,
+        )
+
+    def _fan_out(
+        self,
+        p_search: RolloutSearch,
+        p_snapshot: GameSnapshot,
+        p_player_number: int,
+        p_deadline: float,
+    ):
+        # the workers get what is left of the budget, less a margin for merging
+        time_budget = max((p_deadline - time.perf_counter()) * 0.8, 0.0)
+        max_rollouts = None
+        if self.max_rollouts is not None:
+            max_rollouts = -(-self.max_rollouts // self.number_of_jobs)
+
+        futures = [
+            self.executor.submit(
+                run_rollouts,
+                p_snapshot,
+                p_player_number,
+                time_budget,
+                max_rollouts,
+                self.rng.getrandbits(64),
+                self.rollout_policy,
+                self.others_policy,
+                p_search.game.rules,
+            )
+            for _ in range(self.number_of_jobs)
+        ]
+
+        self.number_of_rollouts = 0
+        for future in futures:
+            stats, number_of_rollouts = future.result()
+            self.number_of_rollouts += number_of_rollouts
+            for key, node in stats.items():
+                merged = p_search.stats.setdefault(key, {})
+                for action, (visits, total) in node.items():
+                    action_stats = merged.setdefault(action, [0, 0.0])
+                    action_stats[0] += visits
+                    action_stats[1] += total
@@ -0,0 +1,99 @@
+"""
+The variants of the rules of the 21 game.
+
+A `RuleSet` holds what can vary between tables: the points of the face cards and of the
+ace, the points the bank stands on, the most splits of a player and the players per
+deck. It is compiled once into the flat tables the engine indexes directly: the point
+of each symbol, the 52 cards with those points (flyweights shared by the rule sets with
+the same points) and whether the bank hits on each total.
+
+    rules = RuleSet(p_face_points=(10, 10, 10), p_bank_stand_points=18)
+    game = Game(p_players=players, p_rules=rules)
+"""
+from typing import Dict, List, Optional, Tuple
+
+from cards import Card, Symbols
+from twenty_one_cards import CARDS, POINT_VALUES, SYMBOL_POINTS, generate_cards
+
+# the most points a set can have without busting
+BLACKJACK_POINTS = 21
+
+# the cards of each compiled symbol points
+_CARDS: Dict[tuple, List[Card]] = {tuple(SYMBOL_POINTS.items()): CARDS}
+
+
+class RuleSet:
+    """
+    A variant of the rules and its lookup tables
+
+    face_points: the points of J, Q and K
+    ace_points: the points of the ace, high (soft) and low (hard)
+    bank_stand_points: the bank hits below these points and stands on them or more
+    max_splits: the most splits of a player in a round; None for no limit
+    players_per_deck: the shoe of a game has a deck for every this many players, and one
+    """
+
+    face_points: Tuple[int, int, int]
+    ace_points: Tuple[int, int]
+    bank_stand_points: int
+    max_splits: Optional[int]
+    players_per_deck: int
+
+    symbol_points: Dict[Symbols, Tuple[int, Optional[int]]]
+    cards: List[Card]
+    bank_hits: Tuple[bool, ...]
+
+    def __init__(
+        self,
+        p_face_points: Tuple[int, int, int] = (1, 2, 3),
+        p_ace_points: Tuple[int, int] = (11, 1),
+        p_bank_stand_points: int = 17,
+        p_max_splits: Optional[int] = None,
+        p_players_per_deck: int = 4,
+    ) -> None:
+        if not all(point in POINT_VALUES for point in (*p_face_points, *p_ace_points)):
+            raise Exception(
+                f"The points should be from {POINT_VALUES[0]} to {POINT_VALUES[-1]}."
+            )
+        if p_ace_points[0] < p_ace_points[1]:
+            raise Exception("The high point of the ace should not be less than the low one.")
+        if p_max_splits is not None and p_max_splits < 0:
+            raise Exception("The most splits should not be negative.")
+        if p_players_per_deck < 1:
+            raise Exception("There should be at least one player per deck.")
+
+        self.face_points = tuple(p_face_points)
+        self.ace_points = tuple(p_ace_points)
+        self.bank_stand_points = p_bank_stand_points
+        self.max_splits = p_max_splits
+        self.players_per_deck = p_players_per_deck
+
+        # an ace with a single point is a usual card
+        high, low = self.ace_points
+        symbol_points = dict(SYMBOL_POINTS)
+        symbol_points[Symbols.ACE] = (high, low) if high != low else (high, None)
+        faces = (Symbols.JACK, Symbols.QUEEN, Symbols.KING)
+        for symbol, point in zip(faces, self.face_points):
+            symbol_points[symbol] = (point, None)
+        self.symbol_points = symbol_points
+
+        key = tuple(symbol_points.items())
+        if key not in _CARDS:
+            _CARDS[key] = generate_cards(symbol_points)
+        self.cards = _CARDS[key]
+
+        # indexed by the total points of an open set, which is at most BLACKJACK_POINTS
+        self.bank_hits = tuple(
+            total < p_bank_stand_points for total in range(BLACKJACK_POINTS + 1)
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"RuleSet(face_points={self.face_points}, ace_points={self.ace_points}, "
+            f"bank_stand_points={self.bank_stand_points}, max_splits={self.max_splits}, "
+            f"players_per_deck={self.players_per_deck})"
+        )
+
+
+# the rules of the game as in README.md
+DEFAULT_RULES = RuleSet()
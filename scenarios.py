@@ -0,0 +1,209 @@
+"""
+A table-driven runner of scripted rounds for checking the rules against large corpora.
+
+A scenario scripts the cards of a round, the bet and the actions of every seat and the
+capitals the seats should end up with. The scenarios are loaded from a JSON file (a list
+of objects) or a CSV file (one row per scenario) with the same fields:
+
+    name       e.g. "bank bust"
+    cards      the symbols in the order they are dealt, e.g. "A 10 4 6 6 7"
+    bets       one per seat, e.g. "100 100"
+    actions    per seat, separated by "|"; H/hit, S/stand and P/split, e.g. "H S | P H S H S"
+    capitals   (optional) one per seat; 1000 each by default
+    expected   the capitals after the round, one per seat
+
+In JSON, the fields can also be lists (and the actions a list per seat). A round plays its
+phases headlessly; the actions of a seat are taken on its sets in order, so an action with
+no open set left, an invalid split, an open set left at the end or a round which needs
+more cards than the script has are failures just like an unexpected capital. The shoe
+has enough decks for the cards of the script.
+
+    python3 scenarios.py scenarios.json --workers 4
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Union
+
+from cards import Suits, Symbols
+from headless import HeadlessGame
+from rules import DEFAULT_RULES
+from shoe import Shoe
+from twenty_one import Action, Player
+
+DEFAULT_CAPITAL = 1000
+
+ACTIONS = {
+    "h": Action.HIT,
+    "hit": Action.HIT,
+    "s": Action.STAND,
+    "stand": Action.STAND,
+    "p": Action.SPLIT,
+    "split": Action.SPLIT,
+}
+
+
+class Scenario(NamedTuple):
+    name: str
+    symbols: List[Symbols]
+    bets: List[int]
+    actions: List[List[Action]]
+    capitals: List[int]
+    expected_capitals: List[int]
+
+
+class Failure(NamedTuple):
+    name: str
+    message: str
+
+
+class ScenarioReport(NamedTuple):
+    number_of_scenarios: int
+    failures: List[Failure]
+
+    def summary(self) -> str:
+        lines = [f"{failure.name}: {failure.message}" for failure in self.failures]
+        lines.append(
+            f"{self.number_of_scenarios} scenarios, {len(self.failures)} failures"
+        )
+        return "\n".join(lines)
+
+
+def _split(p_field: Union[str, list]) -> list:
+    if isinstance(p_field, str):
+        return p_field.split()
+    return list(p_field)
+
+
+def parse_scenario(p_record: dict) -> Scenario:
+    """
+    a scenario out of a JSON object or a CSV row
+    """
+    actions = p_record["actions"]
+    if isinstance(actions, str):
+        actions = actions.split("|")
+    actions = [[ACTIONS[str(action).lower()] for action in _split(seat)] for seat in actions]
+
+    bets = [int(bet) for bet in _split(p_record["bets"])]
+    capitals = [int(capital) for capital in _split(p_record.get("capitals") or [])]
+    if not capitals:
+        capitals = [DEFAULT_CAPITAL] * len(bets)
+
+    scenario = Scenario(
+        name=str(p_record.get("name", "")),
+        symbols=[Symbols(str(symbol).upper()) for symbol in _split(p_record["cards"])],
+        bets=bets,
+        actions=actions,
+        capitals=capitals,
+        expected_capitals=[int(capital) for capital in _split(p_record["expected"])],
+    )
+    number_of_seats = len(scenario.bets)
+    if not all(
+        len(field) == number_of_seats
+        for field in (scenario.actions, scenario.capitals, scenario.expected_capitals)
+    ):
+        raise Exception(f"The seats of the scenario {scenario.name!r} do not match.")
+    return scenario
+
+
+def load_scenarios(p_path: str) -> List[Scenario]:
+    """
+    the scenarios of a JSON or a CSV file
+    """
+    with open(p_path, newline="") as file:
+        if p_path.lower().endswith(".csv"):
+            records = list(csv.DictReader(file))
+        else:
+            records = json.load(file)
+    return [parse_scenario(record) for record in records]
+
+
+def run_scenario(p_scenario: Scenario) -> Optional[str]:
+    """
+    plays the round of a scenario; the reason of its failure or None if it passes
+    """
+    players = [
+        Player(p_name=f"Seat {seat}", p_capital=capital)
+        for seat, capital in enumerate(p_scenario.capitals)
+    ]
+    # the decks of the table, or more if the script has more cards of a symbol than they do
+    number_of_decks = max(
+        [len(players) // DEFAULT_RULES.players_per_deck + 1]
+        + [math.ceil(count / len(Suits)) for count in Counter(p_scenario.symbols).values()]
+    )
+    game = HeadlessGame(p_players=players, p_shoe=Shoe(p_number_of_decks=number_of_decks))
+    game.set_what_cards_to_reveal(p_symbols=p_scenario.symbols)
+
+    game.phase_1__start()
+    for player, bet in zip(players, p_scenario.bets):
+        game.phase_2__place_bet(player, bet)
+    game.phase_3__give_players_the_second_card()
+
+    for seat, (player, actions) in enumerate(zip(players, p_scenario.actions)):
+        for number, action in enumerate(actions):
+            set_number = player.get_open_set_number()
+            if set_number is None:
+                return f"seat {seat} has no open set for its action {number + 1}"
+            if action is Action.SPLIT and not player.can_split(player.sets[set_number]):
+                return f"seat {seat} can not split its set {set_number} (action {number + 1})"
+            game.phase_4__take_action_for_player(player, action)
+        if player.get_open_set_number() is not None:
+            return f"seat {seat} has an open set after its actions"
+
+    game.phase_5__reveals_banks_second_card()
+    game.phase_6__bank_hits_until_bust_or_stand()
+
+    if game.shoe.current_card_index > len(p_scenario.symbols):
+        return "the round needs more cards than the scenario has"
+    capitals = [player.capital for player in players]
+    if capitals != p_scenario.expected_capitals:
+        return f"capitals {capitals}, expected {p_scenario.expected_capitals}"
+    return None
+
+
+def _run_chunk(p_scenarios: List[Scenario]) -> List[Failure]:
+    failures = []
+    for scenario in p_scenarios:
+        try:
+            message = run_scenario(scenario)
+        except Exception as error:
+            message = f"{type(error).__name__}: {error}"
+        if message is not None:
+            failures.append(Failure(scenario.name, message))
+    return failures
+
+
+def run_scenarios(
+    p_scenarios: List[Scenario], p_number_of_workers: int = 1, p_chunk_size: int = 1000
+) -> ScenarioReport:
+    """
+    runs the scenarios in this process, or in chunks on a pool of processes
+    """
+    if p_number_of_workers <= 1:
+        return ScenarioReport(len(p_scenarios), _run_chunk(p_scenarios))
+
+    chunks = [
+        p_scenarios[start : start + p_chunk_size]
+        for start in range(0, len(p_scenarios), p_chunk_size)
+    ]
+    failures = []
+    with ProcessPoolExecutor(max_workers=p_number_of_workers) as executor:
+        # executor.map yields the chunks in their order
+        for chunk_failures in executor.map(_run_chunk, chunks):
+            failures += chunk_failures
+    return ScenarioReport(len(p_scenarios), failures)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="runs the scripted rounds of a file")
+    parser.add_argument("path", help="a JSON or CSV file of scenarios")
+    parser.add_argument("--workers", type=int, default=1)
+    arguments = parser.parse_args()
+
+    report = run_scenarios(load_scenarios(arguments.path), arguments.workers)
+    print(report.summary())
+    sys.exit(1 if report.failures else 0)
@@ -0,0 +1,28 @@
+"""
+The splitting of a master seed into independent random streams.
+
+The seed of a stream is a hash of the master seed and of the path of the stream, e.g.
+(table name, shard index) or (table name, round number), so any number of processes can
+derive their streams without coordination, and a stream is found again from its path
+alone (e.g. to replay a round of a huge parallel simulation).
+
+    rng = make_rng(21, "table 1", 7)
+    game = Game(p_players=players, p_rng=rng)
+"""
+import hashlib
+import random
+
+
+def derive_seed(p_master_seed: int, *p_path) -> int:
+    """
+    a 128-bit seed which only depends on the master seed and the path
+    """
+    key = repr((p_master_seed,) + p_path).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), "little")
+
+
+def make_rng(p_master_seed: int, *p_path) -> random.Random:
+    """
+    a random stream of its own for the path
+    """
+    return random.Random(derive_seed(p_master_seed, *p_path))
@@ -0,0 +1,458 @@
+"""
+An asyncio server which hosts many concurrent tables of the 21 game.
+
+The clients speak newline-delimited JSON over TCP or a Unix socket; one object per line.
+
+client to server:
+    {"op": "join", "table": "t1", "name": "Alice", "capital": 1000}
+    {"op": "bet", "amount": 100}
+    {"op": "hit"} / {"op": "stand"} / {"op": "split"}
+    {"op": "leave"}
+
+server to client:
+    {"event": "joined", "table": "t1"}
+    {"event": "state", "bank": {...}, "players": [...]}    after every step of a round
+    {"event": "bet_request", "capital": 1000, "timeout": 10.0}
+    {"event": "action_request", "set": 0, "timeout": 10.0}
+    {"event": "result", "capital": 1100}
+    {"event": "error", "message": "..."}
+
+Every table plays its rounds in its own task and waits for its players with a timeout:
+a player who does not bet in time bets nothing (and is not dealt in) and one who does not
+act in time stands, so a slow client never holds up the other tables (or for long, its
+own table). The messages to a client are written by a task of its seat from a bounded
+outbox; a client which does not read them in time is dropped. A table ends once its last
+player has left.
+
+    python3 server.py --port 2121
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+from typing import Dict, List, MutableSet
+
+from rules import DEFAULT_RULES, RuleSet
+from seeds import make_rng
+from shoe import Shoe
+from twenty_one import Action, Game, Player, Set
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = {"hit": Action.HIT, "stand": Action.STAND, "split": Action.SPLIT}
+
+# the most messages waiting to be written to a client
+OUTBOX_SIZE = 256
+
+
+def _describe_set(p_set: Set) -> dict:
+    return {
+        "cards": [str(card) for card in p_set.cards],
+        "points": p_set.get_total_points(),
+        "state": p_set.state,
+        "bet": p_set.bet_amount,
+    }
+
+
+class Seat:
+    """
+    A connected player at a table
+
+    The messages to the client are put in a bounded outbox which a task of the seat
+    writes out and drains with a timeout, so a slow reader does not make the table wait;
+    a client whose outbox gets full or which does not read in time is dropped.
+    """
+
+    player: Player
+    writer: asyncio.StreamWriter
+    timeout: float
+    messages: asyncio.Queue
+    outbox: asyncio.Queue
+    has_left: bool
+
+    def __init__(
+        self, p_player: Player, p_writer: asyncio.StreamWriter, p_timeout: float
+    ) -> None:
+        self.player = p_player
+        self.writer = p_writer
+        self.timeout = p_timeout
+        self.messages = asyncio.Queue()
+        self.outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self.has_left = False
+        self._writer_task = asyncio.create_task(self._write())
+
+    def send(self, p_message: dict):
+        if self.has_left:
+            return
+        try:
+            self.outbox.put_nowait(p_message)
+        except asyncio.QueueFull:
+            logger.info("%s does not read its messages and is dropped.", self.player.name)
+            self.drop()
+
+    async def _write(self):
+        try:
+            while not self.writer.is_closing():
+                # the messages which are waiting are written at once
+                messages = [await self.outbox.get()]
+                while not self.outbox.empty():
+                    messages.append(self.outbox.get_nowait())
+                self.writer.write(
+                    b"".join(json.dumps(message).encode() + b"\n" for message in messages)
+                )
+                # nothing to drain if the socket has taken it all
+                if self.writer.transport.get_write_buffer_size():
+                    await asyncio.wait_for(self.writer.drain(), self.timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            logger.info("%s does not read its messages in time and is dropped.", self.player.name)
+            self.drop()
+
+    def drop(self):
+        """
+        leaves the table and closes the connection, which ends the client's handler
+        """
+        self.has_left = True
+        self.messages.put_nowait(None)
+        self.writer.close()
+
+    def close(self):
+        self._writer_task.cancel()
+
+    def clear_messages(self):
+        while not self.messages.empty():
+            self.messages.get_nowait()
+
+    async def receive(self, p_ops: List[str], p_deadline: float) -> dict:
+        """
+        the next message with one of the ops, or None once the deadline has passed
+        """
+        loop = asyncio.get_running_loop()
+        while not self.has_left:
+            try:
+                message = await asyncio.wait_for(
+                    self.messages.get(), max(p_deadline - loop.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                return None
+            if message is None:
+                return None
+            if message.get("op") in p_ops:
+                return message
+            self.send({"event": "error", "message": f"Expected one of {p_ops}."})
+        return None
+
+
+class Table:
+    """
+    A table which wraps a game and plays its rounds for the seated players
+    """
+
+    name: str
+    action_timeout: float
+    max_seats: int
+    game: Game
+    seats: List[Seat]
+    waiting_seats: List[Seat]
+    is_closed: bool
+
+    def __init__(
+        self,
+        p_name: str,
+        p_action_timeout: float,
+        p_max_seats: int,
+        p_rng: random.Random = None,
+        p_rules: RuleSet = None,
+    ) -> None:
+        self.name = p_name
+        self.action_timeout = p_action_timeout
+        self.max_seats = p_max_seats
+
+        # the shoe is sized for a full table, as the players come and go
+        rules = DEFAULT_RULES if p_rules is None else p_rules
+        shoe = Shoe(
+            p_number_of_decks=(p_max_seats // rules.players_per_deck) + 1,
+            p_rng=p_rng,
+            p_cards=rules.cards,
+        )
+        self.game = Game(p_players=[], p_verbose=False, p_shoe=shoe, p_rules=rules)
+        self.seats = []
+        self.waiting_seats = []
+        self.is_closed = False
+
+    def join(self, p_seat: Seat):
+        if self.is_closed:
+            raise Exception(f"The table {self.name} is closed.")
+        if len(self.seats) + len(self.waiting_seats) >= self.max_seats:
+            raise Exception(f"The table {self.name} is full.")
+
+        # a player who joins during a round plays from the next round on
+        p_seat.player.verbose = False
+        p_seat.player.max_splits = self.game.rules.max_splits
+        self.waiting_seats.append(p_seat)
+
+    def leave(self, p_seat: Seat):
+        p_seat.has_left = True
+        p_seat.messages.put_nowait(None)
+        if p_seat in self.waiting_seats:
+            self.waiting_seats.remove(p_seat)
+
+    def broadcast(self, p_message: dict):
+        for seat in self.seats:
+            seat.send(p_message)
+
+    def broadcast_state(self):
+        bank = self.game.bank
+        self.broadcast(
+            {
+                "event": "state",
+                "bank": _describe_set(bank.sets[0]),
+                "players": [
+                    {
+                        "name": seat.player.name,
+                        "capital": seat.player.capital,
+                        # the players who have not bet are not dealt in
+                        "sets": [_describe_set(set) for set in seat.player.sets]
+                        if seat.player in self.game.players
+                        else [],
+                    }
+                    for seat in self.seats
+                ],
+            }
+        )
+
+    async def run(self):
+        """
+        plays the rounds until the last player has left
+        """
+        while True:
+            self.seats = [seat for seat in self.seats if not seat.has_left]
+            self.seats += self.waiting_seats
+            self.waiting_seats = []
+            if not self.seats:
+                self.is_closed = True
+                return
+
+            await self.play_round()
+
+    async def _ask_bet(self, p_seat: Seat) -> int:
+        loop = asyncio.get_running_loop()
+        p_seat.clear_messages()
+        p_seat.send(
+            {
+                "event": "bet_request",
+                "capital": p_seat.player.capital,
+                "timeout": self.action_timeout,
+            }
+        )
+        message = await p_seat.receive(["bet"], loop.time() + self.action_timeout)
+        if message is None:
+            return 0
+
+        amount = message.get("amount")
+        if not isinstance(amount, int) or not 0 <= amount <= p_seat.player.capital:
+            p_seat.send({"event": "error", "message": "Invalid bet amount; no bet."})
+            return 0
+        return amount
+
+    async def _ask_action(self, p_seat: Seat, p_set_number: int) -> Action:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.action_timeout
+        set = p_seat.player.sets[p_set_number]
+
+        p_seat.clear_messages()
+        p_seat.send(
+            {"event": "action_request", "set": p_set_number, "timeout": self.action_timeout}
+        )
+        while True:
+            message = await p_seat.receive(list(ACTIONS), deadline)
+            # an idle (or gone) player stands
+            if message is None:
+                return Action.STAND
+
+            action = ACTIONS[message["op"]]
+            if action is Action.SPLIT and not p_seat.player.can_split(set):
+                p_seat.send({"event": "error", "message": "This set can not be split."})
+                continue
+            return action
+
+    async def play_round(self):
+        game = self.game
+        game.players = [seat.player for seat in self.seats]
+        game.reset()
+
+        # the bets are asked from all the players at once, and only the ones who bet play
+        amounts = await asyncio.gather(*(self._ask_bet(seat) for seat in self.seats))
+        playing_seats = [seat for seat, amount in zip(self.seats, amounts) if amount > 0]
+        game.players = [seat.player for seat in playing_seats]
+        if not playing_seats:
+            return
+
+        game.phase_1__start()
+        for seat, amount in zip(self.seats, amounts):
+            if amount > 0:
+                game.phase_2__place_bet(seat.player, amount)
+
+        game.phase_3__give_players_the_second_card()
+        self.broadcast_state()
+
+        # the actions are asked player by player and set by set
+        turn = game.get_turn()
+        while turn is not None:
+            seat_number, set_number = turn
+            seat = playing_seats[seat_number]
+            action = await self._ask_action(seat, set_number)
+            game.phase_4__take_action_for_player(seat.player, action)
+            self.broadcast_state()
+            turn = game.get_turn()
+
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+        self.broadcast_state()
+        for seat in self.seats:
+            seat.send({"event": "result", "capital": seat.player.capital})
+
+
+class TableServer:
+    """
+    Accepts the clients and creates the tables on demand
+
+    With a seed, the shoe of each table shuffles with a stream derived from the seed and
+    the table's name, so the tables are reproducible and do not depend on each other.
+    All the tables play by the same rules.
+    """
+
+    action_timeout: float
+    max_seats: int
+    seed: int
+    rules: RuleSet
+    tables: Dict[str, Table]
+
+    def __init__(
+        self,
+        p_action_timeout: float = 10.0,
+        p_max_seats: int = 3,
+        p_seed: int = None,
+        p_rules: RuleSet = None,
+    ) -> None:
+        self.action_timeout = p_action_timeout
+        self.max_seats = p_max_seats
+        self.seed = p_seed
+        self.rules = DEFAULT_RULES if p_rules is None else p_rules
+        self.tables = {}
+        self._table_tasks: MutableSet[asyncio.Task] = set()
+        self._server: asyncio.AbstractServer = None
+
+    def get_table(self, p_name: str) -> Table:
+        table = self.tables.get(p_name)
+        # a table which has just ended is replaced by a new one
+        if table is None or table.is_closed:
+            rng = None if self.seed is None else make_rng(self.seed, "table", p_name)
+            table = self.tables[p_name] = Table(
+                p_name, self.action_timeout, self.max_seats, rng, self.rules
+            )
+            task = asyncio.create_task(self._run_table(table))
+            self._table_tasks.add(task)
+            task.add_done_callback(self._table_tasks.discard)
+        return table
+
+    async def _run_table(self, p_table: Table):
+        try:
+            await p_table.run()
+        finally:
+            if self.tables.get(p_table.name) is p_table:
+                del self.tables[p_table.name]
+
+    async def start_tcp(self, p_host: str = "127.0.0.1", p_port: int = 0) -> int:
+        """
+        starts listening and returns the port (e.g. the one chosen for p_port=0)
+        """
+        self._server = await asyncio.start_server(self.handle_client, p_host, p_port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start_unix(self, p_path: str):
+        self._server = await asyncio.start_unix_server(self.handle_client, p_path)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        tasks = list(self._table_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def handle_client(
+        self, p_reader: asyncio.StreamReader, p_writer: asyncio.StreamWriter
+    ):
+        seat = None
+        table = None
+
+        async def send(p_message: dict):
+            # once seated, the messages are queued in order with the ones of the table
+            if seat is not None:
+                seat.send(p_message)
+            else:
+                p_writer.write(json.dumps(p_message).encode() + b"\n")
+                await p_writer.drain()
+
+        try:
+            async for line in p_reader:
+                try:
+                    message = json.loads(line)
+                    op = message["op"]
+                except (ValueError, TypeError, KeyError):
+                    await send({"event": "error", "message": "Invalid message."})
+                    continue
+
+                if op == "leave":
+                    break
+                elif op == "join":
+                    if seat is not None:
+                        await send({"event": "error", "message": "Already at a table."})
+                        continue
+                    try:
+                        player = Player(
+                            p_name=str(message.get("name", "Player")),
+                            p_capital=int(message.get("capital", 1000)),
+                        )
+                        table = self.get_table(str(message.get("table", "")))
+                        seat = Seat(player, p_writer, self.action_timeout)
+                        table.join(seat)
+                    except Exception as error:
+                        if seat is not None:
+                            seat.close()
+                        seat = None
+                        await send({"event": "error", "message": str(error)})
+                        continue
+                    await send({"event": "joined", "table": table.name})
+                elif seat is None:
+                    await send({"event": "error", "message": "Join a table first."})
+                else:
+                    seat.messages.put_nowait(message)
+        except ConnectionError:
+            logger.info("A client of table %s got disconnected.", table and table.name)
+        finally:
+            if seat is not None:
+                table.leave(seat)
+                seat.close()
+            p_writer.close()
+
+
+async def _serve(p_arguments):
+    server = TableServer(p_action_timeout=p_arguments.timeout, p_seed=p_arguments.seed)
+    if p_arguments.unix:
+        await server.start_unix(p_arguments.unix)
+    else:
+        await server.start_tcp(p_arguments.host, p_arguments.port)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="serves the 21 game's tables")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2121)
+    parser.add_argument("--unix", help="a Unix socket path to listen on instead")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per action")
+    parser.add_argument("--seed", type=int, help="makes the shuffles of the tables reproducible")
+    asyncio.run(_serve(parser.parse_args()))
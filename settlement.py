@@ -0,0 +1,128 @@
+"""
+An append-only ledger of the settlements of the sets.
+
+`Game.evaluate` settles every set of every player against the bank in one pass; with a
+ledger (`game.ledger = SettlementLedger()`) each settlement is appended to it as
+(round id, seat, set index, bet, payout). The ledger keeps a column per field and the
+totals of every round as it goes, so a round is reconciled against the capitals without
+walking its sets again.
+
+    game.ledger = SettlementLedger()
+    game.play_round(p_strategies=strategies)
+    bets, payouts = game.ledger.get_round_totals(game.round_id)
+"""
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Protocol, Tuple
+
+
+class Settlement(NamedTuple):
+    round_id: int
+    seat: int
+    set_number: int
+    bet_amount: int
+    payout: int
+
+
+class Ledger(Protocol):
+    """
+    Receives the settlements of a game (see `Game.ledger`)
+    """
+
+    def append(
+        self,
+        p_round_id: int,
+        p_seat: int,
+        p_set_number: int,
+        p_bet_amount: int,
+        p_payout: int,
+    ):
+        ...
+
+
+class SettlementLedger:
+    """
+    The settlements of the sets of a game, in the order they are made
+
+    The rounds are appended one after another; a round can not be reopened.
+    """
+
+    round_ids: array
+    seats: array
+    set_numbers: array
+    bet_amounts: array
+    payouts: array
+
+    def __init__(self) -> None:
+        self.round_ids = array("q")
+        self.seats = array("q")
+        self.set_numbers = array("q")
+        self.bet_amounts = array("q")
+        self.payouts = array("q")
+        # round id -> [first index, last index + 1, total bets, total payouts]
+        self._rounds: Dict[int, List[int]] = {}
+        self._last_round_id = None
+
+    def append(
+        self,
+        p_round_id: int,
+        p_seat: int,
+        p_set_number: int,
+        p_bet_amount: int,
+        p_payout: int,
+    ):
+        if p_round_id != self._last_round_id:
+            if p_round_id in self._rounds:
+                raise Exception(f"The round {p_round_id} is already settled.")
+            self._rounds[p_round_id] = [len(self.round_ids), len(self.round_ids), 0, 0]
+            self._last_round_id = p_round_id
+
+        self.round_ids.append(p_round_id)
+        self.seats.append(p_seat)
+        self.set_numbers.append(p_set_number)
+        self.bet_amounts.append(p_bet_amount)
+        self.payouts.append(p_payout)
+
+        round = self._rounds[p_round_id]
+        round[1] += 1
+        round[2] += p_bet_amount
+        round[3] += p_payout
+
+    def __len__(self) -> int:
+        return len(self.round_ids)
+
+    def __getitem__(self, p_index: int) -> Settlement:
+        return Settlement(
+            self.round_ids[p_index],
+            self.seats[p_index],
+            self.set_numbers[p_index],
+            self.bet_amounts[p_index],
+            self.payouts[p_index],
+        )
+
+    def __iter__(self) -> Iterator[Settlement]:
+        return map(
+            Settlement,
+            self.round_ids,
+            self.seats,
+            self.set_numbers,
+            self.bet_amounts,
+            self.payouts,
+        )
+
+    def get_round(self, p_round_id: int) -> List[Settlement]:
+        """
+        the settlements of a round; none if it is not in the ledger
+        """
+        if p_round_id not in self._rounds:
+            return []
+        start, stop, _, _ = self._rounds[p_round_id]
+        return [self[index] for index in range(start, stop)]
+
+    def get_round_totals(self, p_round_id: int) -> Tuple[int, int]:
+        """
+        the total bets and the total payouts of a round
+        """
+        if p_round_id not in self._rounds:
+            return 0, 0
+        _, _, bet_amounts, payouts = self._rounds[p_round_id]
+        return bet_amounts, payouts
@@ -0,0 +1,268 @@
+"""
+The long-lived shoe which the game draws the cards from across rounds.
+"""
+import math
+import random
+import re
+from array import array
+from typing import List, NamedTuple, Tuple
+
+from cards import Card, Suits, Symbols
+from twenty_one_cards import TwentyOneCards, CARDS, DECK_CODES, POINT_VALUES, get_composition
+
+# the point values which the count tags as low and as high cards; the others count 0
+LOW_COUNT_POINTS = range(1, 7)
+HIGH_COUNT_POINTS = range(10, 12)
+
+
+def get_count_tags(p_cards: List[Card] = CARDS) -> Tuple[int, ...]:
+    """
+    the count tag of each point value (see POINT_VALUES) for the points of a rule set: the
+    low cards count + and the high ones -, in the ratio which balances a deck to 0; nothing
+    counts if a deck has no low or no high cards
+    """
+    composition = get_composition(DECK_CODES, p_cards)
+    lows = sum(composition[point - 1] for point in LOW_COUNT_POINTS)
+    highs = sum(composition[point - 1] for point in HIGH_COUNT_POINTS)
+    if lows == 0 or highs == 0:
+        return (0,) * len(POINT_VALUES)
+
+    divisor = math.gcd(lows, highs)
+    return tuple(
+        highs // divisor
+        if point in LOW_COUNT_POINTS
+        else -lows // divisor
+        if point in HIGH_COUNT_POINTS
+        else 0
+        for point in POINT_VALUES
+    )
+
+
+# the count tags of the default rules: the low cards (J, Q, K and 2 to 6) count +1 and the
+# tens and aces -4; 7 to 9 count 0
+COUNT_TAGS = get_count_tags()
+
+# the code of each (symbol, suit), and a pattern which matches the codes of each symbol
+_CODES = {(card.symbol, card.suit): card.code for card in CARDS}
+_SYMBOL_PATTERNS = {
+    symbol: re.compile(
+        b"[" + re.escape(bytes(card.code for card in CARDS if card.symbol is symbol)) + b"]"
+    )
+    for symbol in Symbols
+}
+
+
+class ShoeSnapshot(NamedTuple):
+    """
+    the position in a shoe; the buffer of the codes is shared, not copied
+    """
+
+    codes: array
+    cut_card_index: int
+    current_card_index: int
+    counts: Tuple[int, ...]
+    running_count: int
+
+
+class Shoe:
+    """
+    A shuffled pack of some decks with a cut card
+
+    The shoe is reshuffled between rounds once the cut card is reached (see
+    `Game.reset`); if a round runs out of cards it is reshuffled right away, so
+    drawing a card never fails.
+
+    The remaining cards of each point value and the running count of the dealt cards are
+    kept up to date on every draw, so they are known without recounting the shoe. The count
+    is balanced for the points of the shoe's cards (see `get_count_tags`).
+
+    The shoe shuffles with a random stream of its own, so the shoes of different games
+    never interfere; pass a seeded one (see `seeds.make_rng`) to make it reproducible.
+    It deals the cards of a rule set (see `rules.RuleSet.cards`), CARDS by default.
+    """
+
+    rng: random.Random
+    cards: List[Card]
+    codes: array
+    number_of_decks: int
+    penetration: float
+    cut_card_index: int
+    current_card_index: int
+    counts: List[int]
+    running_count: int
+
+    def __init__(
+        self,
+        p_number_of_decks: int = 1,
+        p_penetration: float = 0.75,
+        p_rng: random.Random = None,
+        p_cards: List[Card] = CARDS,
+    ) -> None:
+        if not 0 < p_penetration <= 1:
+            raise Exception("Penetration should be more than 0 and at most 1.")
+
+        self.rng = random.Random() if p_rng is None else p_rng
+        self.cards = p_cards
+        # the index of the point value and the count tag of each card code
+        self._point_indices = bytes(card.point - 1 for card in p_cards)
+        tags = COUNT_TAGS if p_cards is CARDS else get_count_tags(p_cards)
+        self._tags = tuple(tags[card.point - 1] for card in p_cards)
+        self.number_of_decks = p_number_of_decks
+        self.penetration = p_penetration
+        self.codes = TwentyOneCards(
+            do_shuffle=True, p_number_of_decks=p_number_of_decks, p_rng=self.rng
+        ).codes
+        self.cut_card_index = int(len(self.codes) * p_penetration)
+        self.current_card_index = 0
+        self._reset_counts()
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _reset_counts(self):
+        self.counts = list(get_composition(self.codes, self.cards))
+        self.running_count = 0
+
+    def reshuffle(self):
+        # a new buffer, as the snapshots share the old one
+        codes = array("b", self.codes)
+        self.rng.shuffle(codes)
+        self.codes = codes
+        # a cut card placed by load is for the loaded cards only
+        self.cut_card_index = int(len(codes) * self.penetration)
+        self.current_card_index = 0
+        self._reset_counts()
+
+    def snapshot(self) -> ShoeSnapshot:
+        """
+        the position in the shoe; the codes are never changed in place, so it stays valid
+        """
+        return ShoeSnapshot(
+            self.codes,
+            self.cut_card_index,
+            self.current_card_index,
+            tuple(self.counts),
+            self.running_count,
+        )
+
+    def restore(self, p_snapshot: ShoeSnapshot):
+        self.codes = p_snapshot.codes
+        self.cut_card_index = p_snapshot.cut_card_index
+        self.current_card_index = p_snapshot.current_card_index
+        self.counts = list(p_snapshot.counts)
+        self.running_count = p_snapshot.running_count
+
+    def load(self, p_codes: array, p_cut_card_index: int = None):
+        """
+        Replaces the cards with the given ones in the given order (e.g. for scripted rounds);
+        the cut card is at the end unless its index is given, until the next reshuffle
+        """
+        self.codes = p_codes
+        self.cut_card_index = len(p_codes) if p_cut_card_index is None else p_cut_card_index
+        self.current_card_index = 0
+        self._reset_counts()
+
+    def is_cut_card_reached(self) -> bool:
+        return self.current_card_index >= self.cut_card_index
+
+    def get_a_random_card(self) -> Card:
+        if self.current_card_index >= len(self.codes):
+            self.reshuffle()
+
+        code = self.codes[self.current_card_index]
+        self.current_card_index += 1
+        self.counts[self._point_indices[code]] -= 1
+        self.running_count += self._tags[code]
+        return self.cards[code]
+
+    def get_number_of_remaining_cards(self) -> int:
+        return len(self.codes) - self.current_card_index
+
+    def get_composition(self) -> Tuple[int, ...]:
+        """
+        the remaining cards of each point value (see `twenty_one_cards.get_composition`)
+        """
+        return tuple(self.counts)
+
+    def get_true_count(self) -> float:
+        """
+        the running count per remaining deck
+        """
+        remaining_decks = self.get_number_of_remaining_cards() / len(DECK_CODES)
+        if remaining_decks == 0:
+            return 0.0
+        return self.running_count / remaining_decks
+
+
+class ScriptedShoeBuilder:
+    """
+    Builds a shoe which starts with some chosen cards, out of the cards of another shoe
+
+    Every chosen card is a distinct card of the shoe: the first one of its symbol (or of
+    its symbol and suit) which is not taken yet. The shoe is searched as bytes from a
+    cursor per symbol and per card code, so it is scanned at most once per symbol however
+    many cards are chosen. The rest of the shoe follows the chosen cards in its own
+    (shuffled) order, so a scripted round can not run out of cards. The cards are the
+    ones of the shoe's rules (e.g. `shoe.cards`).
+    """
+
+    codes: array
+    cards: List[Card]
+    script: array
+
+    def __init__(self, p_codes: array, p_cards: List[Card] = CARDS) -> None:
+        self.codes = p_codes
+        self.cards = p_cards
+        self.script = array("b")
+        self._data = p_codes.tobytes()
+        self._taken_positions = set()
+        # the positions before these have been searched already
+        self._symbol_cursors = {}
+        self._code_cursors = {}
+
+    def take(self, p_symbol: Symbols, p_suit: Suits = None) -> Card:
+        """
+        appends a card of the symbol (and of the suit, if given) to the script
+        """
+        if p_suit is None:
+            search = _SYMBOL_PATTERNS[p_symbol].search
+            position = self._symbol_cursors.get(p_symbol, 0)
+            while True:
+                match = search(self._data, position)
+                if match is None:
+                    raise Exception(f"There is no {p_symbol.value} left in the shoe.")
+                position = match.start()
+                if position not in self._taken_positions:
+                    break
+                position += 1
+            self._symbol_cursors[p_symbol] = position + 1
+        else:
+            code = _CODES[p_symbol, p_suit]
+            position = self._code_cursors.get(code, 0)
+            while True:
+                position = self._data.find(code, position)
+                if position < 0:
+                    raise Exception(
+                        f"There is no {p_symbol.value}{p_suit.value} left in the shoe."
+                    )
+                if position not in self._taken_positions:
+                    break
+                position += 1
+            self._code_cursors[code] = position + 1
+
+        self._taken_positions.add(position)
+        code = self.codes[position]
+        self.script.append(code)
+        return self.cards[code]
+
+    def build(self, p_rng: random.Random = None) -> array:
+        """
+        the codes of the script followed by the rest of the cards of the shoe; those are
+        shuffled again only with a given random stream, e.g. if the shoe was not shuffled
+        """
+        remainder = array("b", self.codes)
+        for position in sorted(self._taken_positions, reverse=True):
+            del remainder[position]
+        if p_rng is not None:
+            p_rng.shuffle(remainder)
+        return self.script + remainder
@@ -0,0 +1,284 @@
+"""
+An exact solver of the optimal strategy for the rules of this 21 game.
+
+For a given shoe composition (see `twenty_one_cards.get_composition`) it computes the
+expected value of HIT, STAND and SPLIT for every player hand against every bank upcard,
+per unit of the initial bet. The card probabilities are taken from the composition and
+are not depleted by the cards of the hand (the usual infinite-shoe assumption), which
+makes every value a memoized recursion over a compact hand state:
+(hard points, has an ace). With a `bank_table.BankTable` the bank's odds are the exact
+ones of the composition instead.
+
+As in the engine (`rules.DEFAULT_RULES`), the splits have no limit by default. The
+recursion of the splits is then cut at UNLIMITED_SPLITS_DEPTH splits; a deeper split
+needs one more pair, so the value it leaves out is far below the precision of the table.
+
+Run `python3 solver.py` to print the strategy table of a single deck.
+"""
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from bank_table import (
+    ACE_POINT,
+    BANK_BUST,
+    BANK_FINAL_TOTALS,
+    BANK_MAX_HIT_POINTS,
+    BankTable,
+)
+from rules import DEFAULT_RULES
+from twenty_one import Action, BLACKJACK_POINTS, SOFT_ACE_EXTRA_POINTS
+from twenty_one_cards import DECK_CODES, POINT_VALUES, get_composition
+
+# the splits of a hand which are solved when the splits have no limit
+UNLIMITED_SPLITS_DEPTH = 12
+
+
+class Hand(NamedTuple):
+    """
+    the key of a player hand in the strategy table
+
+    pair_point is the point of the two cards of a hand which can be split
+    """
+
+    total: int
+    is_soft: bool
+    pair_point: Optional[int]
+
+
+def _total(p_hard_points: int, p_has_ace: bool) -> int:
+    if p_has_ace and p_hard_points + SOFT_ACE_EXTRA_POINTS <= BLACKJACK_POINTS:
+        return p_hard_points + SOFT_ACE_EXTRA_POINTS
+    return p_hard_points
+
+
+def _hard_point(p_point: int) -> int:
+    return 1 if p_point == ACE_POINT else p_point
+
+
+class Solver:
+    """
+    The expected values of the actions for a shoe composition
+
+    max_splits is the limit of the rules (None for no limit) and splits_depth the number
+    of splits which are solved. As in `Player.can_split`, the limit is on the splits of
+    a player in a round, shared by all of its sets.
+    """
+
+    composition: Tuple[int, ...]
+    probabilities: Tuple[Tuple[int, float], ...]
+    max_splits: Optional[int]
+    splits_depth: int
+    bank_table: BankTable
+
+    def __init__(
+        self,
+        p_composition: Tuple[int, ...],
+        p_max_splits: Optional[int] = DEFAULT_RULES.max_splits,
+        p_bank_table: BankTable = None,
+    ) -> None:
+        number_of_cards = sum(p_composition)
+        if number_of_cards == 0:
+            raise Exception("The composition has no cards.")
+
+        # (point, probability) of the next card
+        self.probabilities = tuple(
+            (point, count / number_of_cards)
+            for point, count in zip(POINT_VALUES, p_composition)
+            if count
+        )
+        self.composition = tuple(p_composition)
+        self.max_splits = p_max_splits
+        self.splits_depth = UNLIMITED_SPLITS_DEPTH if p_max_splits is None else p_max_splits
+        self.bank_table = p_bank_table
+
+        self.bank_outcomes = lru_cache(maxsize=None)(self._bank_outcomes)
+        self.stand_value = lru_cache(maxsize=None)(self._stand_value)
+        self.best_value = lru_cache(maxsize=None)(self._best_value)
+        self.split_sets_value = lru_cache(maxsize=None)(self._split_sets_value)
+        self.two_cards_value = lru_cache(maxsize=None)(self._two_cards_value)
+
+    def _bank_outcomes(self, p_hard_points: int, p_has_ace: bool) -> Tuple[float, ...]:
+        """
+        the probabilities of the bank's final totals (see BANK_FINAL_TOTALS and BANK_BUST)
+        """
+        outcomes = [0.0] * (len(BANK_FINAL_TOTALS) + 1)
+
+        total = _total(p_hard_points, p_has_ace)
+        if total > BLACKJACK_POINTS:
+            outcomes[BANK_BUST] = 1.0
+        elif total > BANK_MAX_HIT_POINTS:
+            outcomes[total - BANK_FINAL_TOTALS[0]] = 1.0
+        else:
+            for point, probability in self.probabilities:
+                next_outcomes = self.bank_outcomes(
+                    p_hard_points + _hard_point(point), p_has_ace or point == ACE_POINT
+                )
+                for i, next_probability in enumerate(next_outcomes):
+                    outcomes[i] += probability * next_probability
+
+        return tuple(outcomes)
+
+    def _stand_value(self, p_total: int, p_upcard: int) -> float:
+        if p_total > BLACKJACK_POINTS:
+            return -1.0
+
+        # the player wins if the bank busts or has less points; the ties go to the bank
+        if self.bank_table is None:
+            outcomes = self.bank_outcomes(_hard_point(p_upcard), p_upcard == ACE_POINT)
+        else:
+            outcomes = self.bank_table.get_outcomes(self.composition, p_upcard)
+        win = outcomes[BANK_BUST] + sum(
+            probability
+            for bank_total, probability in zip(BANK_FINAL_TOTALS, outcomes)
+            if bank_total < p_total
+        )
+        return 2 * win - 1
+
+    def hit_value(self, p_hard_points: int, p_has_ace: bool, p_upcard: int) -> float:
+        value = 0.0
+        for point, probability in self.probabilities:
+            value += probability * self.best_value(
+                p_hard_points + _hard_point(point),
+                p_has_ace or point == ACE_POINT,
+                p_upcard,
+            )
+        return value
+
+    def _best_value(self, p_hard_points: int, p_has_ace: bool, p_upcard: int) -> float:
+        """
+        the value of a hand which can not be split, by standing or hitting
+        """
+        if p_hard_points > BLACKJACK_POINTS:
+            return -1.0
+
+        return max(
+            self.stand_value(_total(p_hard_points, p_has_ace), p_upcard),
+            self.hit_value(p_hard_points, p_has_ace, p_upcard),
+        )
+
+    def _split_sets_value(
+        self, p_point: int, p_upcard: int, p_number_of_sets: int, p_splits_left: int
+    ) -> float:
+        """
+        the value of the sets which are left with one card of the point after the splits,
+        played one after another; they share the splits left of the player, so a split of
+        one set leaves fewer to the sets after it
+        """
+        if p_number_of_sets == 0:
+            return 0.0
+
+        rest = self.split_sets_value(p_point, p_upcard, p_number_of_sets - 1, p_splits_left)
+        hit = 0.0
+        for point, probability in self.probabilities:
+            hard_points = _hard_point(p_point) + _hard_point(point)
+            has_ace = ACE_POINT in (p_point, point)
+            value = self.best_value(hard_points, has_ace, p_upcard) + rest
+            if point == p_point and p_splits_left > 0:
+                value = max(
+                    value,
+                    self.split_sets_value(
+                        p_point, p_upcard, p_number_of_sets + 1, p_splits_left - 1
+                    ),
+                )
+            hit += probability * value
+        return max(self.stand_value(p_point, p_upcard) + rest, hit)
+
+    def split_value(self, p_point: int, p_upcard: int, p_splits_left: int) -> float:
+        """
+        both sets of a split keep the original bet, hence the value of two sets
+        """
+        return self.split_sets_value(p_point, p_upcard, 2, p_splits_left - 1)
+
+    def _two_cards_value(
+        self, p_first_point: int, p_second_point: int, p_upcard: int, p_splits_left: int
+    ) -> float:
+        hard_points = _hard_point(p_first_point) + _hard_point(p_second_point)
+        has_ace = ACE_POINT in (p_first_point, p_second_point)
+        value = self.best_value(hard_points, has_ace, p_upcard)
+        if p_first_point == p_second_point and p_splits_left > 0:
+            value = max(value, self.split_value(p_first_point, p_upcard, p_splits_left))
+        return value
+
+    def action_values(self, p_hand: Hand, p_upcard: int) -> Dict[Action, float]:
+        """
+        the expected value of each possible action of a hand against an upcard
+        """
+        hard_points = p_hand.total
+        if p_hand.is_soft:
+            hard_points -= SOFT_ACE_EXTRA_POINTS
+
+        values = {
+            Action.STAND: self.stand_value(p_hand.total, p_upcard),
+            Action.HIT: self.hit_value(hard_points, p_hand.is_soft, p_upcard),
+        }
+        if p_hand.pair_point is not None and self.splits_depth > 0:
+            values[Action.SPLIT] = self.split_value(
+                p_hand.pair_point, p_upcard, self.splits_depth
+            )
+        return values
+
+    def solve(self) -> Dict[Tuple[Hand, int], Dict[Action, float]]:
+        """
+        the action values of every two-card hand (and every larger hard and soft total)
+        against every upcard
+        """
+        hands = set()
+        for first_point in POINT_VALUES:
+            for second_point in POINT_VALUES:
+                hard_points = _hard_point(first_point) + _hard_point(second_point)
+                has_ace = ACE_POINT in (first_point, second_point)
+                total = _total(hard_points, has_ace)
+                pair_point = first_point if first_point == second_point else None
+                hands.add(Hand(total, total != hard_points, pair_point))
+
+        # the hands which can only be reached by hitting
+        for total in range(2, BLACKJACK_POINTS + 1):
+            hands.add(Hand(total, False, None))
+        for total in range(12, BLACKJACK_POINTS + 1):
+            hands.add(Hand(total, True, None))
+
+        return {
+            (hand, upcard): self.action_values(hand, upcard)
+            for hand in sorted(hands, key=lambda hand: (hand.pair_point or 0, hand))
+            for upcard in POINT_VALUES
+        }
+
+
+def strategy_table(
+    p_solution: Dict[Tuple[Hand, int], Dict[Action, float]]
+) -> Dict[Tuple[Hand, int], Action]:
+    """
+    the best action of each (hand, upcard) of a solution
+    """
+    return {key: max(values, key=values.get) for key, values in p_solution.items()}
+
+
+def format_strategy_table(p_table: Dict[Tuple[Hand, int], Action]) -> str:
+    """
+    one line per hand and one column per upcard; H, S and P for hit, stand and split
+    """
+    letters = {Action.HIT: "H", Action.STAND: "S", Action.SPLIT: "P"}
+    upcards = list(POINT_VALUES)
+    hands = sorted({hand for hand, _ in p_table}, key=lambda hand: (hand.pair_point or 0, hand))
+
+    lines = ["hand    " + " ".join(f"{'A' if u == ACE_POINT else u:>2}" for u in upcards)]
+    for hand in hands:
+        if hand.pair_point is not None:
+            name = f"{'A' if hand.pair_point == ACE_POINT else hand.pair_point}-pair"
+        else:
+            name = f"{'soft' if hand.is_soft else 'hard'}{hand.total}"
+        lines.append(
+            f"{name:<8}" + " ".join(f"{letters[p_table[hand, u]]:>2}" for u in upcards)
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    solution = Solver(get_composition(DECK_CODES)).solve()
+    elapsed = time.perf_counter() - start
+
+    print(format_strategy_table(strategy_table(solution)))
+    print(f"solved {len(solution)} (hand, upcard) pairs in {elapsed * 1000:.0f} ms")
@@ -0,0 +1,80 @@
+"""
+The built-in player strategies (see `twenty_one.Strategy`) for playing without input().
+"""
+import random
+from typing import Dict, Tuple
+
+from solver import Hand
+from twenty_one import Action, Game, Player, Set
+
+
+class AlwaysStand:
+    """
+    stands on every set
+    """
+
+    def choose_action(self, p_game: Game, p_player: Player, p_set: Set) -> Action:
+        return Action.STAND
+
+
+class HitBelow:
+    """
+    hits until the set has at least the given points, like the bank does with 17
+    """
+
+    points: int
+
+    def __init__(self, p_points: int = 17) -> None:
+        self.points = p_points
+
+    def choose_action(self, p_game: Game, p_player: Player, p_set: Set) -> Action:
+        return Action.HIT if p_set.get_total_points() < self.points else Action.STAND
+
+
+class TableLookup:
+    """
+    looks the action up by the set and the bank's upcard (e.g. in a `solver.strategy_table`)
+
+    The sets which are not in the table are played by the fallback strategy.
+    """
+
+    table: Dict[Tuple[Hand, int], Action]
+
+    def __init__(self, p_table: Dict[Tuple[Hand, int], Action], p_fallback=None) -> None:
+        self.table = p_table
+        self.fallback = HitBelow() if p_fallback is None else p_fallback
+
+    def choose_action(self, p_game: Game, p_player: Player, p_set: Set) -> Action:
+        hand = Hand(
+            total=p_set.get_total_points(),
+            is_soft=p_set.is_soft(),
+            pair_point=p_set.cards[0].point if p_player.can_split(p_set) else None,
+        )
+        upcard = p_game.bank.sets[0].cards[0].point
+
+        action = self.table.get((hand, upcard))
+        if action is None:
+            return self.fallback.choose_action(p_game, p_player, p_set)
+        return action
+
+
+class RandomStrategy:
+    """
+    chooses one of the possible actions at random
+    """
+
+    rng: random.Random
+
+    def __init__(self, p_rng: random.Random = None) -> None:
+        self.rng = random.Random() if p_rng is None else p_rng
+
+    def reseed(self, p_seed: int):
+        """
+        restarts the random stream, e.g. in each shard of a tournament
+        """
+        self.rng.seed(p_seed)
+
+    def choose_action(self, p_game: Game, p_player: Player, p_set: Set) -> Action:
+        if p_player.can_split(p_set):
+            return self.rng.choice([Action.HIT, Action.STAND, Action.SPLIT])
+        return self.rng.choice([Action.HIT, Action.STAND])
@@ -1,7 +1,70 @@
+import asyncio
+import itertools
+import json
+import os
+import pickle
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from twenty_one import Game, States, Action, Player
-from cards import Symbols
+# the simulators need NumPy; their tests are skipped without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from twenty_one import Game, States, Action, Player, Set
+from twenty_one_cards import CARDS, TwentyOneCards, DECK_CODES, POINT_VALUES, get_composition
+from solver import Solver, Hand, strategy_table
+from bank_table import BankTable
+from benchmarks import BENCHMARKS, IMPORT_TIME_BUDGET, check_budgets, compare
+from instrumentation import GameInstrumentation
+from server import OUTBOX_SIZE, Seat, TableServer
+from tournament import replay_round, run_tournament
+from seeds import derive_seed, make_rng
+from strategies import AlwaysStand, HitBelow, TableLookup, RandomStrategy
+from shoe import COUNT_TAGS, ScriptedShoeBuilder, Shoe
+from headless import HeadlessGame
+from cards import Suits, Symbols
+from event_log import EventLogReader, EventLogWriter, EventTypes
+from replay import replay
+from scenarios import load_scenarios, parse_scenario, run_scenarios
+from rollout import FAN_OUT_MIN_BUDGET, RolloutStrategy
+from settlement import Settlement, SettlementLedger
+from rules import DEFAULT_RULES, RuleSet
+from pipeline import (
+    BustRateByUpcard,
+    Histogram,
+    MeanVariance,
+    SplitFrequency,
+    compose,
+    drain,
+    get_set_points,
+    get_set_returns,
+    only_seat,
+    play_rounds,
+    where,
+)
+
+if np is not None:
+    from bank_simulator import generate_shoes, simulate_bank_hands, simulate_bank_histograms
+    from bankroll import (
+        NOT_RUINED,
+        OutcomeDistribution,
+        flat_bet,
+        fraction_bet,
+        outcomes_from_changes,
+        outcomes_from_engine,
+        outcomes_from_solver,
+        simulate_bankrolls,
+    )
+
+TOTAL_POINTS = Set.get_total_points
 
 
 class TestGameSinglePlayer(unittest.TestCase):
@@ -315,5 +378,1577 @@ class TestGameSinglePlayer(unittest.TestCase):
         )
 
 
+class TestTwentyOneCards(unittest.TestCase):
+    def test_flyweight_cards(self):
+        shoe = TwentyOneCards(p_number_of_decks=100)
+
+        self.assertEqual(len(shoe), 100 * 52)
+        self.assertEqual(shoe.codes.itemsize, 1)
+        # every card of a symbol and suit is the very same object
+        self.assertEqual(len({id(card) for card in shoe.cards}), 52)
+        self.assertEqual(sorted(shoe.codes), sorted(list(range(52)) * 100))
+
+    def test_points(self):
+        points = {card.symbol: card.point for card in TwentyOneCards().cards}
+
+        self.assertEqual(points[Symbols.ACE], 11)
+        self.assertEqual(points[Symbols.TEN], 10)
+        self.assertEqual(points[Symbols.JACK], 1)
+        self.assertEqual(points[Symbols.QUEEN], 2)
+        self.assertEqual(points[Symbols.KING], 3)
+
+
+class TestShoe(unittest.TestCase):
+    def test_never_runs_out_of_cards(self):
+        shoe = Shoe(p_number_of_decks=1)
+        drawn = [shoe.get_a_random_card() for _ in range(3 * 52)]
+
+        self.assertEqual(len(drawn), 3 * 52)
+        self.assertEqual(sorted(card.code for card in drawn[:52]), list(range(52)))
+
+    def test_reshuffle_at_cut_card(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = Game(p_players=[player], p_verbose=False, p_shoe=Shoe(p_penetration=0.5))
+
+        for _ in range(26):
+            game.get_a_random_card()
+        self.assertTrue(game.shoe.is_cut_card_reached())
+
+        game.reset()
+        self.assertFalse(game.shoe.is_cut_card_reached())
+        self.assertEqual(game.shoe.current_card_index, 0)
+
+    def test_reset_keeps_the_shoe_position(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+
+        game.play_round(p_strategies=[AlwaysStand()], p_bet_amount=1)
+        position = game.shoe.current_card_index
+        game.reset()
+
+        self.assertEqual(game.shoe.current_card_index, position)
+        self.assertEqual(len(player.sets), 1)
+        self.assertEqual(player.sets[0].cards, [])
+        self.assertEqual(game.bank.sets[0].cards, [])
+
+    def test_running_composition_and_count(self):
+        shoe = Shoe(p_number_of_decks=2)
+        self.assertEqual(shoe.get_composition(), get_composition(shoe.codes))
+        self.assertEqual(shoe.running_count, 0)
+
+        for number_of_cards in range(1, 2 * 52 + 1):
+            shoe.get_a_random_card()
+            remaining = shoe.codes[number_of_cards:]
+            self.assertEqual(shoe.get_composition(), get_composition(remaining))
+            self.assertEqual(
+                shoe.running_count, -sum(COUNT_TAGS[CARDS[code].point - 1] for code in remaining)
+            )
+        # the tags of a full shoe sum up to 0
+        self.assertEqual(shoe.running_count, 0)
+        self.assertEqual(shoe.get_true_count(), 0.0)
+
+        shoe.reshuffle()
+        self.assertEqual(shoe.get_composition(), get_composition(DECK_CODES * 2))
+        shoe.get_a_random_card()
+        self.assertEqual(
+            shoe.get_true_count(), shoe.running_count / ((2 * 52 - 1) / 52)
+        )
+
+    def test_count_is_balanced_for_the_rules(self):
+        self.assertEqual(COUNT_TAGS, (1, 1, 1, 1, 1, 1, 0, 0, 0, -4, -4))
+        for rules in (
+            RuleSet(p_face_points=(10, 10, 10)),
+            RuleSet(p_face_points=(4, 5, 10), p_ace_points=(11, 11)),
+            RuleSet(p_face_points=(10, 10, 10), p_ace_points=(9, 1)),
+        ):
+            shoe = Shoe(p_number_of_decks=2, p_cards=rules.cards)
+            for _ in range(len(shoe)):
+                shoe.get_a_random_card()
+            self.assertEqual(shoe.running_count, 0)
+
+
+class TestScriptedShoeBuilder(unittest.TestCase):
+    def test_distinct_cards_then_the_rest(self):
+        shoe = Shoe(p_number_of_decks=2)
+        builder = ScriptedShoeBuilder(shoe.codes)
+        cards = [builder.take(Symbols.SEVEN, Suits.HEART)]
+        cards += [builder.take(Symbols.SEVEN) for _ in range(7)]
+        codes = builder.build()
+
+        self.assertEqual(len(codes), len(shoe.codes))
+        self.assertEqual(sorted(codes), sorted(shoe.codes))
+        self.assertEqual(list(codes[:8]), [card.code for card in cards])
+        # the rest is in the order of the shoe
+        remainder = list(shoe.codes)
+        for card in cards:
+            remainder.remove(card.code)
+        self.assertEqual(list(codes[8:]), remainder)
+        self.assertEqual(len({card.suit for card in cards}), 4)
+        self.assertNotIn(Symbols.SEVEN, [CARDS[code].symbol for code in codes[8:]])
+        with self.assertRaises(Exception):
+            builder.take(Symbols.SEVEN)
+
+    def test_a_suit_taken_twice(self):
+        builder = ScriptedShoeBuilder(DECK_CODES)
+        builder.take(Symbols.ACE, Suits.SPADE)
+        with self.assertRaises(Exception):
+            builder.take(Symbols.ACE, Suits.SPADE)
+        # the ace of spades is not given again by symbol either
+        suits = {builder.take(Symbols.ACE).suit for _ in range(3)}
+        self.assertNotIn(Suits.SPADE, suits)
+
+    def test_cards_of_the_rules(self):
+        rules = RuleSet(p_face_points=(10, 10, 10))
+        shoe = Shoe(p_cards=rules.cards)
+        builder = ScriptedShoeBuilder(shoe.codes, shoe.cards)
+        self.assertIs(builder.take(Symbols.KING), rules.cards[builder.script[0]])
+        self.assertEqual(builder.take(Symbols.JACK).point, 10)
+
+    def test_scripted_round_has_the_whole_shoe(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        game.set_what_cards_to_reveal(p_symbols=[Symbols.TWO, Symbols.THREE, Symbols.TWO])
+
+        self.assertEqual(len(game.shoe), 52)
+        # more cards than scripted; the shoe is reshuffled at the next reset
+        game.play_round(p_strategies=[HitBelow(21)])
+        self.assertEqual(player.sets[0].cards[0].symbol, Symbols.TWO)
+        self.assertTrue(game.shoe.is_cut_card_reached())
+
+    def test_rounds_after_a_scripted_round_use_the_cut_card(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        game.set_what_cards_to_reveal(p_symbols=[Symbols.TWO, Symbols.THREE, Symbols.TWO])
+        game.play_round(p_strategies=[AlwaysStand()])
+
+        reshuffles = 0
+        for _ in range(20):
+            dealt = game.shoe.current_card_index
+            game.play_round(p_strategies=[AlwaysStand()])
+            self.assertEqual(game.shoe.cut_card_index, int(52 * game.shoe.penetration))
+            # a reshuffle starts the shoe over
+            reshuffles += game.shoe.current_card_index <= dealt
+        self.assertLess(reshuffles, 10)
+
+
+class TestSet(unittest.TestCase):
+    def setUp(self) -> None:
+        self.card_by_symbol = {
+            card.symbol: card for card in TwentyOneCards(do_shuffle=False).cards
+        }
+
+    def make_set(self, p_symbols):
+        set = Set()
+        for symbol in p_symbols:
+            set.append_card(self.card_by_symbol[symbol])
+        return set
+
+    def test_total_points_with_aces(self):
+        cases = [
+            ([Symbols.ACE], 11, True),
+            ([Symbols.ACE, Symbols.ACE], 12, True),
+            ([Symbols.ACE, Symbols.ACE, Symbols.KING, Symbols.NINE], 14, False),
+            ([Symbols.ACE, Symbols.ACE, Symbols.ACE, Symbols.ACE, Symbols.SEVEN], 21, True),
+            ([Symbols.ACE, Symbols.TEN, Symbols.TEN], 21, False),
+            ([Symbols.TEN, Symbols.NINE, Symbols.QUEEN, Symbols.ACE], 22, False),
+        ]
+        for symbols, total_points, is_soft in cases:
+            set = self.make_set(symbols)
+            self.assertEqual(set.get_total_points(), total_points, symbols)
+            self.assertEqual(set.is_soft(), is_soft, symbols)
+            self.assertEqual(set.state is States.BUST, total_points > 21, symbols)
+
+    def test_pop_card(self):
+        set = self.make_set([Symbols.ACE, Symbols.ACE])
+        set.pop_card()
+        self.assertEqual(set.get_total_points(), 11)
+        set.pop_card()
+        self.assertEqual(set.get_total_points(), 0)
+        self.assertFalse(set.is_soft())
+
+
+class TestTurnCursor(unittest.TestCase):
+    def test_turns_follow_the_splits(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(2)]
+        game = HeadlessGame(p_players=players)
+        # two eights for the first player, which she splits; the second one holds 10 and 9
+        game.set_what_cards_to_reveal(
+            p_symbols=[
+                Symbols.EIGHT,
+                Symbols.TEN,
+                Symbols.SEVEN,
+                Symbols.EIGHT,
+                Symbols.NINE,
+                Symbols.TWO,
+                Symbols.THREE,
+            ]
+        )
+        game.phase_1__start()
+        game.phase_3__give_players_the_second_card()
+
+        turns = []
+        for action in [Action.SPLIT, Action.HIT, Action.STAND, Action.HIT, Action.STAND]:
+            turns.append(game.get_turn())
+            game.phase_4__take_action_for_player(players[game.get_turn()[0]], action)
+        turns.append(game.get_turn())
+        self.assertFalse(game.check_if_all_players_are_ready())
+
+        game.phase_4__take_action_for_player(players[1], Action.STAND)
+        self.assertEqual(turns, [(0, 0), (0, 0), (0, 0), (0, 1), (0, 1), (1, 0)])
+        self.assertIsNone(game.get_turn())
+        self.assertTrue(game.check_if_all_players_are_ready())
+
+        game.reset()
+        self.assertEqual(game.get_turn(), (0, 0))
+
+    def test_a_bust_set_ends_the_turn(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        game.set_what_cards_to_reveal(
+            p_symbols=[Symbols.TEN, Symbols.SEVEN, Symbols.NINE, Symbols.FIVE]
+        )
+        game.phase_1__start()
+        game.phase_3__give_players_the_second_card()
+        game.phase_4__take_action_for_player(player, Action.HIT)
+
+        self.assertIs(player.sets[0].state, States.BUST)
+        self.assertIsNone(player.get_open_set_number())
+        self.assertTrue(game.check_if_all_players_are_ready())
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_restore_and_try_another_action(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(2)]
+        game = HeadlessGame(p_players=players)
+        # two eights for the first player
+        game.set_what_cards_to_reveal(
+            p_symbols=[Symbols.EIGHT, Symbols.TEN, Symbols.SEVEN, Symbols.EIGHT, Symbols.NINE]
+        )
+        game.phase_1__start()
+        for player in players:
+            game.phase_2__place_bet(player, 100)
+        game.phase_3__give_players_the_second_card()
+
+        snapshot = game.snapshot()
+        before = _describe(game)
+
+        game.phase_4__take_action_for_player(players[0], Action.SPLIT)
+        game.phase_4__take_action_for_player(players[0], Action.HIT)
+        self.assertEqual(len(players[0].sets), 2)
+
+        game.restore(snapshot)
+        self.assertEqual(_describe(game), before)
+        self.assertEqual(game.get_turn(), (0, 0))
+        self.assertEqual(game.shoe.get_composition(), snapshot.shoe.counts)
+        self.assertIs(game.shoe.codes, snapshot.shoe.codes)
+
+        # the same cards come after the restore
+        game.phase_4__take_action_for_player(players[0], Action.SPLIT)
+        game.phase_4__take_action_for_player(players[0], Action.HIT)
+        hit_card = players[0].sets[0].cards[-1]
+        game.restore(snapshot)
+        game.phase_4__take_action_for_player(players[0], Action.HIT)
+        self.assertIs(players[0].sets[0].cards[-1], hit_card)
+
+    def test_snapshot_survives_a_reshuffle(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        game.play_round(p_strategies=[HitBelow(17)])
+        snapshot = game.snapshot()
+        codes = list(game.shoe.codes)
+
+        game.shoe.reshuffle()
+        game.play_round(p_strategies=[HitBelow(17)])
+        self.assertEqual(list(snapshot.shoe.codes), codes)
+
+        game.restore(snapshot)
+        self.assertEqual(list(game.shoe.codes), codes)
+        self.assertEqual(player.capital, snapshot.capitals[0])
+        with self.assertRaises(Exception):
+            HeadlessGame(p_players=[]).restore(snapshot)
+
+    def test_restore_an_unpickled_snapshot(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        game.set_what_cards_to_reveal(p_symbols=[Symbols.TEN, Symbols.SIX, Symbols.TEN])
+        game.phase_1__start()
+        game.phase_2__place_bet(player, 100)
+        game.phase_3__give_players_the_second_card()
+
+        # as in another process; the states are equal but not the same strings
+        game.restore(pickle.loads(pickle.dumps(game.snapshot())))
+        self.assertIs(player.sets[0].state, States.OPEN_TO_HIT)
+        self.assertIs(game.bank.sets[0].state, States.OPEN_TO_HIT)
+        game.phase_4__take_action_for_player(player, Action.STAND)
+        game.phase_5__reveals_banks_second_card()
+        self.assertEqual(len(game.bank.sets[0].cards), 2)
+
+
+class TestHeadlessGame(unittest.TestCase):
+    def test_same_settlement_as_game(self):
+        """
+        Player win, as in test_case_01 but without drawing and logging
+        """
+        player_initial_capital = 1000
+        player = Player(p_name="Player", p_capital=player_initial_capital)
+        game = HeadlessGame(p_players=[player])
+
+        cards_symbols = [
+            Symbols.TEN,
+            Symbols.THREE,
+            Symbols.FOUR,
+            Symbols.THREE,
+            Symbols.QUEEN,
+            Symbols.NINE,
+            Symbols.FIVE,
+        ]
+        game.set_what_cards_to_reveal(p_symbols=cards_symbols)
+
+        bet_amount = 100
+        game.phase_1__start()
+        game.phase_2__place_bet(player, bet_amount)
+        game.phase_3__give_players_the_second_card()
+        game.phase_4__take_action_for_player(player, Action.HIT)
+        game.phase_4__take_action_for_player(player, Action.HIT)
+        game.phase_4__take_action_for_player(player, Action.STAND)
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+
+        self.assertEqual(player.capital, player_initial_capital + bet_amount)
+
+    def test_play_round(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+        game = HeadlessGame(p_players=players)
+
+        strategies = [HitBelow(17) for _ in players]
+        for _ in range(200):
+            game.play_round(p_strategies=strategies, p_bet_amount=1)
+            self.assertTrue(game.check_if_all_players_are_ready())
+            self.assertIsNot(game.bank.sets[0].state, States.OPEN_TO_HIT)
+
+
+@unittest.skipUnless(np, "NumPy is not installed")
+class TestBankSimulator(unittest.TestCase):
+    def test_agrees_with_game(self):
+        """
+        The vectorized bank hands against the scalar path of the game on the same shoes
+        """
+        symbol_by_point = {
+            11: Symbols.ACE,
+            1: Symbols.JACK,
+            2: Symbols.TWO,
+            3: Symbols.THREE,
+            4: Symbols.FOUR,
+            5: Symbols.FIVE,
+            6: Symbols.SIX,
+            7: Symbols.SEVEN,
+            8: Symbols.EIGHT,
+            9: Symbols.NINE,
+            10: Symbols.TEN,
+        }
+        shoes = generate_shoes(p_number_of_shoes=500, p_seed=7)
+        totals = simulate_bank_hands(shoes)
+
+        for shoe, total in zip(shoes.tolist(), totals.tolist()):
+            player = Player(p_name="Player", p_capital=1000)
+            # the player's tens come on top of the cards of a single deck
+            game = HeadlessGame(p_players=[player], p_shoe=Shoe(p_number_of_decks=2))
+            # the player stands on 20 so the bank plays its whole hand
+            game.set_what_cards_to_reveal(
+                p_symbols=[Symbols.TEN, symbol_by_point[shoe[0]], Symbols.TEN]
+                + [symbol_by_point[point] for point in shoe[1:]]
+            )
+            game.phase_1__start()
+            game.phase_2__place_bet(player, 1)
+            game.phase_3__give_players_the_second_card()
+            game.phase_4__take_action_for_player(player, Action.STAND)
+            game.phase_5__reveals_banks_second_card()
+            game.phase_6__bank_hits_until_bust_or_stand()
+            self.assertEqual(game.bank.sets[0].get_total_points(), total)
+
+    def test_histograms(self):
+        shoes = generate_shoes(p_number_of_shoes=10000, p_number_of_decks=2, p_seed=7)
+        histograms = simulate_bank_histograms(shoes)
+
+        self.assertEqual(sorted(histograms), [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
+        self.assertEqual(sum(h.sum() for h in histograms.values()), len(shoes))
+        for histogram in histograms.values():
+            self.assertEqual(histogram[:17].sum(), 0)
+
+
+class TestSolver(unittest.TestCase):
+    def setUp(self) -> None:
+        self.solver = Solver(get_composition(DECK_CODES * 8))
+
+    @unittest.skipUnless(np, "NumPy is not installed")
+    def test_bank_outcomes_agree_with_simulation(self):
+        histograms = simulate_bank_histograms(
+            generate_shoes(p_number_of_shoes=100000, p_number_of_decks=8, p_seed=7)
+        )
+        for upcard, histogram in histograms.items():
+            outcomes = self.solver.bank_outcomes(1 if upcard == 11 else upcard, upcard == 11)
+            self.assertAlmostEqual(sum(outcomes), 1.0)
+            self.assertAlmostEqual(
+                outcomes[-1], histogram[22:].sum() / histogram.sum(), delta=0.015
+            )
+
+    def test_strategy_table(self):
+        solution = self.solver.solve()
+        table = strategy_table(solution)
+
+        self.assertEqual(len({upcard for _, upcard in table}), 11)
+        # standing on 21 never loses against a bank which can not beat it
+        for upcard in range(1, 12):
+            values = solution[Hand(21, False, None), upcard]
+            self.assertGreater(values[Action.STAND], 0)
+            self.assertIs(table[Hand(21, False, None), upcard], Action.STAND)
+            self.assertIs(table[Hand(5, False, None), upcard], Action.HIT)
+            self.assertIn(Action.SPLIT, solution[Hand(12, True, 11), upcard])
+
+    def test_splits_without_limit_as_the_engine(self):
+        self.assertIsNone(self.solver.max_splits)
+        self.assertEqual(self.solver.max_splits, DEFAULT_RULES.max_splits)
+
+        # the splits past the solved ones are worth next to nothing
+        deeper = Solver(self.solver.composition, p_max_splits=self.solver.splits_depth + 4)
+        self.assertAlmostEqual(
+            self.solver.split_value(11, 10, self.solver.splits_depth),
+            deeper.split_value(11, 10, deeper.max_splits),
+            places=6,
+        )
+        values = Solver(self.solver.composition, p_max_splits=0).action_values(
+            Hand(12, True, 11), 10
+        )
+        self.assertNotIn(Action.SPLIT, values)
+
+    def test_splits_limit_is_shared_by_the_sets(self):
+        # a shoe of eights only: every set is a pair of 8 which wins against the bank's
+        # 8, 16 and bust, so the value is the number of sets the limit allows
+        composition = tuple(4 if point == 8 else 0 for point in POINT_VALUES)
+        for max_splits in range(5):
+            solver = Solver(composition, p_max_splits=max_splits)
+            self.assertAlmostEqual(
+                solver.two_cards_value(8, 8, 8, max_splits), max_splits + 1
+            )
+            self.assertAlmostEqual(
+                solver.action_values(Hand(16, False, 8), 8).get(Action.SPLIT, 1.0),
+                max_splits + 1,
+            )
+
+
+class TestBankTable(unittest.TestCase):
+    def test_exact_outcomes(self):
+        composition = get_composition(DECK_CODES)
+        table = BankTable().get_table(composition)
+
+        for outcomes in table:
+            self.assertAlmostEqual(sum(outcomes), 1.0)
+        # with a 10 or an ace in a shoe of only those, the bank stands on 20 or 21
+        only_tens_and_aces = [0] * 9 + [4, 4]
+        outcomes = BankTable().get_outcomes(only_tens_and_aces, 10)
+        self.assertAlmostEqual(outcomes[20 - 17], 0.5)
+        self.assertAlmostEqual(outcomes[21 - 17], 0.5)
+
+    def test_agrees_with_infinite_shoe(self):
+        composition = get_composition(DECK_CODES * 8)
+        solver = Solver(composition)
+        table = BankTable().get_table(composition)
+        for upcard in range(1, 12):
+            expected = solver.bank_outcomes(1 if upcard == 11 else upcard, upcard == 11)
+            for probability, expected_probability in zip(table[upcard - 1], expected):
+                self.assertAlmostEqual(probability, expected_probability, delta=0.01)
+
+    def test_solver_with_exact_bank_odds(self):
+        composition = get_composition(DECK_CODES)
+        solution = Solver(composition, p_bank_table=BankTable()).solve()
+        table = strategy_table(solution)
+
+        for upcard in range(1, 12):
+            self.assertIs(table[Hand(21, False, None), upcard], Action.STAND)
+
+    def test_lru_and_persistence(self):
+        bank_table = BankTable(p_max_size=2)
+        compositions = [get_composition(DECK_CODES * decks) for decks in (1, 2, 3)]
+        for composition in compositions:
+            bank_table.get_table(composition)
+        self.assertEqual(list(bank_table.tables), compositions[1:])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bank_table.json")
+            bank_table.save(path)
+            loaded = BankTable()
+            loaded.load(path)
+        self.assertEqual(loaded.tables, bank_table.tables)
+
+
+class TestStrategies(unittest.TestCase):
+    def setUp(self) -> None:
+        self.players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+        self.game = HeadlessGame(p_players=self.players)
+
+    def test_play_round_with_scripted_cards(self):
+        """
+        The cards of test_case_06 played by a strategy; split, then hit below 17 on both sets
+        """
+        self.game = HeadlessGame(p_players=self.players[:1])
+        self.game.set_what_cards_to_reveal(
+            p_symbols=[
+                Symbols.SEVEN,
+                Symbols.SIX,
+                Symbols.SEVEN,
+                Symbols.FIVE,
+                Symbols.NINE,
+                Symbols.TEN,
+                Symbols.EIGHT,
+                Symbols.NINE,
+                Symbols.EIGHT,
+            ]
+        )
+
+        class SplitThenHitBelow17(HitBelow):
+            def choose_action(self, p_game, p_player, p_set):
+                if p_set.can_split():
+                    return Action.SPLIT
+                return super().choose_action(p_game, p_player, p_set)
+
+        # play_round resets the table but keeps the scripted shoe
+        self.game.play_round(p_strategies=[SplitThenHitBelow17()], p_bet_amount=100)
+
+        self.assertEqual(len(self.players[0].sets), 2)
+        self.assertEqual(self.players[0].sets[0].get_total_points(), 21)
+        self.assertEqual(self.players[0].sets[1].get_total_points(), 17)
+        self.assertIs(self.game.bank.sets[0].state, States.BUST)
+        self.assertEqual(self.players[0].capital, 1000 + 2 * 100)
+
+    def test_built_in_strategies(self):
+        solution = Solver(get_composition(DECK_CODES)).solve()
+        strategies = [
+            AlwaysStand(),
+            TableLookup(strategy_table(solution)),
+            RandomStrategy(random.Random(21)),
+        ]
+        for _ in range(200):
+            self.game.play_round(p_strategies=strategies, p_bet_amount=1)
+
+            self.assertTrue(self.game.check_if_all_players_are_ready())
+            self.assertEqual(len(self.players[0].sets[0].cards), 2)
+            self.assertIs(self.players[0].sets[0].state, States.STAND)
+
+    def test_one_strategy_per_player(self):
+        with self.assertRaises(Exception):
+            self.game.play_round(p_strategies=[AlwaysStand()])
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare(self):
+        baseline = {"a": 1.0, "b": 1.0, "c": 1.0}
+        results = {"a": 1.2, "b": 1.5, "d": 9.0}
+
+        self.assertEqual(compare(results, baseline, p_tolerance=0.25), {"b": 1.5})
+
+    def test_budgets(self):
+        results = {"import/twenty_one": IMPORT_TIME_BUDGET * 2, "a": 9.0}
+        self.assertEqual(check_budgets(results), {"import/twenty_one": 2.0})
+        self.assertEqual(check_budgets({"import/twenty_one": IMPORT_TIME_BUDGET}), {})
+
+    def test_benchmarks_run(self):
+        for name in BENCHMARKS:
+            BENCHMARKS[name]()
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_counters_and_timings(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        snapshots = []
+        instrumentation = GameInstrumentation(
+            game, p_dump_every=2, p_dump=snapshots.append
+        ).attach()
+
+        # the cards of test_case_06; a split, a bust set and a bust bank
+        game.set_what_cards_to_reveal(
+            p_symbols=[
+                Symbols.SEVEN,
+                Symbols.SIX,
+                Symbols.SEVEN,
+                Symbols.FIVE,
+                Symbols.NINE,
+                Symbols.TEN,
+                Symbols.EIGHT,
+                Symbols.NINE,
+                Symbols.EIGHT,
+            ]
+        )
+        game.phase_1__start()
+        game.phase_2__place_bet(player, 100)
+        game.phase_3__give_players_the_second_card()
+        for action in [Action.SPLIT, Action.HIT, Action.HIT, Action.STAND]:
+            game.phase_4__take_action_for_player(player, action)
+        game.phase_4__take_action_for_player(player, Action.HIT)
+        game.phase_4__take_action_for_player(player, Action.HIT)
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot["counters"]["cards_drawn"], 9)
+        self.assertEqual(snapshot["counters"]["splits"], 1)
+        self.assertEqual(snapshot["counters"]["busts"], 2)
+        self.assertEqual(snapshot["counters"]["rounds"], 1)
+        self.assertGreater(snapshot["counters"]["total_points_calls"], 0)
+        phases = snapshot["phases"]
+        self.assertEqual(phases["phase_4__take_action_for_player"]["calls"], 6)
+        self.assertGreater(phases["phase_6__bank_hits_until_bust_or_stand"]["seconds"], 0)
+
+        game.play_round(p_strategies=[HitBelow(17)])
+        self.assertEqual(len(snapshots), 1)
+        self.assertEqual(snapshots[0]["counters"]["rounds"], 2)
+
+        instrumentation.detach()
+        self.assertNotIn("evaluate", vars(game))
+        self.assertIs(Set.get_total_points, TOTAL_POINTS)
+
+
+class TestImport(unittest.TestCase):
+    def test_no_logging_set_up_at_import(self):
+        code = (
+            "import logging, sys, twenty_one;"
+            "assert 'coloredlogs' not in sys.modules;"
+            "assert not logging.getLogger().handlers;"
+            "assert not logging.getLogger().isEnabledFor(logging.INFO)"
+        )
+        subprocess.run(
+            [sys.executable, "-c", code],
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await self.start_server(p_action_timeout=0.2)
+
+    async def start_server(self, p_action_timeout: float):
+        self.server = TableServer(p_action_timeout=p_action_timeout)
+        self.port = await self.server.start_tcp()
+        self.addAsyncCleanup(self.server.close)
+
+    async def connect(self, p_table: str, p_name: str):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.addAsyncCleanup(self.disconnect, writer)
+        self.send(writer, {"op": "join", "table": p_table, "name": p_name, "capital": 1000})
+        self.assertEqual((await self.receive(reader, "joined"))["table"], p_table)
+        return reader, writer
+
+    async def disconnect(self, p_writer):
+        p_writer.close()
+        await p_writer.wait_closed()
+
+    def send(self, p_writer, p_message):
+        p_writer.write(json.dumps(p_message).encode() + b"\n")
+
+    async def receive(self, p_reader, *p_events):
+        while True:
+            message = json.loads(await asyncio.wait_for(p_reader.readline(), 5))
+            if message["event"] in p_events:
+                return message
+
+    async def play_a_round(self, p_table: str):
+        reader, writer = await self.connect(p_table, "Player")
+        await self.receive(reader, "bet_request")
+        self.send(writer, {"op": "bet", "amount": 100})
+        while True:
+            message = await self.receive(reader, "action_request", "result")
+            if message["event"] == "result":
+                return message["capital"]
+            self.send(writer, {"op": "stand"})
+
+    async def test_a_round(self):
+        self.assertIn(await self.play_a_round("t1"), [900, 1100])
+
+    async def test_idle_player_stands(self):
+        reader, writer = await self.connect("t1", "Idle")
+        await self.receive(reader, "bet_request")
+        self.send(writer, {"op": "bet", "amount": 100})
+        await self.receive(reader, "action_request")
+        state = await self.receive(reader, "state")
+        self.assertEqual(state["players"][0]["sets"][0]["state"], States.STAND)
+        self.assertIn((await self.receive(reader, "result"))["capital"], [900, 1100])
+
+    async def test_player_without_a_bet_is_not_dealt_in(self):
+        idle_reader, _ = await self.connect("t1", "Idle")
+        reader, writer = await self.connect("t1", "Player")
+        await self.receive(reader, "bet_request")
+        self.send(writer, {"op": "bet", "amount": 100})
+        await self.receive(reader, "action_request")
+        self.send(writer, {"op": "stand"})
+
+        # the idle player is neither dealt nor asked for an action
+        message = await self.receive(idle_reader, "state", "action_request", "result")
+        while message["event"] == "state":
+            self.assertEqual(message["players"][0]["sets"], [])
+            message = await self.receive(idle_reader, "state", "action_request", "result")
+        self.assertEqual(message, {"event": "result", "capital": 1000})
+
+    async def test_empty_tables_are_removed(self):
+        await self.play_a_round("t1")
+        table = self.server.tables["t1"]
+        reader, writer = await self.connect("t2", "Player")
+        self.send(writer, {"op": "leave"})
+        for _ in range(100):
+            if "t2" not in self.server.tables:
+                break
+            await asyncio.sleep(0.05)
+        self.assertNotIn("t2", self.server.tables)
+        self.assertIs(self.server.tables["t1"], table)
+        self.assertEqual(len(self.server._table_tasks), 1)
+
+    async def test_slow_reader_is_dropped(self):
+        class StalledWriter:
+            closed = False
+
+            def __init__(self) -> None:
+                self.transport = self
+
+            def get_write_buffer_size(self):
+                return 1
+
+            def write(self, p_data):
+                pass
+
+            async def drain(self):
+                await asyncio.Event().wait()
+
+            def is_closing(self):
+                return self.closed
+
+            def close(self):
+                self.closed = True
+
+        # a client which does not drain in time
+        writer = StalledWriter()
+        seat = Seat(Player(p_name="Slow", p_capital=1000), writer, p_timeout=0.05)
+        self.addCleanup(seat.close)
+        seat.send({"event": "joined"})
+        await asyncio.sleep(0.2)
+        self.assertTrue(seat.has_left)
+        self.assertTrue(writer.closed)
+
+        # and one whose outbox is full
+        seat = Seat(Player(p_name="Slow", p_capital=1000), StalledWriter(), p_timeout=10)
+        self.addCleanup(seat.close)
+        for _ in range(OUTBOX_SIZE + 2):
+            seat.send({"event": "joined"})
+        self.assertTrue(seat.has_left)
+        self.assertTrue(seat.writer.closed)
+
+    async def test_many_tables(self):
+        # an idle player at one table does not hold up the others
+        await self.start_server(p_action_timeout=30)
+        await self.connect("idle", "Idle")
+        capitals = await asyncio.gather(
+            *(self.play_a_round(f"t{i}") for i in range(200))
+        )
+        self.assertTrue(all(capital in [900, 1100] for capital in capitals))
+
+    async def test_rules_of_the_tables(self):
+        rules = RuleSet(p_face_points=(10, 10, 10), p_max_splits=1, p_players_per_deck=2)
+        self.server = TableServer(p_action_timeout=0.2, p_max_seats=5, p_rules=rules)
+        self.port = await self.server.start_tcp()
+        self.addAsyncCleanup(self.server.close)
+
+        await self.connect("t1", "Player")
+        table = self.server.tables["t1"]
+        self.assertIs(table.game.rules, rules)
+        self.assertIs(table.game.shoe.cards, rules.cards)
+        # a deck per 2 of the 5 seats, and one more
+        self.assertEqual(len(table.game.shoe), 52 * 3)
+        self.assertEqual((table.seats + table.waiting_seats)[0].player.max_splits, 1)
+
+    async def test_errors(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.addAsyncCleanup(self.disconnect, writer)
+        self.send(writer, {"op": "hit"})
+        self.assertIn("Join", (await self.receive(reader, "error"))["message"])
+        writer.write(b"not json\n")
+        self.assertIn("Invalid", (await self.receive(reader, "error"))["message"])
+
+
+class TestTournament(unittest.TestCase):
+    def test_same_result_for_any_number_of_workers(self):
+        results = [
+            run_tournament(
+                p_number_of_rounds=250,
+                p_number_of_players=2,
+                p_master_seed=21,
+                p_number_of_workers=number_of_workers,
+                p_rounds_per_shard=100,
+            )
+            for number_of_workers in (1, 3)
+        ]
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[0].capital_trajectories[0]), 250)
+        for i in range(2):
+            self.assertLessEqual(results[0].wins[i] + results[0].losses[i], 250)
+
+    def test_different_master_seeds(self):
+        results = [
+            run_tournament(p_number_of_rounds=100, p_master_seed=master_seed)
+            for master_seed in (1, 2)
+        ]
+
+        self.assertNotEqual(results[0], results[1])
+
+    def test_replay_a_round(self):
+        result = run_tournament(
+            p_number_of_rounds=250,
+            p_number_of_players=2,
+            p_master_seed=21,
+            p_number_of_workers=1,
+            p_rounds_per_shard=100,
+        )
+
+        for round_number in (0, 99, 100, 249):
+            game = replay_round(
+                p_master_seed=21,
+                p_round_number=round_number,
+                p_number_of_players=2,
+                p_rounds_per_shard=100,
+            )
+            # the capitals of a replayed shard start from 0
+            for i, player in enumerate(game.players):
+                trajectory = [1000] + list(result.capital_trajectories[i])
+                shard_start = trajectory[round_number // 100 * 100]
+                self.assertEqual(player.capital, trajectory[round_number + 1] - shard_start)
+
+    def test_random_strategies_are_reseeded_per_shard(self):
+        strategy = RandomStrategy(random.Random(7))
+        strategy.reseed(derive_seed(21, "shard", 0, "strategy", 0))
+        first = strategy.rng.random()
+        strategy.reseed(derive_seed(21, "shard", 1, "strategy", 0))
+        self.assertNotEqual(strategy.rng.random(), first)
+
+        # the shards play with reseeded copies, so a round replays alone from its shard
+        strategies = [RandomStrategy(random.Random(7))]
+        state = strategies[0].rng.getstate()
+        result = run_tournament(
+            p_number_of_rounds=150,
+            p_master_seed=21,
+            p_number_of_workers=1,
+            p_rounds_per_shard=100,
+            p_strategies=strategies,
+        )
+        self.assertEqual(strategies[0].rng.getstate(), state)
+        game = replay_round(
+            p_master_seed=21, p_round_number=120, p_rounds_per_shard=100, p_strategies=strategies
+        )
+        trajectory = result.capital_trajectories[0]
+        self.assertEqual(game.players[0].capital, trajectory[120] - trajectory[99])
+
+
+class TestSeeds(unittest.TestCase):
+    def test_derived_streams(self):
+        self.assertEqual(derive_seed(21, "table", 1), derive_seed(21, "table", 1))
+        seeds = {derive_seed(21, "table", i) for i in range(1000)}
+        seeds |= {derive_seed(22, "table", i) for i in range(1000)}
+        self.assertEqual(len(seeds), 2000)
+        self.assertEqual(make_rng(21, 7).random(), make_rng(21, 7).random())
+
+    def test_games_do_not_interfere(self):
+        def play(p_interleave: bool):
+            games = [
+                HeadlessGame([Player(p_name="Player", p_capital=1000)], p_rng=make_rng(21, i))
+                for i in range(2)
+            ]
+            for _ in range(100):
+                games[0].play_round(p_strategies=[HitBelow(17)])
+                if p_interleave:
+                    games[1].play_round(p_strategies=[HitBelow(17)])
+                    random.shuffle(list(range(52)))
+            return games[0].players[0].capital, list(games[0].shoe.codes)
+
+        self.assertEqual(play(False), play(True))
+        self.assertEqual(
+            list(TwentyOneCards(p_rng=random.Random(1)).codes),
+            list(TwentyOneCards(p_rng=random.Random(1)).codes),
+        )
+
+
+def _describe(p_game: Game):
+    return [
+        (user.capital if isinstance(user, Player) else None)
+        for user in p_game.players + [p_game.bank]
+    ], [
+        [([card.code for card in set.cards], set.state, set.bet_amount) for set in user.sets]
+        for user in p_game.players + [p_game.bank]
+    ]
+
+
+class TestEventLog(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "game.log")
+
+    def test_replay_at_every_decision(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+        game = HeadlessGame(p_players=players)
+        states = []
+
+        class RecordingStrategy(RandomStrategy):
+            def choose_action(self, p_game, p_player, p_set):
+                states.append((p_game.event_log.number_of_events, _describe(p_game)))
+                return super().choose_action(p_game, p_player, p_set)
+
+        strategies = [RecordingStrategy(random.Random(i)) for i in range(3)]
+        with EventLogWriter(self.path, p_buffer_size=1000) as event_log:
+            game.event_log = event_log
+            for _ in range(50):
+                game.play_round(p_strategies=strategies, p_bet_amount=10)
+            states.append((event_log.number_of_events, _describe(game)))
+
+        with EventLogReader(self.path) as events:
+            self.assertEqual(len(events), states[-1][0])
+            self.assertEqual(events[0].type, EventTypes.ROUND)
+            self.assertEqual(list(events)[-1], events[-1])
+            for offset, state in states:
+                self.assertEqual(_describe(replay(events, offset)), state)
+
+    def test_events_of_a_scripted_round(self):
+        player = Player(p_name="Player", p_capital=1000)
+        game = HeadlessGame(p_players=[player])
+        # the cards of test_case_06; a split, a bust set and a bust bank
+        game.set_what_cards_to_reveal(
+            p_symbols=[
+                Symbols.SEVEN,
+                Symbols.SIX,
+                Symbols.SEVEN,
+                Symbols.FIVE,
+                Symbols.NINE,
+                Symbols.TEN,
+                Symbols.EIGHT,
+                Symbols.NINE,
+                Symbols.EIGHT,
+            ]
+        )
+        with EventLogWriter(self.path) as event_log:
+            game.event_log = event_log
+            game.phase_1__start()
+            game.phase_2__place_bet(player, 100)
+            game.phase_3__give_players_the_second_card()
+            for action in [Action.SPLIT, Action.HIT, Action.HIT, Action.STAND]:
+                game.phase_4__take_action_for_player(player, action)
+            game.phase_4__take_action_for_player(player, Action.HIT)
+            game.phase_4__take_action_for_player(player, Action.HIT)
+            game.phase_5__reveals_banks_second_card()
+            game.phase_6__bank_hits_until_bust_or_stand()
+
+        with EventLogReader(self.path) as events:
+            types = [event.type for event in events]
+            self.assertEqual(
+                types,
+                [EventTypes.ROUND, EventTypes.CAPITAL, EventTypes.DEAL, EventTypes.DEAL]
+                + [EventTypes.BET, EventTypes.DEAL, EventTypes.SPLIT]
+                + [EventTypes.HIT, EventTypes.HIT, EventTypes.STAND]
+                + [EventTypes.HIT, EventTypes.HIT, EventTypes.DEAL, EventTypes.HIT]
+                # every set is settled once
+                + [EventTypes.SETTLE, EventTypes.SETTLE],
+            )
+            self.assertEqual(replay(events, len(events)).players[0].capital, player.capital)
+            self.assertEqual(_describe(replay(events, len(events))), _describe(game))
+
+    def test_replay_with_other_rules(self):
+        rules = RuleSet(p_face_points=(10, 10, 10), p_bank_stand_points=16)
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(2)]
+        game = HeadlessGame(p_players=players, p_rng=random.Random(21), p_rules=rules)
+        states = []
+
+        def describe(p_game):
+            # the points of the sets depend on the rules, their codes do not
+            return _describe(p_game), [
+                [set.get_total_points() for set in user.sets]
+                for user in p_game.players + [p_game.bank]
+            ]
+
+        class RecordingStrategy(HitBelow):
+            def choose_action(self, p_game, p_player, p_set):
+                states.append((p_game.event_log.number_of_events, describe(p_game)))
+                return super().choose_action(p_game, p_player, p_set)
+
+        with EventLogWriter(self.path) as event_log:
+            game.event_log = event_log
+            for _ in range(20):
+                game.play_round(p_strategies=[RecordingStrategy(17)] * 2, p_bet_amount=10)
+            states.append((event_log.number_of_events, describe(game)))
+
+        with EventLogReader(self.path) as events:
+            for offset, state in states:
+                replayed = replay(events, offset, p_rules=rules)
+                self.assertIs(replayed.rules, rules)
+                self.assertEqual(describe(replayed), state)
+            # the face cards count 1 to 3 by the default rules
+            self.assertNotEqual(describe(replay(events, len(events))), states[-1][1])
+
+
+class TestScenarios(unittest.TestCase):
+    def test_corpus(self):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios.json")
+        report = run_scenarios(load_scenarios(path))
+
+        self.assertEqual(report.failures, [], report.summary())
+        self.assertEqual(report.number_of_scenarios, 8)
+
+    def test_failures_from_csv_on_a_pool(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "scenarios.csv")
+        with open(path, "w") as file:
+            file.write("name,cards,bets,actions,capitals,expected\n")
+            file.write("bank bust,A 10 4 6 6 7,100,S,,1100\n")
+            file.write("wrong capital,A 10 4 6 6 7,100,S,500,1100\n")
+            file.write("action left,9 7 3 2 8 7,100,H H H,,900\n")
+            file.write("invalid split,10 3 5 K 9 8,100,P S,,900\n")
+            file.write("set left open,10 3 5 K 9 8,100,H,,900\n")
+            file.write("out of cards,10 3 5 K,100,H S,,900\n")
+            file.write("five tens,10 10 10 10 10 7,100 100,S | S,,1100 1100\n")
+
+        scenarios = load_scenarios(path)
+        reports = [
+            run_scenarios(scenarios, p_number_of_workers=number_of_workers, p_chunk_size=2)
+            for number_of_workers in (1, 2)
+        ]
+
+        self.assertEqual(reports[0], reports[1])
+        self.assertEqual(
+            [failure.name for failure in reports[0].failures],
+            [
+                "wrong capital",
+                "action left",
+                "invalid split",
+                "set left open",
+                "out of cards",
+            ],
+        )
+        self.assertIn("7 scenarios, 5 failures", reports[0].summary())
+
+    def test_parse_json_lists(self):
+        scenario = parse_scenario(
+            {
+                "cards": ["A", "10", "4", "6", "6", "7"],
+                "bets": [100],
+                "actions": [["stand"]],
+                "expected": [1100],
+            }
+        )
+        self.assertEqual(scenario.symbols[:2], [Symbols.ACE, Symbols.TEN])
+        self.assertEqual(scenario.actions, [[Action.STAND]])
+        self.assertEqual(scenario.capitals, [1000])
+        with self.assertRaises(Exception):
+            parse_scenario({"cards": "A", "bets": "1 1", "actions": "S", "expected": "1"})
+
+
+class TestRollout(unittest.TestCase):
+    def setUp(self) -> None:
+        self.player = Player(p_name="Player", p_capital=1000)
+        self.game = HeadlessGame(p_players=[self.player], p_rng=random.Random(21))
+
+    def _deal(self, p_symbols):
+        self.game.set_what_cards_to_reveal(p_symbols=p_symbols)
+        self.game.phase_1__start()
+        self.game.phase_2__place_bet(self.player, 100)
+        self.game.phase_3__give_players_the_second_card()
+
+    def test_stand_on_20(self):
+        self._deal([Symbols.TEN, Symbols.SIX, Symbols.TEN])
+        strategy = RolloutStrategy(
+            p_time_budget=10, p_max_rollouts=400, p_rng=random.Random(21)
+        )
+
+        action = strategy.choose_action(self.game, self.player, self.player.sets[0])
+
+        self.assertIs(action, Action.STAND)
+        self.assertEqual(strategy.number_of_rollouts, 400)
+        # the rollouts do not touch the real game
+        self.assertEqual(self.player.capital, 900)
+        self.assertEqual(self.game.shoe.current_card_index, 3)
+
+    def test_hit_on_5_and_reuse_the_tree(self):
+        self._deal([Symbols.TWO, Symbols.SIX, Symbols.THREE, Symbols.FOUR])
+        strategy = RolloutStrategy(
+            p_time_budget=10, p_max_rollouts=400, p_rng=random.Random(21)
+        )
+
+        action = strategy.choose_action(self.game, self.player, self.player.sets[0])
+        self.assertIs(action, Action.HIT)
+
+        self.game.phase_4__take_action_for_player(self.player, action)
+        search = strategy._search
+        set = self.player.sets[0]
+        key = (0, 0, 1, set.hard_points, set.is_soft(), None)
+        visits = sum(visits for visits, _ in search.stats[key].values())
+
+        strategy.choose_action(self.game, self.player, self.player.sets[0])
+        self.assertIs(strategy._search, search)
+        self.assertGreater(visits, 0)
+        self.assertGreaterEqual(
+            sum(visits for visits, _ in search.stats[key].values()), visits + 400
+        )
+
+    def test_seats_sharing_a_strategy(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(2)]
+        game = HeadlessGame(p_players=players, p_rng=random.Random(21))
+        game.set_what_cards_to_reveal(
+            p_symbols=[Symbols.TEN, Symbols.FIVE, Symbols.SIX, Symbols.TEN, Symbols.FOUR]
+        )
+        game.phase_1__start()
+        for player in players:
+            game.phase_2__place_bet(player, 100)
+        game.phase_3__give_players_the_second_card()
+        strategy = RolloutStrategy(
+            p_time_budget=10, p_max_rollouts=200, p_rng=random.Random(21)
+        )
+
+        # a pair of 10s and a 9; each seat has its own decisions in the tree
+        self.assertIs(strategy.choose_action(game, players[0], players[0].sets[0]), Action.STAND)
+        game.phase_4__take_action_for_player(players[0], Action.STAND)
+        stats = strategy._search.stats
+        node = stats[0, 0, 1, 20, False, 10]
+        visits = sum(visits for visits, _ in node.values())
+
+        self.assertIs(strategy.choose_action(game, players[1], players[1].sets[0]), Action.HIT)
+        self.assertIs(strategy._search.stats, stats)
+        self.assertIn((1, 0, 1, 9, False, None), stats)
+        self.assertEqual(sum(visits for visits, _ in node.values()), visits)
+
+    def test_time_budget(self):
+        self._deal([Symbols.TEN, Symbols.SIX, Symbols.FOUR])
+        strategy = RolloutStrategy(p_time_budget=0.005, p_rng=random.Random(21))
+
+        start = time.perf_counter()
+        strategy.choose_action(self.game, self.player, self.player.sets[0])
+
+        # a generous margin for a loaded machine
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertGreater(strategy.number_of_rollouts, 0)
+
+    def test_fan_out(self):
+        self._deal([Symbols.TEN, Symbols.SIX, Symbols.TEN])
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            strategy = RolloutStrategy(
+                p_time_budget=10,
+                p_max_rollouts=400,
+                p_rng=random.Random(21),
+                p_executor=executor,
+                p_number_of_jobs=2,
+            )
+            action = strategy.choose_action(self.game, self.player, self.player.sets[0])
+
+        self.assertIs(action, Action.STAND)
+        self.assertEqual(strategy.number_of_rollouts, 400)
+
+    def test_fan_out_to_processes(self):
+        self._deal([Symbols.TEN, Symbols.SIX, Symbols.TEN])
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            strategy = RolloutStrategy(
+                p_time_budget=10,
+                p_max_rollouts=400,
+                p_rng=random.Random(21),
+                p_executor=executor,
+            )
+            action = strategy.choose_action(self.game, self.player, self.player.sets[0])
+
+        self.assertIs(action, Action.STAND)
+        self.assertEqual(strategy.number_of_rollouts, 400)
+
+    def test_short_budget_is_not_fanned_out(self):
+        class NoExecutor:
+            def submit(self, *p_arguments):
+                raise Exception("A short budget was fanned out.")
+
+        self._deal([Symbols.TEN, Symbols.SIX, Symbols.TEN])
+        strategy = RolloutStrategy(
+            p_time_budget=FAN_OUT_MIN_BUDGET / 10, p_executor=NoExecutor()
+        )
+        strategy.choose_action(self.game, self.player, self.player.sets[0])
+        self.assertGreater(strategy.number_of_rollouts, 0)
+
+    def test_play_rounds(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(2)]
+        game = HeadlessGame(p_players=players, p_rng=random.Random(21))
+        strategies = [
+            RolloutStrategy(p_time_budget=10, p_max_rollouts=20, p_rng=random.Random(i))
+            for i in range(2)
+        ]
+        for _ in range(20):
+            game.play_round(p_strategies=strategies, p_bet_amount=1)
+            self.assertTrue(game.check_if_all_players_are_ready())
+
+
+@unittest.skipUnless(np, "NumPy is not installed")
+class TestBankroll(unittest.TestCase):
+    def _outcomes(self, p_results, p_probabilities):
+        return OutcomeDistribution(np.array(p_results), np.array(p_probabilities))
+
+    def test_outcomes_from_changes(self):
+        outcomes = outcomes_from_changes([20, -10, 10, -10], p_bet_amount=10)
+
+        self.assertEqual(outcomes.results.tolist(), [-1, 1, 2])
+        self.assertEqual(outcomes.probabilities.tolist(), [0.5, 0.25, 0.25])
+        self.assertEqual(outcomes.get_mean(), 0.25)
+
+    def test_fraction_bet(self):
+        policy = fraction_bet(0.1, p_minimum_bet=5)
+        self.assertEqual(policy(np.array([1000, 99, 0])).tolist(), [100, 9, 5])
+
+    def test_ruin(self):
+        report = simulate_bankrolls(
+            self._outcomes([-1], [1.0]),
+            p_number_of_bankrolls=100,
+            p_number_of_rounds=50,
+            p_initial_capital=10,
+            p_bet_policy=flat_bet(3),
+            p_seed=21,
+        )
+
+        # 3 + 3 + 3 and the last 1, as no bet is greater than the capital
+        self.assertEqual(report.ruin_rounds.tolist(), [4] * 100)
+        self.assertEqual(report.final_capitals.tolist(), [0] * 100)
+        self.assertEqual(report.get_risk_of_ruin(), 1.0)
+        self.assertEqual(report.get_drawdown_quantiles((0.5,)), {0.5: 10})
+        self.assertEqual(report.get_ruin_histogram(5).tolist(), [100, 0, 0, 0, 0])
+
+    def test_no_bet_without_capital_and_split_stakes(self):
+        report = simulate_bankrolls(
+            self._outcomes([-2, 1], [0.5, 0.5]),
+            p_number_of_bankrolls=1000,
+            p_number_of_rounds=1,
+            p_initial_capital=1,
+            p_seed=21,
+        )
+        self.assertEqual(set(report.final_capitals.tolist()), {-1, 2})
+        self.assertTrue(
+            np.array_equal(report.ruin_rounds == 1, report.final_capitals == -1)
+        )
+
+        report = simulate_bankrolls(
+            self._outcomes([1], [1.0]),
+            p_number_of_bankrolls=10,
+            p_number_of_rounds=5,
+            p_initial_capital=0,
+        )
+        self.assertEqual(report.final_capitals.tolist(), [0] * 10)
+        self.assertEqual(report.ruin_rounds.tolist(), [0] * 10)
+
+    def test_mean_of_the_solver_distribution(self):
+        solver = Solver(get_composition(DECK_CODES))
+        outcomes = outcomes_from_solver(solver)
+        self.assertAlmostEqual(outcomes.probabilities.sum(), 1.0)
+
+        # the mean is the value of the best action of every deal
+        splits_depth = solver.splits_depth
+        value = sum(
+            first_probability
+            * upcard_probability
+            * second_probability
+            * solver.two_cards_value(first_point, second_point, upcard, splits_depth)
+            for first_point, first_probability in solver.probabilities
+            for upcard, upcard_probability in solver.probabilities
+            for second_point, second_probability in solver.probabilities
+        )
+        self.assertAlmostEqual(outcomes.get_mean(), value)
+
+        report = simulate_bankrolls(
+            outcomes,
+            p_number_of_bankrolls=100000,
+            p_number_of_rounds=10,
+            p_initial_capital=1000,
+            p_bet_policy=flat_bet(10),
+            p_seed=21,
+        )
+        self.assertEqual(report.get_risk_of_ruin(), 0.0)
+        self.assertTrue(np.all(report.ruin_rounds == NOT_RUINED))
+        self.assertAlmostEqual(
+            report.final_capitals.mean() - 1000, 10 * 10 * value, delta=0.5
+        )
+
+    def test_outcomes_from_engine(self):
+        outcomes = outcomes_from_engine(2000, p_master_seed=21, p_number_of_workers=1)
+
+        self.assertAlmostEqual(outcomes.probabilities.sum(), 1.0)
+        self.assertTrue(set(outcomes.results.tolist()) >= {-1, 1})
+        again = outcomes_from_engine(2000, p_master_seed=21, p_number_of_workers=1)
+        self.assertEqual(outcomes.results.tolist(), again.results.tolist())
+        self.assertEqual(outcomes.probabilities.tolist(), again.probabilities.tolist())
+
+
+class TestSettlement(unittest.TestCase):
+    def test_bank_bust_pays_every_player(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+        game = Game(p_players=players, p_verbose=False)
+        game.ledger = SettlementLedger()
+        # 18, 17 and 9 5 8 (bust) against the bank's 10 6 10 (bust)
+        game.set_what_cards_to_reveal(
+            p_symbols=[
+                Symbols.NINE,
+                Symbols.NINE,
+                Symbols.NINE,
+                Symbols.TEN,
+                Symbols.NINE,
+                Symbols.EIGHT,
+                Symbols.FIVE,
+                Symbols.EIGHT,
+                Symbols.SIX,
+                Symbols.TEN,
+            ]
+        )
+        game.phase_1__start()
+        for player in players:
+            game.phase_2__place_bet(player, 100)
+        game.phase_3__give_players_the_second_card()
+        game.phase_4__take_action_for_player(players[0], Action.STAND)
+        game.phase_4__take_action_for_player(players[1], Action.STAND)
+        game.phase_4__take_action_for_player(players[2], Action.HIT)
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+
+        self.assertIs(game.bank.sets[0].state, States.BUST)
+        self.assertEqual([player.capital for player in players], [1100, 1100, 900])
+        self.assertEqual(
+            game.ledger.get_round(game.round_id),
+            [
+                Settlement(1, 0, 0, 100, 200),
+                Settlement(1, 1, 0, 100, 200),
+                Settlement(1, 2, 0, 100, 0),
+            ],
+        )
+        self.assertEqual(game.ledger.get_round_totals(game.round_id), (300, 400))
+
+    def test_reconcile_rounds_with_splits(self):
+        players = [Player(p_name=f"Player {i}", p_capital=10**6) for i in range(200)]
+        game = HeadlessGame(p_players=players, p_rng=random.Random(21))
+        game.ledger = SettlementLedger()
+        strategies = [RandomStrategy(random.Random(i)) for i in range(len(players))]
+
+        for _ in range(5):
+            capitals = sum(player.capital for player in players)
+            game.play_round(p_strategies=strategies, p_bet_amount=10)
+
+            bets, payouts = game.ledger.get_round_totals(game.round_id)
+            settlements = game.ledger.get_round(game.round_id)
+            self.assertEqual(
+                len(settlements), sum(len(player.sets) for player in players)
+            )
+            self.assertEqual(
+                sum(settlement.bet_amount for settlement in settlements), bets
+            )
+            self.assertEqual(
+                sum(player.capital for player in players) - capitals, payouts - bets
+            )
+
+        self.assertEqual(list(game.ledger)[-1], game.ledger[len(game.ledger) - 1])
+        with self.assertRaises(Exception):
+            game.ledger.append(1, 0, 0, 10, 0)
+
+
+class TestRules(unittest.TestCase):
+    def _play(self, p_rules, p_symbols, p_actions):
+        player = Player(p_name="Player", p_capital=1000)
+        game = Game(p_players=[player], p_verbose=False, p_rules=p_rules)
+        game.set_what_cards_to_reveal(p_symbols=p_symbols)
+        game.phase_1__start()
+        game.phase_2__place_bet(player, 100)
+        game.phase_3__give_players_the_second_card()
+        for action in p_actions:
+            game.phase_4__take_action_for_player(player, action)
+        game.phase_5__reveals_banks_second_card()
+        game.phase_6__bank_hits_until_bust_or_stand()
+        return game
+
+    def test_compiled_cards(self):
+        self.assertIs(DEFAULT_RULES.cards, CARDS)
+        self.assertIs(RuleSet().cards, CARDS)
+
+        rules = RuleSet(p_face_points=(10, 10, 10), p_ace_points=(1, 1))
+        same_rules = RuleSet(p_face_points=(10, 10, 10), p_ace_points=(1, 1))
+        self.assertIs(same_rules.cards, rules.cards)
+        points = {card.symbol: (card.point, card.alternative_point) for card in rules.cards}
+        self.assertEqual(points[Symbols.KING], (10, None))
+        self.assertEqual(points[Symbols.ACE], (1, None))
+        self.assertEqual(points[Symbols.SEVEN], (7, None))
+
+        # an ace of a single point is never soft
+        set = Set()
+        set.append_card(rules.cards[0])
+        set.append_card(rules.cards[9])
+        self.assertEqual(set.get_total_points(), 11)
+        self.assertFalse(set.is_soft())
+
+        with self.assertRaises(Exception):
+            RuleSet(p_face_points=(12, 2, 3))
+        with self.assertRaises(Exception):
+            RuleSet(p_ace_points=(1, 11))
+
+    def test_bank_stand_points(self):
+        # 10 9 against the bank's 10 7 2
+        symbols = [Symbols.TEN, Symbols.TEN, Symbols.NINE, Symbols.SEVEN, Symbols.TWO]
+
+        game = self._play(None, symbols, [Action.STAND])
+        self.assertEqual(game.bank.sets[0].get_total_points(), 17)
+        self.assertEqual(game.players[0].capital, 1100)
+
+        game = self._play(RuleSet(p_bank_stand_points=18), symbols, [Action.STAND])
+        self.assertEqual(game.bank.sets[0].get_total_points(), 19)
+        self.assertEqual(game.players[0].capital, 900)
+
+    def test_bank_does_not_hit_on_the_stand_points(self):
+        game = Game(p_players=[Player(p_name="Player", p_capital=1000)], p_verbose=False)
+        game.bank.append_card(CARDS[9])
+        game.bank.append_card(CARDS[6])
+        game.bank.do_hit(CARDS[1])
+
+        self.assertEqual(game.bank.sets[0].get_total_points(), 17)
+
+    def test_max_splits(self):
+        # 8 8, split, 8 again on the first set, 10 on the second and the bank's 10 7
+        symbols = [Symbols.EIGHT, Symbols.TEN, Symbols.EIGHT, Symbols.EIGHT, Symbols.TEN]
+        actions = [Action.SPLIT, Action.HIT, Action.SPLIT, Action.STAND]
+        game = self._play(
+            RuleSet(p_max_splits=1),
+            symbols + [Symbols.SEVEN],
+            actions + [Action.HIT, Action.STAND],
+        )
+        player = game.players[0]
+
+        # the second split is ignored; 16 loses and 18 wins against 17
+        self.assertEqual([len(set.cards) for set in player.sets], [2, 2])
+        self.assertTrue(player.sets[0].can_split())
+        self.assertFalse(player.can_split(player.sets[0]))
+        self.assertEqual(player.capital, 1000 - 200 + 200)
+
+    def test_players_per_deck_and_shoe(self):
+        players = [Player(p_name=f"Player {i}", p_capital=1000) for i in range(3)]
+        rules = RuleSet(p_face_points=(10, 10, 10), p_players_per_deck=1)
+        game = HeadlessGame(p_players=players, p_rules=rules, p_rng=random.Random(21))
+
+        self.assertEqual(len(game.shoe), 4 * len(CARDS))
+        self.assertIs(game.shoe.cards, rules.cards)
+        self.assertEqual(game.shoe.get_composition()[9], 4 * 16)
+        with self.assertRaises(Exception):
+            HeadlessGame(p_players=players, p_rules=rules, p_shoe=Shoe())
+
+        strategies = [HitBelow(17) for _ in players]
+        for _ in range(20):
+            game.play_round(p_strategies=strategies)
+        snapshot = game.snapshot()
+        game.restore(snapshot)
+        for user in [game.bank] + players:
+            for set in user.sets:
+                self.assertTrue(all(card is rules.cards[card.code] for card in set.cards))
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self) -> None:
+        self.players = [Player(p_name=f"Player {i}", p_capital=10**6) for i in range(3)]
+        self.game = HeadlessGame(p_players=self.players, p_rng=random.Random(21))
+        self.strategies = [RandomStrategy(random.Random(i)) for i in range(3)]
+
+    def test_records_reconcile_with_the_capitals(self):
+        records = list(play_rounds(self.game, self.strategies, 200, p_bet_amount=10))
+
+        self.assertEqual([record.round_id for record in records], list(range(1, 201)))
+        self.assertEqual(
+            sum(set.payout - set.bet_amount for record in records for set in record.sets),
+            sum(player.capital for player in self.players) - 3 * 10**6,
+        )
+        self.assertTrue(
+            all(set.payout == 0 for record in records for set in record.sets if set.is_bust)
+        )
+
+    def test_the_ledger_of_the_game_is_kept(self):
+        ledger = SettlementLedger()
+        self.game.ledger = ledger
+        records = play_rounds(self.game, self.strategies, p_bet_amount=10)
+        sets = [set for record in itertools.islice(records, 20) for set in record.sets]
+
+        # the ledger gets the settlements too, and is put back once the source is closed
+        self.assertIsNot(self.game.ledger, ledger)
+        records.close()
+        self.assertIs(self.game.ledger, ledger)
+        self.assertEqual(
+            [(set.seat, set.set_number, set.bet_amount, set.payout) for set in sets],
+            [
+                (settlement.seat, settlement.set_number, settlement.bet_amount, settlement.payout)
+                for settlement in ledger
+            ],
+        )
+        list(play_rounds(self.game, self.strategies, 5))
+        self.assertIs(self.game.ledger, ledger)
+        self.assertEqual(len(ledger.get_round(self.game.round_id)), len(self.players))
+
+    def test_sinks(self):
+        records = list(play_rounds(self.game, self.strategies, 500))
+        returns, busts, splits, points = drain(
+            records,
+            MeanVariance(get_set_returns),
+            BustRateByUpcard(),
+            SplitFrequency(),
+            Histogram(get_set_points, 2, 22, 10),
+        )
+
+        values = [value for record in records for value in get_set_returns(record)]
+        self.assertEqual(returns.count, len(values))
+        self.assertAlmostEqual(returns.mean, statistics.mean(values))
+        self.assertAlmostEqual(returns.get_variance(), statistics.variance(values))
+
+        self.assertEqual(sum(busts.rounds), 500)
+        self.assertEqual(
+            sum(busts.bank_busts), sum(record.is_bank_bust for record in records)
+        )
+        self.assertTrue(all(0 <= rate <= 1 for rate in busts.get_bust_rates().values()))
+
+        number_of_sets = sum(len(record.sets) for record in records)
+        self.assertEqual(splits.hands, 1500)
+        self.assertEqual(splits.splits, number_of_sets - 1500)
+        self.assertGreater(splits.get_split_rate(), 0)
+        self.assertLessEqual(splits.get_split_rate(), splits.get_splits_per_hand())
+
+        self.assertEqual(sum(points.counts) + points.underflow + points.overflow, number_of_sets)
+        self.assertEqual(points.get_bin_edges()[:3], [2, 4, 6])
+
+    def test_merge_and_histogram_edges(self):
+        values = [random.Random(21).gauss(0, 1) for _ in range(10)] + [3.5, -2.0, 7.25]
+        whole = MeanVariance(None)
+        first, second = MeanVariance(None), MeanVariance(None)
+        for index, value in enumerate(values):
+            whole.add(value)
+            (first if index < 4 else second).add(value)
+        first.merge(second)
+
+        self.assertEqual(first.count, whole.count)
+        self.assertAlmostEqual(first.mean, whole.mean)
+        self.assertAlmostEqual(first.get_variance(), whole.get_variance())
+
+        histogram = Histogram(lambda record: record, 0, 1, 3)
+        histogram.update([-0.1, 0, 0.5, 1 - 2**-53, 1, 2])
+        self.assertEqual(histogram.counts, [1, 1, 1])
+        self.assertEqual((histogram.underflow, histogram.overflow), (1, 2))
+        with self.assertRaises(Exception):
+            Histogram(get_set_points, 1, 1, 3)
+
+    def test_stages_are_lazy(self):
+        records = compose(
+            play_rounds(self.game, self.strategies),
+            where(lambda record: record.upcard == 10),
+            only_seat(1),
+        )
+        selected = list(itertools.islice(records, 5))
+
+        self.assertEqual(len(selected), 5)
+        self.assertTrue(all(record.upcard == 10 for record in selected))
+        self.assertTrue(all(set.seat == 1 for record in selected for set in record.sets))
+        self.assertTrue(all(record.number_of_players == 1 for record in selected))
+        self.assertEqual(self.game.round_id, selected[-1].round_id)
+
+
 if __name__ == "__main__":
     unittest.main()
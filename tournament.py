@@ -0,0 +1,221 @@
+"""
+A tournament runner which shards a huge number of headless rounds across processes.
+
+The rounds are cut into shards of a fixed size and every shard is played with its own
+random stream, derived from the master seed and the shard index only (see `seeds`). The
+shards are merged in their order, so the same master seed gives bit-identical results
+whatever the number of workers is, and any round is played again from its master seed
+and round number alone (see `replay_round`). A strategy with a random stream of its own
+has a `reseed(seed)` method; each shard plays with a copy of it which is reseeded from
+the master seed, the shard index and the seat, so the shards do not repeat its choices.
+
+Run `python3 tournament.py` to measure the throughput for 1 to all the cores.
+"""
+import copy
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple
+
+from headless import HeadlessGame
+from seeds import derive_seed
+from strategies import HitBelow
+from twenty_one import Player, States, Strategy
+
+ROUNDS_PER_SHARD = 10000
+
+
+class ShardResult(NamedTuple):
+    """
+    the outcome of a shard for each player
+
+    capital_changes holds the net change of each round; round by round and player by player
+    """
+
+    capital_changes: array
+    wins: List[int]
+    losses: List[int]
+    busts: List[int]
+
+
+class TournamentResult(NamedTuple):
+    """
+    the merged outcome of all the shards
+
+    capital_trajectories holds the capital of each player after each round
+    """
+
+    capital_trajectories: List[array]
+    wins: List[int]
+    losses: List[int]
+    busts: List[int]
+
+
+def get_shard_seed(p_master_seed: int, p_shard_index: int) -> int:
+    """
+    the seed of a shard's random stream; it depends on nothing but its arguments
+    """
+    return derive_seed(p_master_seed, "shard", p_shard_index)
+
+
+def _make_shard_game(
+    p_master_seed: int, p_shard_index: int, p_number_of_players: int
+) -> HeadlessGame:
+    players = [
+        Player(p_name=f"Player {i}", p_capital=0) for i in range(p_number_of_players)
+    ]
+    rng = random.Random(get_shard_seed(p_master_seed, p_shard_index))
+    return HeadlessGame(p_players=players, p_rng=rng)
+
+
+def _reseed_strategies(
+    p_master_seed: int, p_shard_index: int, p_strategies: List[Strategy]
+) -> List[Strategy]:
+    """
+    copies of the strategies whose random streams are the ones of their seats in the shard
+    """
+    strategies = copy.deepcopy(p_strategies)
+    for seat, strategy in enumerate(strategies):
+        reseed = getattr(strategy, "reseed", None)
+        if reseed is not None:
+            reseed(derive_seed(p_master_seed, "shard", p_shard_index, "strategy", seat))
+    return strategies
+
+
+def play_shard(
+    p_master_seed: int,
+    p_shard_index: int,
+    p_number_of_rounds: int,
+    p_strategies: List[Strategy],
+    p_bet_amount: int,
+) -> ShardResult:
+    """
+    Plays the rounds of a shard in a fresh game
+    """
+    number_of_players = len(p_strategies)
+    game = _make_shard_game(p_master_seed, p_shard_index, number_of_players)
+    players = game.players
+    strategies = _reseed_strategies(p_master_seed, p_shard_index, p_strategies)
+
+    capital_changes = array("q")
+    wins = [0] * number_of_players
+    losses = [0] * number_of_players
+    busts = [0] * number_of_players
+
+    for _ in range(p_number_of_rounds):
+        capitals = [player.capital for player in players]
+        game.play_round(p_strategies=strategies, p_bet_amount=p_bet_amount)
+
+        for i, player in enumerate(players):
+            change = player.capital - capitals[i]
+            capital_changes.append(change)
+            if change > 0:
+                wins[i] += 1
+            elif change < 0:
+                losses[i] += 1
+            busts[i] += sum(set.state is States.BUST for set in player.sets)
+
+    return ShardResult(capital_changes, wins, losses, busts)
+
+
+def run_tournament(
+    p_number_of_rounds: int,
+    p_number_of_players: int = 1,
+    p_master_seed: int = 0,
+    p_number_of_workers: int = None,
+    p_initial_capital: int = 1000,
+    p_bet_amount: int = 1,
+    p_rounds_per_shard: int = ROUNDS_PER_SHARD,
+    p_strategies: List[Strategy] = None,
+) -> TournamentResult:
+    """
+    Plays the rounds on a pool of processes and merges the shards in order
+
+    The players hit below 17 unless a (picklable) strategy per player is given.
+    """
+    if p_strategies is None:
+        p_strategies = [HitBelow(17) for _ in range(p_number_of_players)]
+    if len(p_strategies) != p_number_of_players:
+        raise Exception("There should be one strategy per player.")
+
+    shard_sizes = [
+        min(p_rounds_per_shard, p_number_of_rounds - first_round)
+        for first_round in range(0, p_number_of_rounds, p_rounds_per_shard)
+    ]
+
+    with ProcessPoolExecutor(max_workers=p_number_of_workers) as executor:
+        shards = executor.map(
+            play_shard,
+            [p_master_seed] * len(shard_sizes),
+            range(len(shard_sizes)),
+            shard_sizes,
+            [p_strategies] * len(shard_sizes),
+            [p_bet_amount] * len(shard_sizes),
+        )
+
+        capital_trajectories = [array("q") for _ in range(p_number_of_players)]
+        capitals = [p_initial_capital] * p_number_of_players
+        wins = [0] * p_number_of_players
+        losses = [0] * p_number_of_players
+        busts = [0] * p_number_of_players
+
+        # executor.map yields the shards in their order
+        for shard in shards:
+            for i in range(p_number_of_players):
+                trajectory = capital_trajectories[i]
+                capital = capitals[i]
+                for change in shard.capital_changes[i::p_number_of_players]:
+                    capital += change
+                    trajectory.append(capital)
+                capitals[i] = capital
+
+                wins[i] += shard.wins[i]
+                losses[i] += shard.losses[i]
+                busts[i] += shard.busts[i]
+
+    return TournamentResult(capital_trajectories, wins, losses, busts)
+
+
+def replay_round(
+    p_master_seed: int,
+    p_round_number: int,
+    p_number_of_players: int = 1,
+    p_bet_amount: int = 1,
+    p_rounds_per_shard: int = ROUNDS_PER_SHARD,
+    p_strategies: List[Strategy] = None,
+) -> HeadlessGame:
+    """
+    Plays the round of a tournament (numbered from 0) again and returns its game as it
+    was at the end of that round
+
+    Only the rounds of its own shard before it are played again, as the shoe lasts
+    across the rounds. The capitals of the players start from 0 at the shard.
+    """
+    if p_strategies is None:
+        p_strategies = [HitBelow(17) for _ in range(p_number_of_players)]
+
+    shard_index, round_in_shard = divmod(p_round_number, p_rounds_per_shard)
+    game = _make_shard_game(p_master_seed, shard_index, len(p_strategies))
+    strategies = _reseed_strategies(p_master_seed, shard_index, p_strategies)
+    for _ in range(round_in_shard + 1):
+        game.play_round(p_strategies=strategies, p_bet_amount=p_bet_amount)
+    return game
+
+
+if __name__ == "__main__":
+    number_of_rounds = 200000
+    for number_of_workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        result = run_tournament(
+            p_number_of_rounds=number_of_rounds,
+            p_number_of_players=3,
+            p_master_seed=21,
+            p_number_of_workers=number_of_workers,
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{number_of_workers} worker(s): {number_of_rounds / elapsed:,.0f} rounds/second,"
+            f" final capitals {[t[-1] for t in result.capital_trajectories]}"
+        )
@@ -1,16 +1,24 @@
 """
 The implementation of the costumized 21 game
 """
-import logging, coloredlogs
-
-coloredlogs.install(level=logging.DEBUG)
-
+import logging
+import random
 from abc import abstractmethod
-from typing import List
+from typing import List, NamedTuple, Optional, Protocol, Tuple
 from enum import Enum
 
-from twenty_one_cards import TwentyOneCards
+from twenty_one_cards import CARDS
+from shoe import ScriptedShoeBuilder, Shoe, ShoeSnapshot
 from cards import Card, Symbols
+from event_log import BANK_SEAT, EventLogWriter, EventTypes
+from settlement import Ledger
+from rules import BLACKJACK_POINTS, DEFAULT_RULES, RuleSet
+
+# the entry points (e.g. main.py) decide how and whether the records are shown
+logger = logging.getLogger(__name__)
+
+# the difference of the two points of an ace; 11 - 1 in the default rules
+SOFT_ACE_EXTRA_POINTS = 10
 
 
 class Roles(Enum):
@@ -53,53 +61,113 @@ class States:
     BUST: str = "bust"
 
 
+# the states by value; the states of a snapshot from another process (e.g. unpickled) are
+# equal strings but not the same ones, which the engine compares by identity
+_STATES = {state: state for state in (States.OPEN_TO_HIT, States.STAND, States.BUST)}
+
+
+class SetSnapshot(NamedTuple):
+    """
+    the cards (by code), state and bet of a set
+    """
+
+    codes: bytes
+    state: str
+    bet_amount: int
+    hard_points: int
+    number_of_aces: int
+    soft_extra_points: int
+
+
 class Set:
     """
     Holds the set of cards of the game
+
+    The total points are kept up to date as the cards are appended or popped;
+    the aces are counted as 1 in the hard points and one of them is counted as 11
+    (soft) whenever it does not bust the set. The points are those of the cards, so a
+    set follows the rules of the cards it holds (see `rules.RuleSet.cards`).
     """
 
     cards: List[Card]
     state: States
     bet_amount: int
+    hard_points: int
+    number_of_aces: int
+    soft_extra_points: int
 
     def __init__(self) -> None:
         self.cards = []
         self.state = States.OPEN_TO_HIT
         self.bet_amount = 0
+        self.hard_points = 0
+        self.number_of_aces = 0
+        self.soft_extra_points = SOFT_ACE_EXTRA_POINTS
 
     def append_card(self, p_card: Card):
         self.cards.append(p_card)
+        if p_card.alternative_point is None:
+            self.hard_points += p_card.point
+        else:
+            self.hard_points += p_card.alternative_point
+            self.number_of_aces += 1
+            self.soft_extra_points = p_card.point - p_card.alternative_point
         self.check_if_bust()
 
-    def get_total_points(self):
-        total_points = sum([card.point for card in self.cards])
-        total_points_alternative = sum(
-            [
-                card.alternative_point
-                for card in self.cards
-                if card.alternative_point is not None
-            ]
-        )
-        # as its the ACE wich has 2 possible points; 11 and 1 which the difference is 11-1=10:
-        if total_points_alternative >= 2:  # TODO: provide a better solution
-            return (
-                total_points
-                if total_points <= 21
-                else total_points - (total_points_alternative - 1) * 10
-            )
+    def pop_card(self) -> Card:
+        card = self.cards.pop()
+        if card.alternative_point is None:
+            self.hard_points -= card.point
         else:
-            return (
-                total_points
-                if total_points <= 21
-                else total_points - total_points_alternative * 10
-            )
+            self.hard_points -= card.alternative_point
+            self.number_of_aces -= 1
+        return card
 
-    def check_if_bust(self):
-        total_point = self.get_total_points()
+    def is_soft(self) -> bool:
+        """
+        if an ace is counted as 11 in the total points
+        """
+        return (
+            self.number_of_aces > 0
+            and self.hard_points + self.soft_extra_points <= BLACKJACK_POINTS
+        )
 
-        if total_point > 21 and total_point:
+    def get_total_points(self) -> int:
+        if self.is_soft():
+            return self.hard_points + self.soft_extra_points
+        return self.hard_points
+
+    def check_if_bust(self):
+        if self.hard_points > BLACKJACK_POINTS:
             self.state = States.BUST
 
+    def can_split(self) -> bool:
+        """
+        if the set holds exactly two cards with the same points
+        """
+        return len(self.cards) == 2 and self.cards[0].point == self.cards[1].point
+
+    def snapshot(self) -> SetSnapshot:
+        return SetSnapshot(
+            bytes([card.code for card in self.cards]),
+            self.state,
+            self.bet_amount,
+            self.hard_points,
+            self.number_of_aces,
+            self.soft_extra_points,
+        )
+
+    @classmethod
+    def from_snapshot(cls, p_snapshot: SetSnapshot, p_cards: List[Card] = CARDS) -> "Set":
+        set = cls()
+        set.cards = [p_cards[code] for code in p_snapshot.codes]
+        set.state = _STATES[p_snapshot.state]
+        set.bet_amount = p_snapshot.bet_amount
+        set.hard_points = p_snapshot.hard_points
+        set.number_of_aces = p_snapshot.number_of_aces
+        set.soft_extra_points = p_snapshot.soft_extra_points
+        return set
+
 
 class User:
     """
@@ -109,11 +177,13 @@ class User:
     name: str
     role: Roles
     sets: List[Set]
+    verbose: bool
 
     def __init__(self, p_role: Roles, p_name: str) -> None:
         self.role = p_role
         self.name = p_name
         self.sets = []
+        self.verbose = True
 
     def __str__(self) -> str:
         return self.name
@@ -145,9 +215,18 @@ class User:
 class Player(User):
     """
     A user who gamples
+
+    The sets are played in order and a set never opens again once it stands or busts
+    (a split appends its new set at the end), so the number of the first open set only
+    moves forward within a round and is kept as a cursor.
+
+    The most splits of a round come from the rules of the game she plays (None for no
+    limit).
     """
 
     capital: int = 0
+    open_set_number: int
+    max_splits: Optional[int] = None
 
     def __init__(self, p_name: str, p_capital: int) -> None:
         super().__init__(Roles.PLAYER, p_name)
@@ -156,69 +235,100 @@ class Player(User):
             raise Exception("Capital can not be negative.")
         self.capital = p_capital
         self.sets.append(Set())
+        self.open_set_number = 0
+
+    def reset_sets(self):
+        """
+        gives the player a new empty set for the next round
+        """
+        self.sets = [Set()]
+        self.open_set_number = 0
+
+    def can_split(self, p_set: Set) -> bool:
+        """
+        if the set can be split and the player has not split as many times as she can
+        """
+        return p_set.can_split() and (
+            self.max_splits is None or len(self.sets) <= self.max_splits
+        )
+
+    def get_open_set_number(self) -> Optional[int]:
+        """
+        the number of the first open to hit set, or None if there is none
+        """
+        # skip the sets which have stood or bust since the last call
+        sets = self.sets
+        number = self.open_set_number
+        while number < len(sets) and sets[number].state is not States.OPEN_TO_HIT:
+            number += 1
+        self.open_set_number = number
+        return number if number < len(sets) else None
 
     def place_initial_bet(self, p_bet_amount: int):
         self.capital -= p_bet_amount
         self.sets[0].bet_amount += p_bet_amount
-        logging.info(f"{self.name} beted {p_bet_amount}.")
-
-    def _get_set_states(self):
-        sets_state = [set.state for set in self.sets]
-        return sets_state
+        if self.verbose:
+            logger.info("%s beted %s.", self.name, p_bet_amount)
 
     def do_hit(self, p_card: Card):
-        logging.info(f"{self.name} choosed to HIT.")
+        if self.verbose:
+            logger.info("%s choosed to HIT.", self.name)
         # check if player can hit
-        sets_state = self._get_set_states()
-        if not States.OPEN_TO_HIT in sets_state:
-            logging.warning(
-                f"There is no open to hit set to hit anymore. Action ignored."
+        target_set = self.get_open_set_number()
+        if target_set is None:
+            logger.warning(
+                "There is no open to hit set to hit anymore. Action ignored."
             )
         else:
             # do hit
-            target_set = sets_state.index(States.OPEN_TO_HIT)
             self.append_card(p_card=p_card, p_set_number=target_set)
 
     def do_stand(self):
-        logging.info(f"{self.name} choosed to STAND.")
+        if self.verbose:
+            logger.info("%s choosed to STAND.", self.name)
         # check if player can stand
-        sets_state = self._get_set_states()
-        if not States.OPEN_TO_HIT in sets_state:
-            logging.warning(f"There is no open set to stand. Action ignored.")
+        target_set = self.get_open_set_number()
+        if target_set is None:
+            logger.warning("There is no open set to stand. Action ignored.")
         else:
             # do hit
-            target_set = sets_state.index(States.OPEN_TO_HIT)
             self.sets[target_set].state = States.STAND
 
     def do_split(self):
-        logging.info(f"{self.name} choosed to SPLIT.")
+        if self.verbose:
+            logger.info("%s choosed to SPLIT.", self.name)
         # check if player can split
-        sets_state = self._get_set_states()
+        target_set = self.get_open_set_number()
         # -- if there is already an open to hit set
-        if not States.OPEN_TO_HIT in sets_state:
-            logging.warning(
-                f"Can not split as there is no open to hit set. Action ignored."
+        if target_set is None:
+            logger.warning(
+                "Can not split as there is no open to hit set. Action ignored."
             )
         else:
-            target_set = sets_state.index(States.OPEN_TO_HIT)
             # -- if the open set has more than one card
             if len(self.sets[target_set].cards) > 2:
-                logging.warning(
-                    f"Can not split when there are 3 cards or more in a set. Action ignored."
+                logger.warning(
+                    "Can not split when there are 3 cards or more in a set. Action ignored."
                 )
             # -- if the points of the cards in the set are the same
             elif (
                 self.sets[target_set].cards[0].point
                 != self.sets[target_set].cards[1].point
             ):
-                logging.warning(
-                    f"The points of the cards in set are not equal to perform split. Action ignored."
+                logger.warning(
+                    "The points of the cards in set are not equal to perform split. Action ignored."
+                )
+            # -- if the player has not split as many times as she can
+            elif not self.can_split(self.sets[target_set]):
+                logger.warning(
+                    "Can not split more than %s times in a round. Action ignored.",
+                    self.max_splits,
                 )
             else:
                 # do split
-                card = self.sets[target_set].cards.pop()
+                card = self.sets[target_set].pop_card()
                 self.sets.append(Set())
-                self.sets[-1].cards.append(card)
+                self.sets[-1].append_card(card)
                 bet_amount = self.sets[target_set].bet_amount
                 self.capital -= bet_amount
                 self.sets[-1].bet_amount = bet_amount
@@ -229,109 +339,232 @@ class Bank(User):
     A user who deals
     """
 
-    def __init__(self, p_name: str) -> None:
+    rules: RuleSet
+
+    def __init__(self, p_name: str, p_rules: RuleSet = DEFAULT_RULES) -> None:
         super().__init__(Roles.BANK, p_name)
         self.sets.append(Set())  # but the bank can hold only one set
+        self.rules = p_rules
 
     def do_hit(self, p_card: Card):
-        logging.info(f"{self.name} choosed to HIT.")
+        if self.verbose:
+            logger.info("%s choosed to HIT.", self.name)
         # check if bank can hit
         # -- if there is already an open to hit set
         if not States.OPEN_TO_HIT is self.sets[0].state:
-            logging.warning(
-                f"There is no open to hit set to hit anymore. Action ignored."
+            logger.warning(
+                "There is no open to hit set to hit anymore. Action ignored."
             )
         else:
-            # -- if there the total points of the held cards is less than or equal to 16
-            if self.sets[0].get_total_points() > 17:
-                logging.warning(
-                    f"Bank can't hit when her totla point is more than 16. Action ignored"
+            # -- if the total points of the held cards are less than the stand points
+            if not self.rules.bank_hits[self.sets[0].get_total_points()]:
+                logger.warning(
+                    "Bank can't hit when her total points are %s or more. Action ignored",
+                    self.rules.bank_stand_points,
                 )
             else:
                 # do hit
                 self.append_card(p_card=p_card, p_set_number=0)
 
     def do_stand(self):
-        logging.info(f"{self.name} choosed to HIT.")
+        if self.verbose:
+            logger.info("%s choosed to STAND.", self.name)
         self.sets[0].state = States.STAND
 
 
+class GameSnapshot(NamedTuple):
+    """
+    the state of a game at a moment of a round, e.g. for trying out the actions
+
+    It shares the buffer of the shoe and keeps only the position in it.
+    """
+
+    shoe: ShoeSnapshot
+    round_id: int
+    turn_player_number: int
+    capitals: Tuple[int, ...]
+    open_set_numbers: Tuple[int, ...]
+    player_sets: Tuple[Tuple[SetSnapshot, ...], ...]
+    bank_set: SetSnapshot
+
+
+class Strategy(Protocol):
+    """
+    Chooses the action of a player for one of her open sets
+    """
+
+    def choose_action(self, p_game: "Game", p_player: Player, p_set: Set) -> Action:
+        ...
+
+
 class Game:
     """
     The class which hold the functionalities of the game
     """
 
-    cards: List[Card]
+    shoe: Shoe
     bank: Bank
     players: List[Player]
-    current_random_card_index: int = 0
-
-    def __init__(self, p_players: List[Player]) -> None:
+    verbose: bool
+    rules: RuleSet
+    round_id: int
+    event_log: EventLogWriter
+    ledger: Ledger
+    turn_player_number: int
+
+    def __init__(
+        self,
+        p_players: List[Player],
+        p_verbose: bool = True,
+        p_shoe: Shoe = None,
+        p_rng: random.Random = None,
+        p_rules: RuleSet = None,
+    ) -> None:
+        self.rules = DEFAULT_RULES if p_rules is None else p_rules
         self.players = p_players
-        self.bank = Bank(p_name="Banky")
+        self.bank = Bank(p_name="Banky", p_rules=self.rules)
+
+        # a non-verbose game neither draws the table nor logs the actions
+        self.verbose = p_verbose
+        self.bank.verbose = p_verbose
+        for player in self.players:
+            player.verbose = p_verbose
+            player.max_splits = self.rules.max_splits
+
+        # the shoe lasts across the rounds of the game
+        # -- for every group of players (per the rules) we need one deck of shuffled cards
+        # -- it shuffles with the given random stream, or with one of its own
+        if p_shoe is None:
+            p_shoe = Shoe(
+                p_number_of_decks=(len(p_players) // self.rules.players_per_deck) + 1,
+                p_rng=p_rng,
+                p_cards=self.rules.cards,
+            )
+        elif p_shoe.cards is not self.rules.cards:
+            raise Exception("The shoe should deal the cards of the rules of the game.")
+        self.shoe = p_shoe
 
-        # for every 3 group of players we need one deck of shuffled cards
-        self.cards = TwentyOneCards(
-            do_shuffle=True,
-            p_number_of_decks=(len(p_players) // 4) + 1,
-        ).cards
+        # the rounds are numbered from 1 on; the events are only recorded with a log and
+        # the settlements with a ledger
+        self.round_id = 0
+        self.event_log = None
+        self.ledger = None
+
+        # the players before this one have finished all their sets in this round
+        self.turn_player_number = 0
 
     def set_what_cards_to_reveal(self, p_symbols: List[Symbols]):
         """
         A heler function for unit testing which allows us to choose what cards to reveal
         The filter is the cards symbol as it's the only factor wich determins the point of the card.
-        """
-
-        def find_the_card(cards: List[Card], p_symbol: Symbols):
-            """
-            A helper function for finding the target card based on the symbol it has
-            """
-            for card in cards:
-                if card.symbol is p_symbol:
-                    return card
 
-        target_cards: List[Card] = []
+        The chosen cards are distinct cards of the shoe and the rest of the shoe follows
+        them, shuffled; the cut card is right after them, so the next reset after the
+        scripted round reshuffles the shoe.
+        """
+        builder = ScriptedShoeBuilder(self.shoe.codes, self.shoe.cards)
         for symbol in p_symbols:
-            target_cards.append(find_the_card(cards=self.cards, p_symbol=symbol))
+            builder.take(symbol)
 
         # replace the previously generated set of cards to the new set of cards
-        self.cards = target_cards
+        self.shoe.load(builder.build(), p_cut_card_index=len(p_symbols))
 
     def reset(self):
+        """
+        Clears the table for the next round; the shoe is reshuffled once its cut card is reached
+        """
         for player in self.players:
-            for set in player.sets:
-                set.cards.clear()
-                set.bet_amount = 0
-                set.state = States.OPEN_TO_HIT
+            player.reset_sets()
+        self.bank.sets = [Set()]
+        self.turn_player_number = 0
+
+        if self.shoe.is_cut_card_reached():
+            self.shoe.reshuffle()
 
     def get_a_random_card(self) -> Card:
-        a_random_card = self.cards[self.current_random_card_index]
-        self.current_random_card_index += 1
-        return a_random_card
+        return self.shoe.get_a_random_card()
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        the state of the shoe, the capitals and the sets; the event log is not part of it
+        """
+        return GameSnapshot(
+            self.shoe.snapshot(),
+            self.round_id,
+            self.turn_player_number,
+            tuple([player.capital for player in self.players]),
+            tuple([player.open_set_number for player in self.players]),
+            tuple([tuple([set.snapshot() for set in player.sets]) for player in self.players]),
+            self.bank.sets[0].snapshot(),
+        )
+
+    def restore(self, p_snapshot: GameSnapshot):
+        """
+        puts the game back to a snapshot of it, with new sets
+        """
+        if len(p_snapshot.capitals) != len(self.players):
+            raise Exception("The snapshot is of a game with another number of players.")
+
+        cards = self.rules.cards
+        self.shoe.restore(p_snapshot.shoe)
+        self.round_id = p_snapshot.round_id
+        self.turn_player_number = p_snapshot.turn_player_number
+        for player, capital, open_set_number, sets in zip(
+            self.players,
+            p_snapshot.capitals,
+            p_snapshot.open_set_numbers,
+            p_snapshot.player_sets,
+        ):
+            player.capital = capital
+            player.open_set_number = open_set_number
+            player.sets = [Set.from_snapshot(set, cards) for set in sets]
+        self.bank.sets = [Set.from_snapshot(p_snapshot.bank_set, cards)]
+
+    def get_turn(self) -> Optional[Tuple[int, int]]:
+        """
+        the numbers of the player and of her set to take the next action, or None once
+        all the players are ready; the cursor only moves forward within a round
+        """
+        players = self.players
+        while self.turn_player_number < len(players):
+            set_number = players[self.turn_player_number].get_open_set_number()
+            if set_number is not None:
+                return self.turn_player_number, set_number
+            self.turn_player_number += 1
+        return None
 
     def check_if_all_players_are_ready(self):
-        for player in self.players:
-            for set in player.sets:
-                if set.state is States.OPEN_TO_HIT:
-                    return False
-        return True
+        return self.get_turn() is None
 
     def phase_1__start(self):
         """
         Game initializes by givving all the players and the bank a card
         """
-        # start from the first random card
-        self.current_random_card_index = 0
+        self.round_id += 1
+        self.turn_player_number = 0
+        event_log = self.event_log
+        if event_log is not None:
+            event_log.record(
+                EventTypes.ROUND, self.round_id, BANK_SEAT, p_amount=len(self.players)
+            )
+            for seat, player in enumerate(self.players):
+                event_log.record(
+                    EventTypes.CAPITAL, self.round_id, seat, p_amount=player.capital
+                )
 
         # give each user a card
         # -- give a card to players
-        for player in self.players:
+        for seat, player in enumerate(self.players):
             card = self.get_a_random_card()
             player.append_card(p_card=card)
+            if event_log is not None:
+                event_log.record(EventTypes.DEAL, self.round_id, seat, 0, card.code)
 
         # -- give a card to bank
         card = self.get_a_random_card()
         self.bank.append_card(p_card=card)
+        if event_log is not None:
+            event_log.record(EventTypes.DEAL, self.round_id, BANK_SEAT, 0, card.code)
 
         self.draw_the_game()
 
@@ -340,14 +573,23 @@ class Game:
         Places bets both for bank and players.
         """
         p_player.place_initial_bet(p_bet_amount)
+        if self.event_log is not None:
+            self.event_log.record(
+                EventTypes.BET,
+                self.round_id,
+                self.players.index(p_player),
+                p_amount=p_bet_amount,
+            )
 
     def phase_3__give_players_the_second_card(self):
         """
         Give players the second card. Therefore, by then they will have 2 cards in total.
         """
-        for player in self.players:
+        for seat, player in enumerate(self.players):
             card = self.get_a_random_card()
             player.append_card(p_card=card)
+            if self.event_log is not None:
+                self.event_log.record(EventTypes.DEAL, self.round_id, seat, 0, card.code)
 
         self.draw_the_game()
 
@@ -355,6 +597,14 @@ class Game:
         """
         Perform action for the player
         """
+        if self.event_log is not None:
+            self._record_action(p_player, p_action)
+        else:
+            self._take_action(p_player, p_action)
+
+        self.draw_the_game()
+
+    def _take_action(self, p_player: Player, p_action: Action):
         if p_action is Action.HIT:
             card = self.get_a_random_card()
             p_player.do_hit(p_card=card)
@@ -365,7 +615,35 @@ class Game:
         if p_action is Action.SPLIT:
             p_player.do_split()
 
-        self.draw_the_game()
+    def _record_action(self, p_player: Player, p_action: Action):
+        """
+        takes the action and records it, if it is not ignored
+        """
+        set_number = p_player.get_open_set_number()
+        if set_number is None:
+            self._take_action(p_player, p_action)
+            return
+
+        set = p_player.sets[set_number]
+        number_of_cards = len(set.cards)
+        number_of_sets = len(p_player.sets)
+        self._take_action(p_player, p_action)
+
+        seat = self.players.index(p_player)
+        if p_action is Action.HIT and len(set.cards) > number_of_cards:
+            self.event_log.record(
+                EventTypes.HIT, self.round_id, seat, set_number, set.cards[-1].code
+            )
+        elif p_action is Action.STAND:
+            self.event_log.record(EventTypes.STAND, self.round_id, seat, set_number)
+        elif p_action is Action.SPLIT and len(p_player.sets) > number_of_sets:
+            self.event_log.record(
+                EventTypes.SPLIT,
+                self.round_id,
+                seat,
+                set_number,
+                p_amount=p_player.sets[-1].bet_amount,
+            )
 
     def phase_5__reveals_banks_second_card(self):
         """
@@ -379,8 +657,11 @@ class Game:
             )
 
         # check internal conditions and do hit if possible
+        number_of_cards = len(self.bank.sets[0].cards)
         card = self.get_a_random_card()
         self.bank.do_hit(p_card=card)
+        if self.event_log is not None and len(self.bank.sets[0].cards) > number_of_cards:
+            self.event_log.record(EventTypes.DEAL, self.round_id, BANK_SEAT, 0, card.code)
 
         self.draw_the_game()
 
@@ -406,60 +687,108 @@ class Game:
             if is_there_atleast_one_standing_player:
                 break
 
+        event_log = self.event_log
         if not is_there_atleast_one_standing_player:
             self.bank.do_stand()
+            if event_log is not None:
+                event_log.record(EventTypes.STAND, self.round_id, BANK_SEAT)
         else:
-            # -- if bank's points does not exceed 16
-            while self.bank.sets[0].get_total_points() <= 16:
+            # -- if bank's points are less than the stand points of the rules
+            bank_set = self.bank.sets[0]
+            bank_hits = self.rules.bank_hits
+            while (
+                bank_set.state is States.OPEN_TO_HIT
+                and bank_hits[bank_set.get_total_points()]
+            ):
                 # check few other conditions and do hit if possible
                 card = self.get_a_random_card()
                 self.bank.do_hit(p_card=card)
+                if event_log is not None:
+                    event_log.record(EventTypes.HIT, self.round_id, BANK_SEAT, 0, card.code)
 
-            # -- if bank is not bust then she should stand when her score has exceed 16
+            # -- if bank is not bust then she should stand on the stand points or more
             if not self.bank.sets[0].state is States.BUST:
                 self.bank.do_stand()
+                if event_log is not None:
+                    event_log.record(EventTypes.STAND, self.round_id, BANK_SEAT)
 
         self.draw_the_game()
         self.evaluate()
 
-    def evaluate(self):
+    def play_round(self, p_strategies: List[Strategy], p_bet_amount: int = 1):
         """
-        finds the loser and winner sets and make the calculatios regarding the capital
+        Plays a whole round (phase 1 to 6) with a strategy per player and the same bet amount
         """
-        # players set bust
+        if len(p_strategies) != len(self.players):
+            raise Exception("There should be one strategy per player.")
+
+        self.reset()
+        self.phase_1__start()
         for player in self.players:
-            for set in player.sets:
-                if set.state is States.BUST:
-                    # bank wins the set
-                    set.bet_amount = 0
+            self.phase_2__place_bet(player, p_bet_amount)
+        self.phase_3__give_players_the_second_card()
+
+        # ask actions player by player and set by set
+        # -- the sets which are added by a split are reached by the same cursor
+        turn = self.get_turn()
+        while turn is not None:
+            player_number, set_number = turn
+            player = self.players[player_number]
+            set = player.sets[set_number]
+            action = p_strategies[player_number].choose_action(self, player, set)
+            if action is Action.SPLIT and not player.can_split(set):
+                raise Exception(f"{player.name} can not split this set.")
+            self.phase_4__take_action_for_player(player, action)
+            turn = self.get_turn()
+
+        self.phase_5__reveals_banks_second_card()
+        self.phase_6__bank_hits_until_bust_or_stand()
 
-        # bank set bust
-        if self.bank.sets[0].state is States.BUST:
-            for set in player.sets:
-                if set.state is States.STAND:
-                    # player wins the set
-                    player.capital += set.bet_amount * 2
-                    set.bet_amount = 0
+    def evaluate(self):
+        """
+        settles every set against the bank in one pass and pays each player in bulk
 
-        # check by point of sets if no-one bust
-        bank_total_points = self.bank.sets[0].get_total_points()
-        for player in self.players:
-            for set in player.sets:
-                if set.get_total_points() <= bank_total_points:
-                    # bank wins the set
-                    set.bet_amount = 0
+        A bust set loses; otherwise the set wins twice its bet if the bank busts or has
+        less points, and the ties go to the bank.
+        """
+        bank_set = self.bank.sets[0]
+        is_bank_bust = bank_set.state is States.BUST
+        bank_total_points = bank_set.get_total_points()
+        ledger = self.ledger
+        event_log = self.event_log
+        round_id = self.round_id
+
+        for seat, player in enumerate(self.players):
+            payouts = 0
+            for set_number, set in enumerate(player.sets):
+                if set.state is States.BUST:
+                    payout = 0
+                elif is_bank_bust or set.get_total_points() > bank_total_points:
+                    payout = set.bet_amount * 2
                 else:
-                    # player wins the set
-                    player.capital += set.bet_amount * 2
-                    set.bet_amount = 0
+                    payout = 0
+
+                if ledger is not None:
+                    ledger.append(round_id, seat, set_number, set.bet_amount, payout)
+                if event_log is not None:
+                    event_log.record(
+                        EventTypes.SETTLE, round_id, seat, set_number, p_amount=payout
+                    )
+                payouts += payout
+                set.bet_amount = 0
+            player.capital += payouts
 
-        for player in self.players:
-            logging.info(f"{player.name}'s capital is {player.capital}.")
+        if self.verbose:
+            for player in self.players:
+                logger.info("%s's capital is %s.", player.name, player.capital)
 
     def draw_the_game(self):
         """
         Draw the cards and points in console
         """
+        if not self.verbose:
+            return
+
         print("-" * 40)
         print("Bank:")
         print("\t[ ", end="")
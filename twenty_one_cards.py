@@ -1,62 +1,90 @@
 """
 This script prepares and generates the cards for the 21 game.
+
+There are only 52 distinct cards; they are created once with their points for the game
+and shared as flyweights. A shoe of any number of decks is a compact buffer of the
+card codes (one byte per card) which is shuffled and dealt as integers.
 """
 import itertools
-from typing import List
-from random import shuffle
+import random
+from array import array
+from typing import Dict, List, Optional, Tuple
 
 import cards
 
 
-class TwentyOneCards:
+# the point of each symbol for the game, and the alternative point of the ace
+SYMBOL_POINTS: Dict[cards.Symbols, Tuple[int, Optional[int]]] = {
+    cards.Symbols.ACE: (11, 1),
+    **{symbol: (int(symbol.value), None) for symbol in list(cards.Symbols)[1:10]},
+    cards.Symbols.JACK: (1, None),
+    cards.Symbols.QUEEN: (2, None),
+    cards.Symbols.KING: (3, None),
+}
+
+
+def generate_cards(
+    p_symbol_points: Dict[cards.Symbols, Tuple[int, Optional[int]]] = SYMBOL_POINTS
+) -> List[cards.Card]:
     """
-    the cards with the asociated points for the 21 game
+    generates the 52 distinct cards, indexed by their codes, with the points for the game
     """
+    the_cards = [None] * (len(cards.Suits) * len(cards.Symbols))
+    for suit, symbol in itertools.product(cards.Suits, cards.Symbols):
+        card = cards.Card(p_suit=suit, p_symbol=symbol)
+        card.set_point(*p_symbol_points[symbol])
+        the_cards[card.code] = card
+    return the_cards
 
-    cards_set: List[cards.Card]
 
-    def __init__(self, p_number_of_decks: int = 1, do_shuffle: bool = True) -> None:
-        self.cards = []
+# the card of each code
+CARDS: List[cards.Card] = generate_cards()
 
-        the_ace = cards.Symbols.ACE
-        usual_cards_symbol = [symbol for symbol in cards.Symbols][
-            1:10
-        ]  # cards from 2 to 10
+# the codes of a single deck
+DECK_CODES = array("b", range(len(CARDS)))
 
-        # generate cards and set the points for the game
-        for deck, suit, symbol in itertools.product(
-            range(p_number_of_decks), cards.Suits, cards.Symbols
-        ):
-            # generate the card
-            card = cards.Card(
-                p_suit=suit,
-                p_symbol=symbol,
-                p_deck_number=deck,
-            )
+# the point values a card can have; J=1, 2 to 10, and the ace as 11
+POINT_VALUES = range(1, 12)
 
-            # set the point of the card
 
-            if card.symbol is the_ace:
-                card.set_point(
-                    p_value=11,
-                    p_alternative_value=1,
-                )
+def get_composition(p_codes, p_cards: List[cards.Card] = CARDS) -> Tuple[int, ...]:
+    """
+    counts the cards of each point value (see POINT_VALUES)
+    """
+    counts = [0] * len(POINT_VALUES)
+    for code in p_codes:
+        counts[p_cards[code].point - 1] += 1
+    return tuple(counts)
 
-            elif card.symbol in usual_cards_symbol:
-                card.set_point(p_value=int(symbol.value))
 
-            elif card.symbol is cards.Symbols.JACK:
-                card.set_point(p_value=1)
+class TwentyOneCards:
+    """
+    the cards with the asociated points for the 21 game
 
-            elif card.symbol is cards.Symbols.QUEEN:
-                card.set_point(p_value=2)
+    The cards are shuffled with the given random stream, or the global one of the
+    random module if there is none.
+    """
 
-            elif card.symbol is cards.Symbols.KING:
-                card.set_point(p_value=3)
+    codes: array
 
-            # append tha card
-            self.cards.append(card)
+    def __init__(
+        self,
+        p_number_of_decks: int = 1,
+        do_shuffle: bool = True,
+        p_rng: random.Random = None,
+    ) -> None:
+        self.codes = DECK_CODES * p_number_of_decks
 
         # shuffle the cards
         if do_shuffle:
-            shuffle(self.cards)
+            (random if p_rng is None else p_rng).shuffle(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, p_index: int) -> cards.Card:
+        return CARDS[self.codes[p_index]]
+
+    @property
+    def cards(self) -> List[cards.Card]:
+        return [CARDS[code] for code in self.codes]